@@ -16,7 +16,10 @@
 #  specific language governing permissions and limitations
 #  under the License.
 
+import time
+
 import trac.db.util
+from trac.db.profiler import get_query_profile
 from trac.util import concurrency
 
 import sqlparse
@@ -80,10 +83,20 @@ class BloodhoundIterableCursor(trac.db.util.IterableCursor):
         super(BloodhoundIterableCursor, self).__init__(cursor, log=log)
 
     def execute(self, sql, args=None):
-        return super(BloodhoundIterableCursor, self).execute(translate_sql(self.env, sql), args=args)
+        return super(BloodhoundIterableCursor, self).execute(self._translate(sql), args=args)
 
     def executemany(self, sql, args=None):
-        return super(BloodhoundIterableCursor, self).executemany(translate_sql(self.env, sql), args=args)
+        return super(BloodhoundIterableCursor, self).executemany(self._translate(sql), args=args)
+
+    def _translate(self, sql):
+        profile = get_query_profile()
+        if profile is None:
+            return translate_sql(self.env, sql)
+        start = time.time()
+        try:
+            return translate_sql(self.env, sql)
+        finally:
+            profile.add_translation(time.time() - start)
 
     @property
     def env(self):
@@ -123,9 +136,17 @@ class BloodhoundConnectionWrapper(object):
         BloodhoundIterableCursor.set_env(self.env)
         return self.connection.executemany(query, params=params)
 
+    def iterate(self, query, params=None, arraysize=1000):
+        BloodhoundIterableCursor.set_env(self.env)
+        return self.connection.iterate(query, params, arraysize)
+
     def cursor(self):
         return BloodhoundCursorWrapper(self.connection.cursor(), self.env)
 
+    def stream_cursor(self):
+        return BloodhoundCursorWrapper(self.connection.stream_cursor(),
+                                       self.env)
+
 class BloodhoundCursorWrapper(object):
 
     def __init__(self, cursor, env):
@@ -195,6 +216,10 @@ class ProductEnvContextManager(object):
         BloodhoundIterableCursor.set_env(self.env)
         return self.db_context.executemany(sql, params=params)
 
+    def iterate(self, sql, params=None, arraysize=None):
+        BloodhoundIterableCursor.set_env(self.env)
+        return self.db_context.iterate(sql, params, arraysize)
+
 
 class BloodhoundProductSQLTranslate(object):
     _join_statements = ['LEFT JOIN', 'LEFT OUTER JOIN',
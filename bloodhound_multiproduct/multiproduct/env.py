@@ -767,6 +767,8 @@ class ProductEnvironment(Component, ComponentManager):
         RepositoryManager(self).shutdown(tid)
         # FIXME: Shared DB so IMO this should not happen ... at least not here
         #DatabaseManager(self).shutdown(tid)
+        if tid is not None:
+            DatabaseManager(self.parent).release_primary()
         if tid is None:
             self.log.removeHandler(self._log_handler)
             self._log_handler.flush()
@@ -20,6 +20,7 @@ from datetime import datetime
 from itertools import izip
 
 from trac.core import TracError
+from trac.perm import PermissionSystem
 from trac.resource import Resource
 from trac.ticket.model import Ticket
 from trac.ticket.query import Query
@@ -47,6 +48,15 @@ class Product(ModelBase):
         """Allow Product to be treated as a Resource"""
         return Resource('product', self.prefix)
 
+    def insert(self):
+        super(Product, self).insert()
+        # The product owner is granted with product permissions
+        PermissionSystem(self._env).reset_decision_cache()
+
+    def update(self):
+        super(Product, self).update()
+        PermissionSystem(self._env).reset_decision_cache()
+
     def delete(self, resources_to=None):
         """ override the delete method so that we can move references to this
         object to a new product """
@@ -59,6 +69,7 @@ class Product(ModelBase):
                                 sdata)
         original_prefix = self._data['prefix']
         super(Product, self).delete()
+        PermissionSystem(self._env).reset_decision_cache()
         #find and update all resources that should move
         where = {'product_id':original_prefix}
         for prm in ProductResourceMap.select(self._env, where=where):
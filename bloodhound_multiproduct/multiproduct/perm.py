@@ -34,6 +34,11 @@ class MultiproductPermissionPolicy(Component):
     """
     implements(IPermissionPolicy)
 
+    # Decisions only depend on global permissions and product owner
+    cacheable_decisions = True
+
+    _actions = None
+
     # IPermissionPolicy methods
     def check_permission(self, action, username, resource, perm):
         # FIXME: Better handling of recursive imports
@@ -42,16 +47,24 @@ class MultiproductPermissionPolicy(Component):
         if isinstance(self.env, ProductEnvironment):
             permsys = PermissionSystem(self.env.parent)
             if permsys.check_permission('TRAC_ADMIN', username):
-                return action in PermissionSystem(self.env).get_actions() \
+                return action in self.actions \
                         or None     # FIXME: maybe False is better
             elif username == self.env.product.owner:
                 # Product owner granted with PRODUCT_ADMIN permission ootb
-                permsys = PermissionSystem(self.env)
                 # FIXME: would `action != 'TRAC_ADMIN'` be enough ?
-                return True if action in permsys.get_actions() and \
+                return True if action in self.actions and \
                                 action != 'TRAC_ADMIN' \
                             else None
 
+    @property
+    def actions(self):
+        """The actions defined in the product environment. As the
+        permission requestors can only change when the environment is
+        reloaded, they are only computed once."""
+        if self._actions is None:
+            self._actions = frozenset(PermissionSystem(self.env).get_actions())
+        return self._actions
+
 
 #--------------------------
 # Impersonation helpers
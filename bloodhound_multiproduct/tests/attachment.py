@@ -61,6 +61,11 @@ class ProductAttachmentTestCase(AttachmentTestCase, MultiproductTestCase):
 
         self.assertNotEqual(product_attachment.path, global_attachment.path)
 
+    def test_render_preview(self):
+        # The preview cache of the global environment is shared by products
+        self.global_env.config.set('mimeviewer', 'preview_cache_size', 100000)
+        AttachmentTestCase.test_render_preview(self)
+
 def test_suite():
     return unittest.TestSuite([
             unittest.makeSuite(ProductAttachmentTestCase,'test'),
@@ -55,6 +55,15 @@ class ProductEnvironmentStub(ProductEnvironment):
     def get_known_users(self, cnx=None):
         return self.known_users
 
+    # Known users are shared with the global environment
+    def _get_known_users(self):
+        return self.parent.known_users
+
+    def _set_known_users(self, users):
+        self.parent.known_users = users
+
+    known_users = property(_get_known_users, _set_known_users)
+
 
 # FIXME: Subclass TestCase explictly ?
 class MultiproductTestCase(unittest.TestCase):
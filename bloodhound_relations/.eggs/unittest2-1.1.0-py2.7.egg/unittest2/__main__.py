@@ -0,0 +1,21 @@
+"""Main entry point"""
+
+import sys
+if sys.argv[0].endswith("__main__.py"):
+    import os.path
+    # We change sys.argv[0] to make help message more useful
+    # use executable without path, unquoted
+    # (it's just a hint anyway)
+    # (if you have spaces in your executable you get what you deserve!)
+    executable = os.path.basename(sys.executable)
+    sys.argv[0] = executable + " -m unittest2"
+    del os
+
+__unittest = True
+
+from unittest2.main import main, TestProgram
+def main_():
+    main(module=None)
+
+if __name__=="__main__":
+    main_()
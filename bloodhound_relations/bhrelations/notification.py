@@ -18,7 +18,7 @@
 #  specific language governing permissions and limitations
 #  under the License.
 from trac.notification import NotifyEmail
-from trac.ticket.notification import (get_ticket_notification_recipients,
+from trac.ticket.notification import (get_tickets_notification_recipients,
                                       TicketNotifyEmail)
 from trac.util.datefmt import from_utimestamp
 from trac.web.chrome import Chrome
@@ -65,12 +65,12 @@ class RelationNotifyEmail(TicketNotifyEmail):
         relation = self.relation
         source, destination = map(ResourceIdSerializer.get_resource_by_id,
                                   (relation.source, relation.destination))
+        tktids = [resource.id for resource in (source, destination)
+                  if resource.realm == 'ticket']
         to, cc = [], []
-        for resource in (source, destination):
-            if resource.realm == 'ticket':
-                (torecipients, ccrecipients, reporter, owner) = \
-                    get_ticket_notification_recipients(self.env, self.config,
-                    resource.id, [])
-                to.extend(torecipients)
-                cc.extend(ccrecipients)
+        for torecipients, ccrecipients, reporter, owner in \
+                get_tickets_notification_recipients(self.env, self.config,
+                                                    tktids).itervalues():
+            to.extend(torecipients)
+            cc.extend(ccrecipients)
         return to, cc
@@ -19,10 +19,14 @@
 #  under the License.
 
 r"""Core Bloodhound Search components."""
-from trac.config import ExtensionOption, OrderedExtensionsOption
+import copy
+
+from trac.config import ExtensionOption, IntOption, OrderedExtensionsOption
 from trac.core import (Interface, Component, ExtensionPoint, TracError,
     implements)
 from trac.env import IEnvironmentSetupParticipant
+from trac.util.concurrency import threading
+from trac.web.metrics import IMetricsProvider, format_counters
 from multiproduct.api import ISupportMultiProductEnvironment
 from multiproduct.core import MultiProductExtensionPoint
 
@@ -155,6 +159,15 @@ class ISearchBackend(Interface):
     def start_operation(self):
         """Used to get arguments for batch operation withing single commit"""
 
+    def get_index_version():
+        """Return a value that changes whenever the content of the index
+        changes, or `None` if the results of the queries must not be
+        cached."""
+
+    def build_spelling_dictionary():
+        """Build the dictionary used to suggest corrections of the
+        queries from the current content of the index."""
+
 class IIndexParticipant(Interface):
     """Extension point interface for components that should be searched.
     """
@@ -232,11 +245,75 @@ class IMetaKeywordParser(Interface):
         """If text matches the keyword, return its transformed value."""
 
 
+class QueryCache(object):
+    """Bounded cache of query results or other data derived from a
+    source, emptied when the version of the source changes."""
+
+    def __init__(self, size):
+        self.size = size
+        self.version = None
+        self._entries = {}
+        self._tick = 0
+        self._lock = threading.Lock()
+
+    def get(self, version, key):
+        with self._lock:
+            if version != self.version:
+                self.version = version
+                self._entries = {}
+                return None
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._tick += 1
+            entry[0] = self._tick
+            return entry[1]
+
+    def set(self, version, key, value):
+        if self.size <= 0:
+            return
+        with self._lock:
+            if version != self.version:
+                return
+            self._tick += 1
+            self._entries[key] = [self._tick, value]
+            if len(self._entries) > self.size:
+                # Evict the least recently used entries
+                entries = sorted(self._entries.iteritems(),
+                                 key=lambda item: item[1][0])
+                keep = max(self.size * 9 // 10, 1)
+                for key, entry in entries[:len(entries) - keep]:
+                    del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self.version = None
+            self._entries = {}
+
+
+def _copy_facets(facets):
+    if facets is None:
+        return None
+    return dict((name, dict(counts)) for name, counts in facets.iteritems())
+
+
+def _copy_result(query_result):
+    # The values of the fields are immutable
+    result = copy.copy(query_result)
+    result.docs = [dict(doc) for doc in query_result.docs]
+    result.highlighting = [dict(fields)
+                           for fields in query_result.highlighting]
+    result.facets = _copy_facets(query_result.facets)
+    result.debug = dict(query_result.debug)
+    return result
+
+
 class BloodhoundSearchApi(Component):
     """Implements core indexing functionality, provides methods for
     searching, adding and deleting documents from index.
     """
-    implements(IEnvironmentSetupParticipant, ISupportMultiProductEnvironment)
+    implements(IEnvironmentSetupParticipant, ISupportMultiProductEnvironment,
+               IMetricsProvider)
 
     backend = ExtensionOption('bhsearch', 'search_backend',
         ISearchBackend, 'WhooshBackend',
@@ -257,6 +334,16 @@ class BloodhoundSearchApi(Component):
 
     index_participants = MultiProductExtensionPoint(IIndexParticipant)
 
+    query_cache_size = IntOption('bhsearch', 'query_cache_size', 100,
+        """Number of query results, and separately of facet counts, kept
+        in memory until the index changes. Set to 0 to disable the
+        cache.""")
+
+    def __init__(self):
+        self._result_cache = QueryCache(self.query_cache_size)
+        self._facet_cache = QueryCache(self.query_cache_size)
+        self._cache_stats = {'hit': 0, 'facets_hit': 0, 'miss': 0}
+
     def query(
             self,
             query,
@@ -313,14 +400,79 @@ class BloodhoundSearchApi(Component):
         for query_processor in self.query_processors:
             query_processor.query_pre_process(query_parameters, context)
 
-        query_result = self.backend.query(**query_parameters)
+        query_result = self._query_cached(query_parameters, context)
+
+        query_result.debug["api_parameters"] = query_parameters
+        return query_result
+
+    def _query_cached(self, query_parameters, context=None):
+        version = None
+        if self.query_cache_size > 0:
+            version = self.backend.get_index_version()
+        if version is None:
+            return self._query_backend(query_parameters, context)
+
+        # The security filters are part of the filter, so that users with
+        # the same permissions share the cached results
+        facets_key = (repr(query_parameters['query']),
+                      repr(query_parameters['filter']),
+                      tuple(query_parameters['facets'] or ()))
+        if self.config.getbool('bhsearch', 'advanced_security'):
+            # The backend checks the permission of the user on each
+            # document, which the filter doesn't reflect
+            req = context and context.req
+            facets_key += (getattr(req, 'authname', None),)
+        sort = query_parameters['sort'] or ()
+        key = facets_key + (
+            query_parameters['query_string'],
+            tuple(s.build_sort_expression() for s in sort),
+            tuple(query_parameters['fields'] or ()),
+            query_parameters['pagenum'],
+            query_parameters['pagelen'],
+            query_parameters['highlight'],
+            tuple(query_parameters['highlight_fields'] or ()))
+
+        query_result = self._result_cache.get(version, key)
+        if query_result is not None:
+            self._count_query('hit')
+            return _copy_result(query_result)
+
+        facets = None
+        if query_parameters['facets']:
+            facets = self._facet_cache.get(version, facets_key)
+        if facets is not None:
+            # Only the requested page is retrieved when paging through
+            # the results
+            self._count_query('facets_hit')
+            query_result = self._query_backend(dict(query_parameters,
+                                                    facets=None), context)
+            query_result.facets = _copy_facets(facets)
+        else:
+            self._count_query('miss')
+            query_result = self._query_backend(query_parameters, context)
+            if query_parameters['facets']:
+                self._facet_cache.set(version, facets_key,
+                                      _copy_facets(query_result.facets))
+        self._result_cache.set(version, key, _copy_result(query_result))
+        return query_result
 
+    def _query_backend(self, query_parameters, context=None):
+        query_result = self.backend.query(context=context,
+                                          **query_parameters)
         for post_processor in self.result_post_processors:
             post_processor.post_process(query_result)
-
-        query_result.debug["api_parameters"] = query_parameters
         return query_result
 
+    def _count_query(self, outcome):
+        self._cache_stats[outcome] += 1
+
+    #IMetricsProvider methods
+    def get_metrics(self):
+        return format_counters(
+            'bhsearch_query_cache_total',
+            "Search queries answered from the cache, by outcome.",
+            'outcome', self._cache_stats)
+
     def start_operation(self):
         return self.backend.start_operation()
 
@@ -328,6 +480,8 @@ class BloodhoundSearchApi(Component):
         """Rebuild underlying index"""
         self.log.info('Rebuilding the search index.')
         self.backend.recreate_index()
+        self._result_cache.clear()
+        self._facet_cache.clear()
         with self.backend.start_operation() as operation_context:
             doc = None
             try:
@@ -353,6 +507,9 @@ class BloodhoundSearchApi(Component):
                 if doc:
                     self.log.error("Doc that triggers the error: %s" % doc)
                 raise
+        # The dictionary would otherwise be built by the first searches,
+        # possibly from a partial index
+        self.backend.build_spelling_dictionary()
 
     def change_doc_id(self, doc, old_id, operation_context=None):
         if operation_context is None:
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+#  Licensed to the Apache Software Foundation (ASF) under one
+#  or more contributor license agreements.  See the NOTICE file
+#  distributed with this work for additional information
+#  regarding copyright ownership.  The ASF licenses this file
+#  to you under the Apache License, Version 2.0 (the
+#  "License"); you may not use this file except in compliance
+#  with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing,
+#  software distributed under the License is distributed on an
+#  "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied.  See the License for the
+#  specific language governing permissions and limitations
+#  under the License.
+
+r"""Answer the searches of the Trac search sources from the Bloodhound
+Search index."""
+from trac.config import IntOption
+from trac.core import Component, implements
+from trac.search.api import ISearchIndex
+from trac.util.text import exception_to_unicode
+from trac.web.chrome import web_context
+
+from bhsearch import BHSEARCH_CONFIG_SECTION
+from bhsearch.api import BloodhoundSearchApi, IndexFields
+from bhsearch.search_resources.changeset_search import (CHANGESET_TYPE,
+                                                        ChangesetIndexer)
+from bhsearch.search_resources.ticket_search import (TICKET_TYPE,
+                                                     TicketIndexer)
+from bhsearch.utils import get_product
+
+
+class LegacySearchIndex(Component):
+    """Look up the changesets and tickets searched by the Trac search
+    sources, e.g. for the `search:` wiki links, in the Bloodhound Search
+    index instead of scanning the database.
+
+    The search sources still fall back to the database when the index
+    has not been built, when the changeset or ticket indexer is disabled,
+    or when no changesets or tickets have been indexed yet.
+    """
+    implements(ISearchIndex)
+
+    max_results = IntOption(BHSEARCH_CONFIG_SECTION,
+        'legacy_search_max_results', 1000,
+        doc="""Maximum number of changesets and tickets looked up in the
+            index for a search of the Trac search sources.""")
+
+    doc_types = {
+        'changeset': (CHANGESET_TYPE, ChangesetIndexer),
+        'ticket': (TICKET_TYPE, TicketIndexer),
+    }
+
+    # ISearchIndex methods
+    def find_resources(self, req, realm, terms):
+        if realm not in self.doc_types or not terms:
+            return None
+        doc_type, indexer = self.doc_types[realm]
+        if not self.env.is_component_enabled(indexer):
+            return None
+        search_api = BloodhoundSearchApi(self.env)
+        if search_api.backend.is_index_outdated():
+            return None
+
+        query = u' '.join(u'"%s"' % term.replace(u'"', u' ')
+                          for term in terms)
+        filters = [u'%s:"%s"' % (IndexFields.TYPE, doc_type)]
+        if doc_type == TICKET_TYPE:
+            prefix = get_product(self.env).prefix
+            if prefix:
+                filters.append(u'%s:"%s"' % (IndexFields.PRODUCT, prefix))
+            else:
+                filters.append(u'NOT (%s:*)' % IndexFields.PRODUCT)
+        try:
+            if not search_api.query(filters[0], fields=[IndexFields.ID],
+                                    pagelen=1,
+                                    context=web_context(req)).hits:
+                # Nothing indexed yet, e.g. an index built before the
+                # indexer was enabled
+                return None
+            result = search_api.query(query,
+                                      fields=[IndexFields.ID],
+                                      filter=filters,
+                                      pagelen=self.max_results,
+                                      context=web_context(req))
+        except Exception, e:
+            self.log.warning("Searching the %s index failed, the database "
+                             "will be searched instead: %s", realm,
+                             exception_to_unicode(e))
+            return None
+
+        ids = [doc[IndexFields.ID] for doc in result.docs]
+        if doc_type == TICKET_TYPE:
+            return [int(id) for id in ids]
+        # The changesets are indexed as "rev/reponame"
+        return [tuple(reversed(id.split(u'/', 1))) for id in ids]
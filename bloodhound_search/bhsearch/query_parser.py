@@ -91,7 +91,6 @@ class DefaultQueryParser(Component):
         content = 1,
         changes = 1,
         message = 1,
-        query_suggestion_basket = 0,
         relations = 1,
     )
 
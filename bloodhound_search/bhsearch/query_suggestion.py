@@ -18,17 +18,31 @@
 #  specific language governing permissions and limitations
 #  under the License.
 
-from trac.core import Component, implements
-from bhsearch.api import IDocIndexPreprocessor, IndexFields
+from __future__ import with_statement
+
+from whoosh.spelling import Corrector
+from whoosh.support.levenshtein import damerau_levenshtein
+
+from trac.util import AtomicFile
+from bhsearch.api import IndexFields
+
+
+GENERATION_HEADER = '# generation '
 
 
 class SuggestionFields(IndexFields):
     SUMMARY = 'summary'
-    BASKET = 'query_suggestion_basket'
 
 
-class QuerySuggestionPreprocessor(Component):
-    implements(IDocIndexPreprocessor)
+class SpellingDictionary(Corrector):
+    """Words of the index with the number of documents containing them,
+    used to suggest corrections of misspelled queries.
+
+    The dictionary is built from the terms of the index, and saved in a
+    text file with one word and its frequency per line, after a header
+    line with the generation of the index it was built from. Candidate
+    words for a correction are looked up by their bigrams.
+    """
 
     suggestion_fields = [
         IndexFields.NAME,
@@ -36,8 +50,70 @@ class QuerySuggestionPreprocessor(Component):
         SuggestionFields.SUMMARY,
     ]
 
-    # IDocIndexPreprocessor methods
-    def pre_process(self, doc):
-        basket = u' '.join(doc.get(field, '')
-                           for field in self.suggestion_fields)
-        doc[SuggestionFields.BASKET] = basket
+    def __init__(self, frequencies, generation=None):
+        self.frequencies = frequencies
+        self.generation = generation
+        self._bigrams = None
+
+    @classmethod
+    def build(cls, readers, generation=None):
+        frequencies = {}
+        for reader in readers:
+            for fieldname in cls.suggestion_fields:
+                if fieldname not in reader.schema:
+                    continue
+                for word, terminfo in reader.iter_field(fieldname):
+                    if word.isalpha():
+                        frequencies[word] = frequencies.get(word, 0) + \
+                                            terminfo.doc_frequency()
+        return cls(frequencies, generation)
+
+    @classmethod
+    def load(cls, path):
+        frequencies = {}
+        generation = None
+        with open(path, 'rb') as f:
+            for line in f:
+                if line.startswith('#'):
+                    if line.startswith(GENERATION_HEADER):
+                        generation = int(line[len(GENERATION_HEADER):])
+                    continue
+                word, frequency = line.decode('utf-8').split()
+                frequencies[word] = int(frequency)
+        return cls(frequencies, generation)
+
+    def save(self, path):
+        with AtomicFile(path, 'wb') as f:
+            if self.generation is not None:
+                f.write('%s%d\n' % (GENERATION_HEADER, self.generation))
+            for word in sorted(self.frequencies):
+                f.write(('%s %d\n' % (word, self.frequencies[word]))
+                        .encode('utf-8'))
+
+    def __contains__(self, word):
+        return word in self.frequencies
+
+    def _suggestions(self, text, maxdist, prefix):
+        if self._bigrams is None:
+            bigrams = {}
+            for word in self.frequencies:
+                for bigram in _bigrams(word):
+                    bigrams.setdefault(bigram, []).append(word)
+            self._bigrams = bigrams
+        candidates = set()
+        for bigram in _bigrams(text):
+            candidates.update(self._bigrams.get(bigram, ()))
+        for word in candidates:
+            if abs(len(word) - len(text)) > maxdist or \
+                    word[:prefix] != text[:prefix]:
+                continue
+            distance = damerau_levenshtein(text, word, maxdist)
+            if distance <= maxdist:
+                # Higher scores are better: prefer the closest words, then
+                # the most frequent ones
+                yield (0 - (distance + 0.5 / self.frequencies[word]), word)
+
+
+def _bigrams(word):
+    word = u'^%s$' % word
+    return set(word[i:i + 2] for i in xrange(len(word) - 1))
@@ -21,13 +21,13 @@
 r"""Ticket specifics for Bloodhound Search plugin."""
 from bhsearch import BHSEARCH_CONFIG_SECTION
 from bhsearch.api import (ISearchParticipant, BloodhoundSearchApi,
-    IIndexParticipant, IndexFields)
+    IIndexParticipant, IndexFields, QueryCache)
 from bhsearch.search_resources.base import BaseIndexer, BaseSearchParticipant
 from bhsearch.utils import get_product
 from genshi.builder import tag
 from trac.ticket.api import TicketSystem
 from trac.ticket import Ticket
-from trac.config import ListOption, Option
+from trac.config import IntOption, ListOption, Option
 from trac.core import implements
 from trac.resource import IResourceChangeListener
 from trac.ticket.model import Component
@@ -58,10 +58,17 @@ class TicketIndexer(BaseIndexer):
         'owner': TicketFields.OWNER,
     }
 
+    comment_cache_size = IntOption('bhsearch', 'ticket_comment_cache_size',
+        1000,
+        """Number of tickets whose formatted comments are kept in memory,
+        so that reindexing a ticket only formats its new or edited
+        comments. Set to 0 to disable the cache.""")
+
     def __init__(self):
         self.fields = TicketSystem(self.env).get_ticket_fields()
         self.text_area_fields = set(
             f['name'] for f in self.fields if f['type'] =='textarea')
+        self._comment_cache = QueryCache(self.comment_cache_size)
 
     #IResourceChangeListener methods
     def match_resource(self, resource):
@@ -141,7 +148,7 @@ class TicketIndexer(BaseIndexer):
             conditions.append(key + "=%s")
         if conditions:
             sql = sql + " WHERE " + " AND ".join(conditions)
-        for row in self.env.db_query(sql, args):
+        for row in self.env.db_query.iterate(sql, args):
             yield int(row[0])
 
     def _index_ticket(self, ticket, search_api=None, operation_context=None):
@@ -180,11 +187,41 @@ class TicketIndexer(BaseIndexer):
                     field_content = self.wiki_formatter.format(field_content)
                 doc[index_field] = field_content
 
-        doc[TicketFields.CHANGES] = u'\n\n'.join(
-            [self.wiki_formatter.format(x[4]) for x in ticket.get_changelog()
-             if x[2] == u'comment'])
+        doc[TicketFields.CHANGES] = self._format_comments(ticket)
         return doc
 
+    def _format_comments(self, ticket):
+        """Return the formatted text of the comments of the ticket, and of
+        the descriptions of its attachments, like `Ticket.get_changelog`.
+
+        Only the comments which changed since the ticket was last indexed
+        are formatted again.
+        """
+        # The cache is emptied when another formatter is configured
+        version = self.wiki_formatter.__class__
+        formatted = self._comment_cache.get(version, ticket.id) or {}
+        comments = {}
+        texts = []
+        sid = str(ticket.id)
+        for time, permanent, author, comment in self.env.db_query("""
+                SELECT time, 1 AS permanent, author, newvalue
+                FROM ticket_change WHERE ticket=%s AND field='comment'
+                  UNION
+                SELECT time, 0 AS permanent, author, description
+                FROM attachment WHERE type='ticket' AND id=%s
+                ORDER BY time,permanent,author
+                """, (ticket.id, sid)):
+            comment = comment or ''
+            text = comments.get(comment)
+            if text is None:
+                text = formatted.get(comment)
+                if text is None:
+                    text = self.wiki_formatter.format(comment)
+                comments[comment] = text
+            texts.append(text)
+        self._comment_cache.set(version, ticket.id, comments)
+        return u'\n\n'.join(texts)
+
     def get_entries_for_index(self):
         for ticket in self._fetch_tickets():
             yield self.build_doc(ticket)
@@ -24,7 +24,8 @@ except ImportError:
     import unittest
 
 from bhsearch.tests import (whoosh_backend, index_with_whoosh, web_ui,
-                            api, query_parser, query_suggestion, security)
+                            api, query_parser, query_suggestion, security,
+                            legacy_search)
 from bhsearch.tests.search_resources import (ticket_search, wiki_search,
                                              milestone_search, base,
                                              changeset_search)
@@ -39,6 +40,7 @@ def suite():
     test_suite.addTest(query_parser.suite())
     test_suite.addTest(query_suggestion.suite())
     test_suite.addTest(security.suite())
+    test_suite.addTest(legacy_search.suite())
     test_suite.addTest(ticket_search.suite())
     test_suite.addTest(wiki_search.suite())
     test_suite.addTest(milestone_search.suite())
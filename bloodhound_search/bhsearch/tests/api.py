@@ -19,7 +19,8 @@
 #  under the License.
 import shutil
 
-from bhsearch.api import BloodhoundSearchApi, ASC, SortInstruction
+from bhsearch.api import BloodhoundSearchApi, ASC, QueryCache, \
+    SortInstruction
 from bhsearch.query_parser import DefaultQueryParser
 from bhsearch.search_resources.ticket_search import TicketSearchParticipant
 from bhsearch.tests import unittest
@@ -132,6 +133,62 @@ class ApiQueryWithWhooshTestCase(BaseBloodhoundSearchTest):
 
         self.assertEqual(results.hits, 2)
 
+    def test_caches_results_until_index_changes(self):
+        self.insert_ticket("summary1 keyword")
+        results = self.search_api.query("keyword")
+        results.docs[0]["summary"] = "changed by the caller"
+
+        results = self.search_api.query("keyword")
+        self.assertEqual("summary1 keyword", results.docs[0]["summary"])
+        self.assertEqual(1, self.search_api._cache_stats['hit'])
+
+        self.insert_ticket("summary2 keyword")
+        results = self.search_api.query("keyword")
+        self.assertEqual(2, results.hits)
+        self.assertEqual(1, self.search_api._cache_stats['hit'])
+
+    def test_caches_facets_across_pages(self):
+        for i in range(3):
+            self.insert_ticket("t%d" % i, status="new")
+        results = self.search_api.query("*", facets=["status"], pagelen=2)
+        facets = results.facets
+        results = self.search_api.query("*", facets=["status"], pagelen=2,
+                                        pagenum=2)
+        self.assertEqual(1, len(results.docs))
+        self.assertEqual(facets, results.facets)
+        self.assertEqual({'hit': 0, 'facets_hit': 1, 'miss': 1},
+                         self.search_api._cache_stats)
+
+    def test_cache_can_be_disabled(self):
+        self.env.config.set('bhsearch', 'query_cache_size', 0)
+        self.insert_ticket("summary1 keyword")
+        self.search_api.query("keyword")
+        self.search_api.query("keyword")
+        self.assertEqual({'hit': 0, 'facets_hit': 0, 'miss': 0},
+                         self.search_api._cache_stats)
+
+
+class QueryCacheTestCase(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = QueryCache(10)
+        cache.get(1, 'key')
+        for i in range(10):
+            cache.set(1, i, i)
+        cache.get(1, 0)
+        cache.set(1, 10, 10)
+        self.assertEqual(0, cache.get(1, 0))
+        self.assertEqual(None, cache.get(1, 1))
+        self.assertEqual(10, cache.get(1, 10))
+
+    def test_cleared_on_version_change(self):
+        cache = QueryCache(10)
+        cache.get(1, 'key')
+        cache.set(1, 'key', 'value')
+        self.assertEqual('value', cache.get(1, 'key'))
+        self.assertEqual(None, cache.get(2, 'key'))
+        cache.set(1, 'key', 'stale')
+        self.assertEqual(None, cache.get(2, 'key'))
+
 #TODO: check this later
 #    @unittest.skip("Check with Whoosh community")
 #    def test_can_search_id_and_summary(self):
@@ -148,7 +205,10 @@ class ApiQueryWithWhooshTestCase(BaseBloodhoundSearchTest):
 
 
 def suite():
-    return unittest.makeSuite(ApiQueryWithWhooshTestCase, 'test')
+    test_suite = unittest.TestSuite()
+    test_suite.addTest(unittest.makeSuite(ApiQueryWithWhooshTestCase, 'test'))
+    test_suite.addTest(unittest.makeSuite(QueryCacheTestCase, 'test'))
+    return test_suite
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+#  Licensed to the Apache Software Foundation (ASF) under one
+#  or more contributor license agreements.  See the NOTICE file
+#  distributed with this work for additional information
+#  regarding copyright ownership.  The ASF licenses this file
+#  to you under the Apache License, Version 2.0 (the
+#  "License"); you may not use this file except in compliance
+#  with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing,
+#  software distributed under the License is distributed on an
+#  "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied.  See the License for the
+#  specific language governing permissions and limitations
+#  under the License.
+from datetime import datetime
+
+from trac.ticket.web_ui import TicketModule
+from trac.util.datefmt import utc
+from trac.versioncontrol.api import RepositoryManager
+from trac.versioncontrol.web_ui.changeset import ChangesetModule
+
+from bhsearch.legacy_search import LegacySearchIndex
+from bhsearch.search_resources.ticket_search import TicketIndexer
+from bhsearch.tests import unittest
+from bhsearch.tests.base import BaseBloodhoundSearchTest
+from bhsearch.tests.search_resources.changeset_search import (
+    DummyRepositoryConnector, DummyRepositry)
+from bhsearch.whoosh_backend import WhooshBackend
+
+
+class LegacySearchIndexTestCase(BaseBloodhoundSearchTest):
+    def setUp(self):
+        super(LegacySearchIndexTestCase, self).setUp(create_req=True)
+        self.whoosh_backend = WhooshBackend(self.env)
+        self.whoosh_backend.recreate_index()
+        self.index = LegacySearchIndex(self.env)
+
+    def search_tickets(self, terms):
+        return list(TicketModule(self.env).get_search_results(
+            self.req, terms, ['ticket']))
+
+    def test_finds_indexed_tickets(self):
+        ticket1 = self.insert_ticket("Hello world", description="first")
+        self.insert_ticket("Goodbye world", description="second")
+
+        self.assertEqual([ticket1.id],
+                         self.index.find_resources(self.req, 'ticket',
+                                                   ['hello']))
+        self.assertEqual(2, len(self.index.find_resources(
+            self.req, 'ticket', ['world'])))
+        self.assertEqual([], self.index.find_resources(
+            self.req, 'ticket', ['hello', 'second']))
+
+    def test_ticket_search_uses_index(self):
+        ticket = self.insert_ticket("Hello world", description="first")
+        # Changed in the database only, the index still has "Hello"
+        self.env.db_transaction(
+            "UPDATE ticket SET summary='Other' WHERE id=%s", (ticket.id,))
+
+        results = self.search_tickets(['hello'])
+        self.assertEqual(1, len(results))
+        href, title, date, author, excerpt = results[0]
+        self.assertEqual('/main/ticket/%s' % ticket.id, href)
+        self.assertIn('Other', unicode(title))
+        self.assertEqual('first', excerpt)
+
+    def test_falls_back_to_database_without_index(self):
+        self.insert_ticket("Hello world")
+        self.whoosh_backend.index = None
+
+        self.assertIsNone(self.index.find_resources(self.req, 'ticket',
+                                                    ['hello']))
+        self.assertEqual(1, len(self.search_tickets(['hello'])))
+
+    def test_falls_back_to_database_without_indexed_tickets(self):
+        self.insert_ticket("Hello world")
+        self.whoosh_backend.recreate_index()
+
+        self.assertIsNone(self.index.find_resources(self.req, 'ticket',
+                                                    ['hello']))
+        self.assertEqual(1, len(self.search_tickets(['hello'])))
+
+    def test_falls_back_to_database_without_indexer(self):
+        self.insert_ticket("Hello world")
+        # pylint: disable=protected-access
+        self.env._component_rules[
+            self.env._component_name(TicketIndexer)] = False
+
+        self.assertIsNone(self.index.find_resources(self.req, 'ticket',
+                                                    ['hello']))
+
+    def test_ignores_other_realms(self):
+        self.assertIsNone(self.index.find_resources(self.req, 'wiki',
+                                                    ['hello']))
+
+    def test_changeset_search_uses_index(self):
+        repository = DummyRepositry()
+        connector = DummyRepositoryConnector(self.env)
+        connector.repository = repository
+        repository_manager = RepositoryManager(self.env)
+        # pylint: disable=protected-access
+        repository_manager._all_repositories = {
+            'dummy': dict(dir='dirname', type='dummy')}
+        repository_manager._connectors = {'dummy': (connector, 100)}
+        date = datetime(2013, 5, 1, tzinfo=utc)
+        rev = repository.add_changeset(None, "Fixed the build", "joe", date)
+        repository.add_changeset(None, "Updated docs", "jim", date)
+        repository_manager.notify('changeset_added', 'dummy', [rev])
+
+        self.assertEqual([('dummy', rev)],
+                         self.index.find_resources(self.req, 'changeset',
+                                                   ['build']))
+        results = list(ChangesetModule(self.env).get_search_results(
+            self.req, ['build'], ['changeset']))
+        self.assertEqual([('/main/changeset/1/dummy', '[1]: Fixed the build',
+                           date, 'joe', 'Fixed the build')], results)
+
+
+def suite():
+    test_suite = unittest.TestSuite()
+    test_suite.addTest(unittest.makeSuite(LegacySearchIndexTestCase, 'test'))
+    return test_suite
+
+if __name__ == '__main__':
+    unittest.main()
@@ -18,8 +18,10 @@
 #  specific language governing permissions and limitations
 #  under the License.
 
+import os
+
 from bhsearch.api import BloodhoundSearchApi
-from bhsearch.query_suggestion import SuggestionFields
+from bhsearch.query_suggestion import SpellingDictionary
 from bhsearch.tests import unittest
 from bhsearch.tests.base import BaseBloodhoundSearchTest
 from bhsearch.web_ui import RequestParameters, RequestContext
@@ -34,19 +36,22 @@ class QuerySuggestionTestCase(BaseBloodhoundSearchTest):
 
         self.search_api = BloodhoundSearchApi(self.env)
 
-    def test_fills_suggestion_field(self):
+    def test_builds_spelling_dictionary(self):
         self.insert_ticket("test")
         self.insert_milestone("test")
-        self.insert_wiki("name", "test")
+        self.insert_wiki("name", "test 42")
 
-        results = self.search_api.query("%s:test" % SuggestionFields.BASKET)
+        self.whoosh_backend.build_spelling_dictionary()
+        dictionary = SpellingDictionary.load(
+            self.whoosh_backend.spelling_dictionary_path)
 
-        self.assertEqual(results.hits, 3)
+        self.assertEqual({'name': 1, 'test': 3}, dictionary.frequencies)
 
     def test_provides_suggestions(self):
         self.insert_ticket("test")
         self.req.args[RequestParameters.QUERY] = "tesk"
 
+        self.whoosh_backend.build_spelling_dictionary()
         data = self.process_request()
 
         self.assertIn(RequestContext.DATA_QUERY_SUGGESTION, data)
@@ -58,6 +63,7 @@ class QuerySuggestionTestCase(BaseBloodhoundSearchTest):
         self.insert_ticket("another test")
         self.req.args[RequestParameters.QUERY] = "another tesk"
 
+        self.whoosh_backend.build_spelling_dictionary()
         data = self.process_request()
 
         suggestion = data[RequestContext.DATA_QUERY_SUGGESTION]
@@ -67,25 +73,136 @@ class QuerySuggestionTestCase(BaseBloodhoundSearchTest):
         self.insert_ticket("test")
         self.req.args[RequestParameters.QUERY] = "another tesk"
 
+        self.whoosh_backend.build_spelling_dictionary()
         data = self.process_request()
 
         suggestion = data[RequestContext.DATA_QUERY_SUGGESTION]
         self.assertEqual(suggestion['query'], 'another test')
 
+    def test_prefers_frequent_words(self):
+        self.insert_ticket("tent")
+        self.insert_ticket("test")
+        self.insert_ticket("test again")
+        self.req.args[RequestParameters.QUERY] = "tesk"
+
+        self.whoosh_backend.build_spelling_dictionary()
+        data = self.process_request()
+
+        suggestion = data[RequestContext.DATA_QUERY_SUGGESTION]
+        self.assertEqual(suggestion['query'], 'test')
+
+    def test_no_suggestions_when_query_has_enough_hits(self):
+        self.env.config.set('bhsearch', 'query_suggestion_max_hits', 1)
+        self.insert_ticket("test")
+        self.insert_ticket("test again")
+        self.req.args[RequestParameters.QUERY] = "tesk OR test"
+
+        data = self.process_request()
+
+        self.assertIsNone(data[RequestContext.DATA_QUERY_SUGGESTION])
+
+    def test_no_suggestions_for_words_of_the_index(self):
+        self.insert_ticket("tesk")
+        self.insert_ticket("test again")
+        self.req.args[RequestParameters.QUERY] = "tesk"
+
+        data = self.process_request()
+
+        self.assertIsNone(data[RequestContext.DATA_QUERY_SUGGESTION])
+
+    def test_dictionary_is_rebuilt_on_optimize(self):
+        self.insert_ticket("test")
+        self.whoosh_backend.build_spelling_dictionary()
+        self.insert_ticket("word")
+
+        self.whoosh_backend.optimize()
+
+        dictionary = SpellingDictionary.load(
+            self.whoosh_backend.spelling_dictionary_path)
+        self.assertIn('word', dictionary)
+
+    def test_dictionary_is_built_in_background_when_missing(self):
+        self.insert_ticket("test")
+        self.req.args[RequestParameters.QUERY] = "tesk"
+
+        data = self.process_request()
+        self.assertIsNone(data[RequestContext.DATA_QUERY_SUGGESTION])
+        self.whoosh_backend._spelling_thread.join()
+
+        data = self.process_request()
+        suggestion = data[RequestContext.DATA_QUERY_SUGGESTION]
+        self.assertEqual(suggestion['query'], 'test')
+
+    def test_outdated_dictionary_is_rebuilt_in_background(self):
+        self.env.config.set('bhsearch', 'spelling_dictionary_refresh', 2)
+        self.insert_ticket("test")
+        self.whoosh_backend.build_spelling_dictionary()
+        self.insert_ticket("word")
+        self.req.args[RequestParameters.QUERY] = "tesk"
+
+        self.process_request()
+        self.assertIsNone(self.whoosh_backend._spelling_thread)
+
+        self.insert_ticket("other")
+        self.process_request()
+        self.whoosh_backend._spelling_thread.join()
+        dictionary = SpellingDictionary.load(
+            self.whoosh_backend.spelling_dictionary_path)
+        self.assertIn('word', dictionary)
+
+    def test_dictionary_is_built_on_rebuild(self):
+        self.insert_ticket("test")
+
+        self.search_api.rebuild_index()
+
+        dictionary = SpellingDictionary.load(
+            self.whoosh_backend.spelling_dictionary_path)
+        self.assertIn('test', dictionary)
+
+    def test_dictionary_is_removed_with_index(self):
+        self.insert_ticket("test")
+        self.whoosh_backend.build_spelling_dictionary()
+
+        self.whoosh_backend.recreate_index()
+
+        self.assertFalse(os.path.exists(
+            self.whoosh_backend.spelling_dictionary_path))
+
     def test_suggestion_href_contains_used_filters(self):
         self.insert_ticket("test")
         self.req.args[RequestParameters.QUERY] = "tesk"
         self.req.args[RequestParameters.FILTER_QUERY] = ['filter']
 
+        self.whoosh_backend.build_spelling_dictionary()
         data = self.process_request()
 
         suggestion = data[RequestContext.DATA_QUERY_SUGGESTION]
         self.assertIn('fq=filter', suggestion['href'])
 
 
+class SpellingDictionaryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dictionary = SpellingDictionary(
+            {u'test': 3, u'tent': 1, u'text': 2, u'taste': 1})
+
+    def test_suggests_closest_words_first(self):
+        self.assertEqual([u'test', u'text', u'tent'],
+                         self.dictionary.suggest(u'tesd'))
+
+    def test_suggests_within_distance(self):
+        self.assertEqual([u'test'],
+                         self.dictionary.suggest(u'tesd', maxdist=1))
+        self.assertEqual([], self.dictionary.suggest(u'zzzz'))
+
+    def test_suggests_with_prefix(self):
+        self.assertEqual([u'taste'],
+                         self.dictionary.suggest(u'tasd', prefix=2))
+
+
 def suite():
     test_suite = unittest.TestSuite()
     test_suite.addTest(unittest.makeSuite(QuerySuggestionTestCase, 'test'))
+    test_suite.addTest(unittest.makeSuite(SpellingDictionaryTestCase, 'test'))
     return test_suite
 
 if __name__ == '__main__':
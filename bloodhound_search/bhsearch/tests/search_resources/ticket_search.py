@@ -87,6 +87,30 @@ class TicketIndexerTestCase(BaseBloodhoundSearchTest):
         self.print_result(results)
         self.assertEqual(CHANGED_SUMMARY, results.docs[0]["summary"])
 
+    def test_only_formats_new_and_edited_comments(self):
+        ticket = self.insert_ticket("T1", description="description")
+        for comment in ("first comment", "second comment"):
+            ticket.save_changes(comment=comment)
+        formatter = self.ticket_indexer.wiki_formatter
+        formatted = []
+        format = formatter.format
+        def _format(wiki_content):
+            formatted.append(wiki_content)
+            return format(wiki_content)
+        formatter.format = _format
+        #act
+        ticket["summary"] = "T1 changed"
+        ticket.save_changes(comment="third comment")
+        comment_time = ticket.get_change(cnum=1)['date']
+        ticket.modify_comment(comment_time, "joe", "edited comment")
+        self.ticket_indexer.reindex_tickets(self.search_api, None)
+        #assert
+        self.assertEqual(["third comment", "edited comment"],
+                         [text for text in formatted if "comment" in text])
+        doc = self.ticket_indexer.build_doc(ticket)
+        self.assertEqual("edited comment\n\nsecond comment\n\n"
+                         "third comment", doc["changes"])
+
     def test_fills_product_field_if_product_is_set(self):
         with self.product('p'):
             self.insert_ticket("T1")
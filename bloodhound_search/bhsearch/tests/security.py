@@ -254,6 +254,24 @@ class MultiProductSecurityTestSuite(SecurityTest):
 
         self.assertEqual(results.hits, 1)
 
+    def test_advanced_security_results_are_not_shared_between_users(self):
+        self.env.config.set('bhsearch', 'advanced_security', "True")
+        self.insert_ticket('ticket 1')
+        self.insert_ticket('ticket 2')
+        self._add_permission('x', 'TRAC_ADMIN')
+        self._add_permission('y', 'TRAC_ADMIN')
+
+        security.SecurityPreprocessor.check_permission = \
+            lambda x, doc, context: \
+                context.req.authname == 'x' or doc['id'] == u'1'
+
+        results = self.search_api.query("*", context=self.context)
+        self.assertEqual(results.hits, 2)
+        self.req.authname = 'y'
+        results = self.search_api.query("*", context=self.context)
+        self.assertEqual(results.hits, 1)
+        self.assertEqual(results.docs[0]['id'], u'1')
+
 
 class AuthzSecurityTestCase(SecurityTest):
     def setUp(self, enabled=()):
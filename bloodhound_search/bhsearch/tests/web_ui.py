@@ -435,6 +435,24 @@ class WebUiTestCaseWithWhoosh(BaseBloodhoundSearchTest):
         fields = [column["name"] for column in grid_data]
         self.assertEquals(["id", "status", "milestone", "component"], fields)
 
+    def test_that_grid_highlights_only_fields_in_view(self):
+        self.env.config.set(
+            'bhsearch',
+            'ticket_default_grid_fields',
+            'id,status')
+        self.insert_ticket("search_term", description="search_term")
+        #act
+        self.req.args[RequestParameters.QUERY] = "search_term"
+        self.req.args[RequestParameters.TYPE] = "ticket"
+        self.req.args[RequestParameters.VIEW] = "grid"
+        data = self.process_request()
+        #assert
+        row = data["results"].items[0]
+        self.assertIn("hilited_id", row)
+        self.assertIn("hilited_status", row)
+        self.assertNotIn("hilited_summary", row)
+        self.assertNotIn("hilited_content", row)
+
     def test_that_grid_is_switched_off_by_default(self):
         #arrange
         self.insert_ticket("T1", component="c1", status="new", milestone="A")
@@ -521,6 +539,15 @@ class WebUiTestCaseWithWhoosh(BaseBloodhoundSearchTest):
         #assert
         self.assertIn("title", data["results"].items[0])
 
+    def test_that_free_text_view_selects_only_rendered_fields(self):
+        self.insert_ticket("T1", component="c1", status="new", milestone="A")
+        self.req.args[RequestParameters.QUERY] = "*"
+        data = self.process_request()
+        item = data["results"].items[0]
+        self.assertEqual("new", item["status"])
+        self.assertNotIn("component", item)
+        self.assertNotIn("milestone", item)
+
 
     def test_that_grid_header_has_correct_sort_when_default_sorting(self):
         #arrange
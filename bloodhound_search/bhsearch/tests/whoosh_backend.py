@@ -410,9 +410,188 @@ class WhooshBackendTestCase(BaseBloodhoundSearchTest):
             self.assertNotIn(self._highlighted(term), highlight['summary'])
             self.assertNotIn(self._highlighted(term), highlight['content'])
 
+    def test_creates_one_highlighter_per_query(self):
+        term = 'search_term'
+        for i in range(3):
+            self.whoosh_backend.add_doc(dict(id=str(i), type="wiki",
+                                             content=term))
+        highlighters = []
+        create_highlights = self.whoosh_backend._create_highlights
+        def _create_highlights(fields, record, highlighter=None):
+            highlighters.append(highlighter)
+            return create_highlights(fields, record, highlighter)
+        self.whoosh_backend._create_highlights = _create_highlights
+
+        result = self.whoosh_backend.query(
+            self.parser.parse(term),
+            highlight=True,
+            highlight_fields=["content"]
+        )
+
+        self.assertEqual(3, len(result.highlighting))
+        self.assertEqual(3, len(highlighters))
+        self.assertIsNotNone(highlighters[0])
+        self.assertEqual(1, len(set(id(h) for h in highlighters)))
+        for highlight in result.highlighting:
+            self.assertEqual(self._highlighted(term), highlight['content'])
+
     def _highlighted(self, term):
         return '<em>%s</em>' % term
 
+    def test_reuses_searcher_until_index_changes(self):
+        self.whoosh_backend.add_doc(dict(id="1", type="ticket"))
+        for i in range(3):
+            self.whoosh_backend.query(query.Every())
+        pool = self.whoosh_backend._searcher_pools['']
+        self.assertEqual({'opened': 1, 'refreshed': 0, 'reused': 2},
+                         pool.stats)
+
+        self.whoosh_backend.add_doc(dict(id="2", type="ticket"))
+        result = self.whoosh_backend.query(query.Every())
+        self.assertEqual(2, result.hits)
+        self.assertEqual({'opened': 1, 'refreshed': 1, 'reused': 2},
+                         pool.stats)
+        self.assertIn('bhsearch_searchers_total{outcome="refreshed"} 1',
+                      self.whoosh_backend.get_metrics())
+
+    def test_opens_searcher_per_query_without_pool(self):
+        self.env.config.set('bhsearch', 'searcher_pool_size', 0)
+        self.whoosh_backend.add_doc(dict(id="1", type="ticket"))
+        self.whoosh_backend.query(query.Every())
+        self.whoosh_backend.query(query.Every())
+        self.assertEqual({'opened': 2, 'refreshed': 0, 'reused': 0},
+                         self.whoosh_backend._searcher_pools[''].stats)
+
+    def test_security_collector_is_not_reused(self):
+        self.env.config.set('bhsearch', 'advanced_security', True)
+        self.whoosh_backend.add_doc(dict(id="1", type="ticket"))
+        self.whoosh_backend.query(query.Every())
+        searcher = self.whoosh_backend._searcher_pools['']._idle[0]
+        self.assertNotIn('collector', searcher.__dict__)
+
+
+class WhooshShardingTestCase(BaseBloodhoundSearchTest):
+    def setUp(self):
+        super(WhooshShardingTestCase, self).setUp()
+        self.env.config.set('bhsearch', 'shard_by_product', True)
+        self.index_dir = os.path.join(self.env.path, 'whoosh_index')
+        self.whoosh_backend = WhooshBackend(self.env)
+        self.whoosh_backend.recreate_index()
+        self.whoosh_backend.add_doc(dict(id="1", type="ticket"))
+        self.whoosh_backend.add_doc(dict(id="2", type="ticket",
+                                         product=u"p1"))
+        self.whoosh_backend.add_doc(dict(id="3", type="wiki",
+                                         product=u"p2"))
+        self.whoosh_backend.add_doc(dict(id="4", type="ticket",
+                                         product=u"p1"))
+
+    def _doc_counts(self):
+        return dict((name, shard.doc_count())
+                    for name, shard in self.whoosh_backend._get_shards())
+
+    def test_highlights_hits_of_all_shards(self):
+        term = 'search_term'
+        self.whoosh_backend.add_doc(dict(id="5", type="wiki", product=u"p1",
+                                         content=term))
+        self.whoosh_backend.add_doc(dict(id="6", type="wiki", product=u"p2",
+                                         content="%s other" % term))
+
+        result = self.whoosh_backend.query(
+            DefaultQueryParser(self.env).parse(term),
+            highlight=True,
+            highlight_fields=["content"]
+        )
+
+        self.assertEqual(2, len(result.highlighting))
+        for highlight in result.highlighting:
+            self.assertIn('<em>%s</em>' % term, highlight['content'])
+
+    def test_stores_documents_in_product_shards(self):
+        self.assertEqual({'': 1, 'p1': 2, 'p2': 1}, self._doc_counts())
+        self.assertTrue(os.path.isdir(
+            os.path.join(self.index_dir, 'products', 'p1')))
+
+    def test_adds_documents_in_one_operation(self):
+        with self.whoosh_backend.start_operation() as writer:
+            self.whoosh_backend.add_doc(dict(id="5", type="ticket",
+                                             product=u"p3"), writer)
+            self.whoosh_backend.add_doc(dict(id="6", type="ticket"), writer)
+        self.assertEqual({'': 2, 'p1': 2, 'p2': 1, 'p3': 1},
+                         self._doc_counts())
+
+    def test_deletes_documents_from_product_shard(self):
+        self.whoosh_backend.delete_doc(u"p1", "ticket", "2")
+        self.assertEqual({'': 1, 'p1': 1, 'p2': 1}, self._doc_counts())
+
+    def test_merges_results_of_all_shards(self):
+        result = self.whoosh_backend.query(
+            query.Every(),
+            sort=[SortInstruction("id", DESC)],
+            facets=["type", "product"],
+            pagelen=3,
+        )
+        self.assertEqual(4, result.hits)
+        self.assertEqual(2, result.total_page_count)
+        self.assertEqual(['4', '3', '2'], [doc['id'] for doc in result.docs])
+        self.assertEqual({'ticket': 3, 'wiki': 1}, result.facets['type'])
+        self.assertEqual({None: 1, 'p1': 2, 'p2': 1},
+                         result.facets['product'])
+
+        result = self.whoosh_backend.query(
+            query.Every(),
+            sort=[SortInstruction("id", DESC)],
+            pagelen=3,
+            pagenum=2,
+        )
+        self.assertEqual(['1'], [doc['id'] for doc in result.docs])
+
+    def test_merges_results_on_score(self):
+        self.whoosh_backend.add_doc(dict(id="5", type="ticket",
+                                         product=u"p2", summary=u"word"))
+        self.whoosh_backend.add_doc(dict(id="6", type="ticket",
+                                         summary=u"word word word"))
+        result = self.whoosh_backend.query(query.Term("summary", u"word"))
+        self.assertEqual(['6', '5'], [doc['id'] for doc in result.docs])
+
+    def test_searches_only_the_filtered_product(self):
+        result = self.whoosh_backend.query(
+            query.Every(),
+            filter=query.Term("product", u"p1"),
+            sort=[SortInstruction("id", ASC)],
+        )
+        self.assertEqual(['2', '4'], [doc['id'] for doc in result.docs])
+        self.assertEqual(['p1'], self.whoosh_backend._searcher_pools.keys())
+
+    def test_rebuild_replaces_unsharded_index(self):
+        shutil.rmtree(self.index_dir)
+        os.mkdir(self.index_dir)
+        index.create_in(self.index_dir, schema=WhooshBackend.SCHEMA)
+        self.whoosh_backend.__init__()
+        self.assertTrue(self.whoosh_backend.is_index_outdated())
+
+        self.whoosh_backend.recreate_index()
+
+        self.assertFalse(self.whoosh_backend.is_index_outdated())
+        self.assertFalse(index.exists_in(self.index_dir))
+        self.assertEqual({'': 0}, self._doc_counts())
+
+    def test_rebuild_keeps_other_files(self):
+        other = os.path.join(self.index_dir, 'README')
+        with open(other, 'w') as f:
+            f.write('Not part of the index')
+        self.whoosh_backend.recreate_index()
+        self.assertTrue(os.path.isfile(other))
+
+    def test_product_prefix_stays_in_products_dir(self):
+        for prefix in (u'../p3', u'..'):
+            self.whoosh_backend.add_doc(dict(id="5", type="ticket",
+                                             product=prefix))
+        products_dir = os.path.join(self.index_dir, 'products')
+        self.assertEqual(['%2E%2E', '%2E%2E%2Fp3', 'p1', 'p2'],
+                         sorted(os.listdir(products_dir)))
+        self.assertEqual({'': 1, 'p1': 2, 'p2': 1, '..': 1, '../p3': 1},
+                         self._doc_counts())
+
 
 class WhooshIndexCreationTests(BaseBloodhoundSearchTest):
     def setUp(self):
@@ -649,6 +828,7 @@ class WhooshEmptyFacetErrorWorkaroundTestCase(BaseBloodhoundSearchTest):
 def suite():
     test_suite = unittest.TestSuite()
     test_suite.addTest(unittest.makeSuite(WhooshBackendTestCase, 'test'))
+    test_suite.addTest(unittest.makeSuite(WhooshShardingTestCase, 'test'))
     test_suite.addTest(unittest.makeSuite(WhooshFunctionalityTestCase, 'test'))
     test_suite.addTest(
         unittest.makeSuite(WhooshEmptyFacetErrorWorkaroundTestCase, 'test'))
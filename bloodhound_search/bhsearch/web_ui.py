@@ -343,6 +343,7 @@ class BloodhoundSearchModule(Component):
             facets=request_context.facets,
             filter=request_context.query_filter,
             highlight=True,
+            highlight_fields=request_context.highlight_fields,
             context=request_context,
         )
 
@@ -414,6 +415,13 @@ class RequestContext(object):
 
     VIEWS_WITH_KNOWN_FIELDS = [DATA_VIEW_GRID]
     OBLIGATORY_FIELDS_TO_SELECT = [IndexFields.ID, IndexFields.TYPE]
+    #fields rendered highlighted by the free text view and the participants
+    FREE_TEXT_HIGHLIGHT_FIELDS = [IndexFields.ID, IndexFields.NAME,
+                                  IndexFields.CONTENT, "summary", "message"]
+    #fields rendered by the free text view and the participants
+    FREE_TEXT_FIELDS = FREE_TEXT_HIGHLIGHT_FIELDS + [
+        IndexFields.TYPE, IndexFields.PRODUCT, IndexFields.TIME,
+        IndexFields.AUTHOR, IndexFields.STATUS, "resolution", "revision"]
     DEFAULT_SORT = [SortInstruction(SCORE, ASC), SortInstruction("time", DESC)]
 
     def __init__(
@@ -574,6 +582,9 @@ class RequestContext(object):
         if self.view:
             self.data[self.DATA_VIEW] = self.view
         fields_to_select = None
+        if self.view is None:
+            fields_to_select = self.FREE_TEXT_FIELDS
+        self.highlight_fields = self.FREE_TEXT_HIGHLIGHT_FIELDS
         if self.view in self.VIEWS_WITH_KNOWN_FIELDS:
             if self.active_participant:
                 fields_in_view = self.active_participant.\
@@ -586,6 +597,7 @@ class RequestContext(object):
                                         for field in fields_in_view]
             fields_to_select = self._add_obligatory_fields(
                 fields_in_view)
+            self.highlight_fields = list(fields_in_view)
         return fields_to_select
 
     def _add_views_selector(self):
@@ -19,23 +19,35 @@
 #  under the License.
 
 r"""Whoosh specific backend for Bloodhound Search plugin."""
+from __future__ import with_statement
+
+import Queue
+import re
+import shutil
+import sys
+
 from bhsearch import BHSEARCH_CONFIG_SECTION
 from bhsearch.api import ISearchBackend, DESC, QueryResult, SCORE, \
     IDocIndexPreprocessor, IResultPostprocessor, IndexFields, \
     IQueryPreprocessor
 import os
+from bhsearch.query_suggestion import SpellingDictionary
 from bhsearch.search_resources.ticket_search import TicketFields
 from bhsearch.security import SecurityPreprocessor
 from bhsearch.utils import get_global_env
 from trac.core import Component, implements, TracError
-from trac.config import Option, IntOption
-from trac.util.text import empty
+from trac.config import BoolOption, Option, IntOption
+from trac.util.concurrency import threading
+from trac.util.text import empty, exception_to_unicode, unicode_quote, \
+                           unicode_unquote
 from trac.util.datefmt import utc
+from trac.web.metrics import IMetricsProvider, format_counters
 from whoosh.fields import Schema, ID, DATETIME, KEYWORD, TEXT
 from whoosh import index, analysis
 import whoosh
 import whoosh.highlight
 from whoosh.collectors import FilterCollector
+from whoosh.spelling import SimpleQueryCorrector
 from whoosh.writing import AsyncWriter
 from datetime import datetime
 
@@ -45,12 +57,179 @@ for fix in fixes_for(whoosh.__version__):
 
 UNIQUE_ID = "unique_id"
 
+GLOBAL_SHARD = ''
+GLOBAL_SHARD_DIR = 'global'
+PRODUCT_SHARDS_DIR = 'products'
+# The files of a Whoosh index, named after the default index name
+INDEX_FILE_RE = re.compile(r'_?MAIN_')
+
+
+class SearcherPool(object):
+    """Pool of Whoosh searchers reused by the successive queries.
+
+    A searcher caches the segment readers and the field caches used for
+    sorting and faceting, which are lost when a new searcher is opened.
+    The pooled searchers are used by one query at a time, and refreshed
+    when the index has changed since they were opened.
+    """
+
+    def __init__(self, index, size):
+        self.index = index
+        self.size = size
+        self.stats = {'opened': 0, 'refreshed': 0, 'reused': 0}
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def close(self):
+        with self._lock:
+            # Searchers still in use are closed when they are released
+            self.size = 0
+            idle, self._idle = self._idle, []
+        for searcher in idle:
+            searcher.close()
+
+    def acquire(self):
+        with self._lock:
+            searcher = self._idle.pop() if self._idle else None
+        if searcher is None:
+            searcher = self.index.searcher()
+            outcome = 'opened'
+        else:
+            fresh = searcher.refresh()
+            outcome = 'reused' if fresh is searcher else 'refreshed'
+            searcher = fresh
+        with self._lock:
+            self.stats[outcome] += 1
+        return searcher
+
+    def release(self, searcher):
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(searcher)
+                return
+        searcher.close()
+
+
+class ShardedWriter(object):
+    """Writer of a sharded index.
+
+    The writers of the shards are created when the first document of
+    their shard is added or deleted, and committed together.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._writers = {}
+
+    def get_writer(self, name):
+        writer = self._writers.get(name)
+        if writer is None:
+            shard = self.backend.get_shard(name, create=True)
+            writer = self._writers[name] = AsyncWriter(shard)
+        return writer
+
+    def commit(self, **kwargs):
+        writers, self._writers = self._writers, {}
+        for writer in writers.itervalues():
+            writer.commit(**kwargs)
+
+    def cancel(self):
+        writers, self._writers = self._writers, {}
+        for writer in writers.itervalues():
+            writer.cancel()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type:
+            self.cancel()
+        else:
+            self.commit()
+
+
+class ShardedResults(object):
+    """Facet counts summed over the results of several shards."""
+
+    def __init__(self, results):
+        self._results = results
+
+    def facet_names(self):
+        names = set()
+        for results in self._results:
+            names.update(results.facet_names())
+        return list(names)
+
+    def groups(self, name):
+        groups = {}
+        for results in self._results:
+            if name in results.facet_names():
+                for key, count in results.groups(name).iteritems():
+                    groups[key] = groups.get(key, 0) + count
+        return groups
+
+
+class ShardedResultsPage(object):
+    """Page of the hits merged from the results of several shards, like
+    the `whoosh.searching.ResultsPage` of a single index."""
+
+    def __init__(self, results, hits, pagenum, pagelen):
+        self.results = ShardedResults(results)
+        self.total = sum(len(r) for r in results)
+        self.pagecount = (self.total + pagelen - 1) // pagelen
+        if pagenum > 1 and pagenum > self.pagecount:
+            raise ValueError("Asked for page %s of %s"
+                             % (pagenum, self.pagecount))
+        self.pagenum = pagenum
+        self.offset = (pagenum - 1) * pagelen
+        self._hits = hits[self.offset:self.offset + pagelen]
+        self.pagelen = len(self._hits)
+
+    def __iter__(self):
+        return iter(self._hits)
+
+    def __len__(self):
+        return self.pagelen
+
+
+def _map_in_threads(func, items, max_threads):
+    """Return the list of `func(item)` for `items`, called from up to
+    `max_threads` threads, including the calling thread."""
+    results = [None] * len(items)
+    errors = []
+    pending = Queue.Queue()
+    for i, item in enumerate(items):
+        pending.put((i, item))
+
+    def work():
+        while not errors:
+            try:
+                i, item = pending.get_nowait()
+            except Queue.Empty:
+                return
+            try:
+                results[i] = func(item)
+            except Exception:
+                errors.append(sys.exc_info())
+
+    threads = [threading.Thread(target=work)
+               for i in xrange(min(max_threads, len(items)) - 1)]
+    for thread in threads:
+        thread.start()
+    work()
+    for thread in threads:
+        thread.join()
+    if errors:
+        exc_type, exc_value, exc_tb = errors[0]
+        raise exc_type, exc_value, exc_tb
+    return results
+
 
 class WhooshBackend(Component):
     """
     Implements Whoosh SearchBackend interface
     """
-    implements(ISearchBackend)
+    implements(ISearchBackend, IMetricsProvider)
 
     index_dir_setting = Option(
         BHSEARCH_CONFIG_SECTION,
@@ -79,6 +258,47 @@ class WhooshBackend(Component):
         doc="""The number of extra characters of context to add both before
         the first matched term and after the last matched term.""")
 
+    searcher_pool_size = IntOption(
+        BHSEARCH_CONFIG_SECTION,
+        'searcher_pool_size',
+        default=4,
+        doc="""The number of Whoosh searchers kept open between queries,
+        so that their caches are reused. Set to 0 to open a new searcher
+        for each query.""")
+
+    query_suggestion_max_hits = IntOption(
+        BHSEARCH_CONFIG_SECTION,
+        'query_suggestion_max_hits',
+        default=5,
+        doc="""A correction of the query is only suggested when it matches
+        at most this number of documents.""")
+
+    spelling_dictionary_refresh = IntOption(
+        BHSEARCH_CONFIG_SECTION,
+        'spelling_dictionary_refresh',
+        default=100,
+        doc="""The number of changes committed to the index after which
+        the spelling dictionary used for query suggestions is rebuilt,
+        in the background of the next search needing it. The dictionary
+        is always rebuilt when the index is rebuilt or optimized.""")
+
+    shard_by_product = BoolOption(
+        BHSEARCH_CONFIG_SECTION,
+        'shard_by_product',
+        default=False,
+        doc="""Keep a separate Whoosh index for the documents of each
+        product, and one for the documents of the global environment.
+        The searches restricted to a product only read its index, the
+        others query all the indexes and merge the results. The index is
+        rebuilt by `trac-admin upgrade` when this setting is changed.""")
+
+    shard_search_threads = IntOption(
+        BHSEARCH_CONFIG_SECTION,
+        'shard_search_threads',
+        default=4,
+        doc="""The maximum number of threads searching the product indexes
+        in parallel, when `shard_by_product` is enabled.""")
+
     #This is schema prototype. It will be changed later
     #TODO: add other fields support, add dynamic field support.
     #Schema must be driven by index participants
@@ -112,8 +332,6 @@ class WhooshBackend(Component):
         required_permission=ID(),
         name=TEXT(stored=True,
                   analyzer=analysis.SimpleAnalyzer()),
-        query_suggestion_basket=TEXT(analyzer=analysis.SimpleAnalyzer(),
-                                     spelling=True),
         relations=KEYWORD(lowercase=True, commas=True),
     )
 
@@ -122,18 +340,33 @@ class WhooshBackend(Component):
         if not os.path.isabs(self.index_dir):
             self.index_dir = os.path.join(get_global_env(self.env).path,
                                           self.index_dir)
-        if index.exists_in(self.index_dir):
-            self.index = index.open_dir(self.index_dir)
+        shard_dir = self._get_shard_dir(GLOBAL_SHARD)
+        if index.exists_in(shard_dir):
+            self.index = index.open_dir(shard_dir)
         else:
             self.index = None
+        self._shards = {}
+        self._shards_lock = threading.Lock()
+        self._searcher_pools = {}
+        self._index_serial = 0
+        self._spelling_dictionary = None
+        self._spelling_thread = None
+        self._spelling_lock = threading.Lock()
 
     #ISearchBackend methods
     def start_operation(self):
         return self._create_writer()
 
     def _create_writer(self):
+        if self.shard_by_product:
+            return ShardedWriter(self)
         return AsyncWriter(self.index)
 
+    def _get_shard_writer(self, writer, product):
+        if isinstance(writer, ShardedWriter):
+            return writer.get_writer(self._get_shard_name(product))
+        return writer
+
     def add_doc(self, doc, operation_context=None):
         """Add any type of  document index.
 
@@ -152,7 +385,8 @@ class WhooshBackend(Component):
                                                 doc["id"])
         self.log.debug("Doc to index: %s", doc)
         try:
-            writer.update_document(**doc)
+            self._get_shard_writer(writer, doc.get(IndexFields.PRODUCT)) \
+                .update_document(**doc)
             if is_local_writer:
                 writer.commit()
         except:
@@ -183,7 +417,8 @@ class WhooshBackend(Component):
             is_local_writer = True
             writer = self._create_writer()
         try:
-            writer.delete_by_term(UNIQUE_ID, unique_id)
+            self._get_shard_writer(writer, product) \
+                .delete_by_term(UNIQUE_ID, unique_id)
             if is_local_writer:
                 writer.commit()
         except:
@@ -193,8 +428,10 @@ class WhooshBackend(Component):
 
 
     def optimize(self):
-        writer = AsyncWriter(self.index)
-        writer.commit(optimize=True)
+        for name, shard in self._get_shards():
+            writer = AsyncWriter(shard)
+            writer.commit(optimize=True)
+        self.build_spelling_dictionary()
 
     def is_index_outdated(self):
         return self.index is None or not self.index.schema == self.SCHEMA
@@ -202,9 +439,118 @@ class WhooshBackend(Component):
     def recreate_index(self):
         self.log.info('Creating Whoosh index in %s' % self.index_dir)
         self._make_dir_if_not_exists()
-        self.index = index.create_in(self.index_dir, schema=self.SCHEMA)
+        # Remove the index in both layouts and the spelling dictionary,
+        # leaving alone any other file of the directory
+        dictionary = os.path.basename(self.spelling_dictionary_path)
+        for name in os.listdir(self.index_dir):
+            path = os.path.join(self.index_dir, name)
+            if os.path.isdir(path):
+                if name in (GLOBAL_SHARD_DIR, PRODUCT_SHARDS_DIR):
+                    shutil.rmtree(path)
+            elif INDEX_FILE_RE.match(name) or name == dictionary:
+                os.remove(path)
+        with self._shards_lock:
+            self._shards = {}
+        shard_dir = self._get_shard_dir(GLOBAL_SHARD)
+        if not os.path.exists(shard_dir):
+            os.mkdir(shard_dir)
+        self.index = index.create_in(shard_dir, schema=self.SCHEMA)
+        self._index_serial += 1
         return self.index
 
+    def get_index_version(self):
+        if self.index is None:
+            return None
+        # The generation restarts from 0 when the index is recreated, and
+        # the query suggestions change with the spelling dictionary
+        try:
+            dictionary_mtime = os.path.getmtime(self.spelling_dictionary_path)
+        except OSError:
+            dictionary_mtime = None
+        return (self._index_serial, dictionary_mtime) + \
+               tuple((name, shard.latest_generation())
+                     for name, shard in self._get_shards())
+
+    def get_shard(self, name, create=False):
+        """Return the index of the shard `name`, or `None` if it doesn't
+        exist and `create` is `False`."""
+        if name == GLOBAL_SHARD:
+            return self.index
+        shard = self._shards.get(name)
+        if shard is None:
+            with self._shards_lock:
+                shard = self._shards.get(name)
+                if shard is not None:
+                    return shard
+                shard_dir = self._get_shard_dir(name)
+                if index.exists_in(shard_dir):
+                    shard = index.open_dir(shard_dir)
+                elif create:
+                    self.log.info('Creating Whoosh index in %s', shard_dir)
+                    if not os.path.exists(shard_dir):
+                        os.makedirs(shard_dir)
+                    shard = index.create_in(shard_dir, schema=self.SCHEMA)
+                else:
+                    return None
+                self._shards[name] = shard
+        return shard
+
+    def _get_shards(self, names=None):
+        """Return the `(name, index)` of the shards named `names`, or of
+        all the shards."""
+        if not self.shard_by_product:
+            return [(GLOBAL_SHARD, self.index)]
+        if names is None:
+            products_dir = os.path.join(self.index_dir, PRODUCT_SHARDS_DIR)
+            names = [GLOBAL_SHARD]
+            if os.path.isdir(products_dir):
+                names.extend(sorted(unicode_unquote(name) for name
+                                    in os.listdir(products_dir)))
+        shards = []
+        for name in names:
+            shard = self.get_shard(name)
+            if shard is not None:
+                shards.append((name, shard))
+        # The documents of a product without shard are searched in the
+        # global shard, which doesn't contain any of them
+        return shards or [(GLOBAL_SHARD, self.index)]
+
+    def _get_shard_dir(self, name):
+        if not self.shard_by_product:
+            return self.index_dir
+        elif name == GLOBAL_SHARD:
+            return os.path.join(self.index_dir, GLOBAL_SHARD_DIR)
+        else:
+            # The prefix must not designate another directory
+            name = unicode_quote(name, safe='').replace('.', '%2E')
+            return os.path.join(self.index_dir, PRODUCT_SHARDS_DIR, name)
+
+    def _get_shard_name(self, product):
+        if not self.shard_by_product or not product or \
+                product == WhooshEmptyFacetErrorWorkaround.NULL_MARKER:
+            return GLOBAL_SHARD
+        return product
+
+    def _get_filtered_shards(self, filter):
+        """Return the names of the shards of the products to which
+        `filter` restricts the search, or `None`."""
+        if not self.shard_by_product or filter is None:
+            return None
+        if isinstance(filter, whoosh.query.And):
+            conditions = filter.subqueries
+        else:
+            conditions = [filter]
+        for condition in conditions:
+            if isinstance(condition, whoosh.query.Or):
+                terms = condition.subqueries
+            else:
+                terms = [condition]
+            if terms and all(isinstance(term, whoosh.query.Term) and
+                             term.fieldname == IndexFields.PRODUCT
+                             for term in terms):
+                return [self._get_shard_name(term.text) for term in terms]
+        return None
+
     def query(self,
               query,
               query_string=None,
@@ -218,9 +564,12 @@ class WhooshBackend(Component):
               highlight_fields = None,
               context=None):
         # pylint: disable=too-many-locals
-        with self.index.searcher() as searcher:
-            self._apply_advanced_security(searcher, context)
-
+        shards = self._get_shards(self._get_filtered_shards(filter))
+        searchers = []
+        try:
+            for name, shard in shards:
+                searchers.append(self._acquire_searcher(name, shard, context))
+            searcher = searchers[0][1]
             highlight_fields = self._prepare_highlight_fields(highlight,
                                                               highlight_fields)
 
@@ -242,14 +591,19 @@ class WhooshBackend(Component):
             )
             self.env.log.debug("Whoosh query to execute: %s",
                 query_parameters)
-            raw_page = searcher.search_page(**query_parameters)
+            if len(searchers) == 1:
+                raw_page = searcher.search_page(**query_parameters)
+            else:
+                raw_page = self._search_shards([s for p, s in searchers],
+                                               query_parameters, sort)
             results = self._process_results(raw_page,
                                             fields,
                                             highlight_fields,
                                             query_parameters)
-            if query_string is not None:
-                c = searcher.correct_query(query, query_string)
-                results.query_suggestion = c.string
+            if query_string is not None and \
+                    results.hits <= self.query_suggestion_max_hits:
+                results.query_suggestion = self._suggest_query(
+                    [s for p, s in searchers], query, query_string)
             try:
                 actual_query = unicode(query.simplify(searcher))
                 results.debug['actual_query'] = actual_query
@@ -257,8 +611,152 @@ class WhooshBackend(Component):
             except:
                 # Simplify has a bug that causes it to fail sometimes.
                 pass
+        finally:
+            for pool, searcher in searchers:
+                self._release_searcher(pool, searcher)
         return results
 
+    def _search_shards(self, searchers, query_parameters, sort):
+        parameters = dict(query_parameters)
+        query = parameters.pop('query')
+        pagenum = parameters.pop('pagenum')
+        pagelen = parameters.pop('pagelen')
+        parameters['limit'] = pagenum * pagelen
+        by_score = not sort or sort[0].field.lower() == SCORE
+        if by_score:
+            # The hits are merged on their score, which is replaced by
+            # their rank when sorting on facets
+            parameters['sortedby'] = None
+        results = _map_in_threads(lambda s: s.search(query, **parameters),
+                                  searchers, self.shard_search_threads)
+
+        hits = [hit for r in results for hit in r]
+        # The sort is stable, sort on the least significant field first
+        for instruction in reversed(sort or ()):
+            if instruction.field.lower() != SCORE:
+                hits.sort(key=lambda hit, field=instruction.field:
+                          hit.fields().get(field),
+                          reverse=self._is_desc(instruction.order))
+        if by_score:
+            hits.sort(key=lambda hit: hit.score, reverse=True)
+        return ShardedResultsPage(results, hits, pagenum, pagelen)
+
+    @property
+    def spelling_dictionary_path(self):
+        return os.path.join(self.index_dir, 'spelling.dic')
+
+    def build_spelling_dictionary(self):
+        """Build the dictionary of the words of the index, used to
+        suggest corrections of the queries."""
+        self.log.info('Building the spelling dictionary in %s',
+                      self.spelling_dictionary_path)
+        generation = self._get_index_generation()
+        readers = []
+        try:
+            for name, shard in self._get_shards():
+                readers.append(shard.reader())
+            dictionary = SpellingDictionary.build(readers, generation)
+        finally:
+            for reader in readers:
+                reader.close()
+        dictionary.save(self.spelling_dictionary_path)
+
+    def _get_index_generation(self):
+        # Each commit to a shard increases its generation
+        return sum(shard.latest_generation()
+                   for name, shard in self._get_shards())
+
+    def _get_spelling_dictionary(self):
+        """Return the spelling dictionary, or `None` if it isn't built
+        yet.
+
+        A missing or outdated dictionary is rebuilt in the background,
+        and the outdated one is used meanwhile.
+        """
+        path = self.spelling_dictionary_path
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            dictionary = None
+        else:
+            cached = self._spelling_dictionary
+            if cached is None or cached[0] != mtime:
+                cached = self._spelling_dictionary = \
+                    (mtime, SpellingDictionary.load(path))
+            dictionary = cached[1]
+        if dictionary is None or dictionary.generation is None or \
+                abs(self._get_index_generation() - dictionary.generation) \
+                >= self.spelling_dictionary_refresh:
+            self._start_spelling_dictionary_build()
+        return dictionary
+
+    def _start_spelling_dictionary_build(self):
+        with self._spelling_lock:
+            thread = self._spelling_thread
+            if thread is not None and thread.isAlive():
+                return
+            thread = threading.Thread(
+                target=self._build_spelling_dictionary_in_background)
+            thread.setDaemon(True)
+            thread.start()
+            self._spelling_thread = thread
+
+    def _build_spelling_dictionary_in_background(self):
+        try:
+            self.build_spelling_dictionary()
+        except Exception, e:
+            self.log.warning("Failed to build the spelling dictionary: %s",
+                             exception_to_unicode(e))
+
+    def _suggest_query(self, searchers, query, query_string):
+        # Unqualified words are searched in all the default fields, so
+        # the content field has a token for each of them
+        fieldnames = SpellingDictionary.suggestion_fields
+        readers = [searcher.reader() for searcher in searchers]
+        terms = [(token.fieldname, token.text)
+                 for token in query.all_tokens()
+                 if token.fieldname == IndexFields.CONTENT and
+                 not any((fieldname, token.text) in reader
+                         for reader in readers for fieldname in fieldnames)]
+        if not terms:
+            return None
+        dictionary = self._get_spelling_dictionary()
+        if dictionary is None:
+            return None
+        correctors = {IndexFields.CONTENT: dictionary}
+        corrector = SimpleQueryCorrector(correctors, terms)
+        return corrector.correct_query(query, query_string).string
+
+    def _acquire_searcher(self, name, shard, context=None):
+        pool = self._searcher_pools.get(name)
+        if pool is None or pool.index is not shard:
+            new_pool = SearcherPool(shard, self.searcher_pool_size)
+            if pool is not None:
+                pool.close()
+                new_pool.stats = pool.stats
+            pool = self._searcher_pools[name] = new_pool
+        searcher = pool.acquire()
+        self._apply_advanced_security(searcher, context)
+        return pool, searcher
+
+    def _release_searcher(self, pool, searcher):
+        # The advanced security collector is bound to the request
+        searcher.__dict__.pop('collector', None)
+        pool.release(searcher)
+
+    #IMetricsProvider methods
+    def get_metrics(self):
+        if not self._searcher_pools:
+            return ''
+        stats = {}
+        for pool in self._searcher_pools.values():
+            for outcome, count in pool.stats.iteritems():
+                stats[outcome] = stats.get(outcome, 0) + count
+        return format_counters(
+            'bhsearch_searchers_total',
+            "Whoosh searchers acquired by the queries, by outcome.",
+            'outcome', stats)
+
     def _apply_advanced_security(self, searcher, context=None):
         if not self.advanced_security:
             return
@@ -396,12 +894,17 @@ class WhooshBackend(Component):
 
         docs = []
         highlighting = []
+        highlighter = None
+        if highlight_fields:
+            highlighter = QueryHighlighter(self.max_fragment_size,
+                                           self.fragment_surround)
         for retrieved_record in page:
             result_doc = self._process_record(fields, retrieved_record)
             docs.append(result_doc)
 
             result_highlights = self._create_highlights(highlight_fields,
-                                                        retrieved_record)
+                                                        retrieved_record,
+                                                        highlighter)
             highlighting.append(result_highlights)
         results.docs = docs
         results.highlighting = highlighting
@@ -449,16 +952,11 @@ class WhooshBackend(Component):
                  current user."
                 % self.index_dir)
 
-    def _create_highlights(self, fields, record):
+    def _create_highlights(self, fields, record, highlighter=None):
+        if highlighter is None:
+            highlighter = QueryHighlighter(self.max_fragment_size,
+                                           self.fragment_surround)
         result_highlights = dict()
-        fragmenter = whoosh.highlight.ContextFragmenter(
-            self.max_fragment_size,
-            self.fragment_surround,
-        )
-        highlighter = whoosh.highlight.Highlighter(
-            formatter=WhooshEmFormatter(),
-            fragmenter=fragmenter)
-
         for field in fields:
             if field in record:
                 highlighted = highlighter.highlight_hit(record, field)
@@ -468,6 +966,50 @@ class WhooshBackend(Component):
         return result_highlights
 
 
+class QueryHighlighter(object):
+    """Highlight the fields of the hits returned by one query.
+
+    The fragmenter and the formatter are created once per query, and the
+    terms searched for are looked up once per field instead of once per
+    hit. Fields which the query does not search in are not analyzed.
+    """
+
+    def __init__(self, max_fragment_size, fragment_surround):
+        self.fragmenter = whoosh.highlight.ContextFragmenter(
+            max_fragment_size, fragment_surround)
+        self.formatter = WhooshEmFormatter()
+        self.scorer = whoosh.highlight.BasicFragmentScorer()
+        self._words = {}
+
+    def highlight_hit(self, hit, fieldname, top=3):
+        words = self._get_words(hit.results).get(fieldname)
+        if not words:
+            return ''
+        text = hit[fieldname]
+        analyzer = hit.searcher.schema[fieldname].analyzer
+        tokens = analyzer(text, chars=True, mode="query", removestops=False)
+        tokens = whoosh.highlight.set_matched_filter(tokens, words)
+        fragments = self.fragmenter.fragment_tokens(text, tokens)
+        fragments = whoosh.highlight.top_fragments(fragments, top,
+                                                   self.scorer,
+                                                   whoosh.highlight.FIRST)
+        return self.formatter.format(fragments)
+
+    def _get_words(self, results):
+        # Sharded queries return hits of several result sets, whose
+        # expanded terms depend on the reader of each shard.
+        key = id(results)
+        words = self._words.get(key)
+        if words is None:
+            words = {}
+            for fieldname, text in results.query_terms(expand=True):
+                words.setdefault(fieldname, set()).add(text)
+            for fieldname in words:
+                words[fieldname] = frozenset(words[fieldname])
+            self._words[key] = words
+        return words
+
+
 class WhooshEmFormatter(whoosh.highlight.HtmlFormatter):
     template = '<em>%(t)s</em>'
 
@@ -121,6 +121,7 @@ ENTRY_POINTS = {
         'bhsearch.web_ui = bhsearch.web_ui',
         'bhsearch.api = bhsearch.api',
         'bhsearch.admin = bhsearch.admin',
+        'bhsearch.legacy_search = bhsearch.legacy_search',
         'bhsearch.search_resources.changeset_search =\
             bhsearch.search_resources.changeset_search',
         'bhsearch.search_resources.ticket_search =\
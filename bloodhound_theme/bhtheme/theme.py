@@ -71,6 +71,7 @@ class BloodhoundTheme(ThemeBase):
         'admin_accountsnotification.html': ('bh_admin_accountsnotification.html', '_modify_admin_breadcrumb'),
         'admin_basics.html': ('bh_admin_basics.html', '_modify_admin_breadcrumb'),
         'admin_components.html': ('bh_admin_components.html', '_modify_admin_breadcrumb'),
+        'admin_dbpool.html': ('bh_admin_dbpool.html', '_modify_admin_breadcrumb'),
         'admin_enums.html': ('bh_admin_enums.html', '_modify_admin_breadcrumb'),
         'admin_logging.html': ('bh_admin_logging.html', '_modify_admin_breadcrumb'),
         'admin_milestones.html': ('bh_admin_milestones.html', '_modify_admin_breadcrumb'),
@@ -0,0 +1,85 @@
+#!/usr/bin/python
+#
+# Benchmark the resolution of the recipients of a batch ticket
+# notification.
+#
+# Note: This is a development tool used in Trac QA, not something
+#       particularly useful for end-users.
+#
+# Usage: notification_benchmark.py [tickets [changes]]
+
+from __future__ import with_statement
+
+import random
+import sys
+import time
+
+from trac.db.profiler import start_query_profile, stop_query_profile
+from trac.test import EnvironmentStub
+from trac.ticket.notification import get_tickets_notification_recipients
+
+
+def per_ticket_recipients(env, config, tktid):
+    """The queries issued for each ticket before the bulk resolution,
+    for comparison."""
+    with env.db_query as db:
+        for row in db("SELECT cc, reporter, owner FROM ticket WHERE id=%s",
+                      (tktid,)):
+            break
+        authors = db("""SELECT DISTINCT author, ticket FROM ticket_change
+                        WHERE ticket=%s""", (tktid,))
+        for updater, in db("""SELECT author FROM ticket_change
+                              WHERE ticket=%s ORDER BY time DESC LIMIT 1
+                              """, (tktid,)):
+            break
+        else:
+            for updater, in db("SELECT reporter FROM ticket WHERE id=%s",
+                               (tktid,)):
+                break
+
+
+def generate(env, tickets, changes):
+    users = ['user%d@example.org' % u for u in range(50)]
+    with env.db_transaction as db:
+        db.executemany("""
+            INSERT INTO ticket (id, summary, reporter, owner, cc, time,
+                                changetime)
+            VALUES (%s,%s,%s,%s,%s,0,0)
+            """, [(t, 'Ticket %d' % t, random.choice(users),
+                   random.choice(users),
+                   ', '.join(random.sample(users, 3)))
+                  for t in range(1, tickets + 1)])
+        db.executemany("""
+            INSERT INTO ticket_change (ticket, time, author, field,
+                                       oldvalue, newvalue)
+            VALUES (%s,%s,%s,'comment','',%s)
+            """, [(t, c, random.choice(users), 'Comment %d' % c)
+                  for t in range(1, tickets + 1)
+                  for c in range(changes)])
+
+
+def timed(label, func, *args):
+    profile = start_query_profile(label)
+    start = time.time()
+    result = func(*args)
+    elapsed = time.time() - start
+    stop_query_profile()
+    print '%-35s %8.3f s %6d queries' % (label, elapsed, profile.count)
+    return result
+
+
+def main(tickets=1000, changes=5):
+    random.seed(0)
+    env = EnvironmentStub()
+    generate(env, tickets, changes)
+    tktids = range(1, tickets + 1)
+    print '%d tickets, %d changes per ticket' % (tickets, changes)
+
+    timed('per ticket', lambda: [per_ticket_recipients(env, env.config, t)
+                                 for t in tktids])
+    timed('bulk', get_tickets_notification_recipients, env, env.config,
+          tktids)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,96 @@
+#!/usr/bin/python
+#
+# Benchmark the permission store lookups on a synthetic permission table.
+#
+# Note: This is a development tool used in Trac QA, not something
+#       particularly useful for end-users.
+#
+# Usage: perm_benchmark.py [users [groups [depth]]]
+
+import random
+import sys
+import time
+
+from trac.perm import DefaultPermissionGroupProvider, \
+                      DefaultPermissionStore
+from trac.test import EnvironmentStub
+
+ACTIONS = ['WIKI_VIEW', 'WIKI_MODIFY', 'TICKET_VIEW', 'TICKET_CREATE',
+           'TICKET_MODIFY', 'REPORT_VIEW', 'MILESTONE_VIEW', 'TRAC_ADMIN']
+
+
+def fixed_point_permissions(perms, subjects):
+    """The algorithm used before the permission index, for comparison."""
+    subjects = set(subjects)
+    actions = set()
+    while True:
+        num_users = len(subjects)
+        num_actions = len(actions)
+        for user, action in perms:
+            if user in subjects:
+                if action.isupper():
+                    actions.add(action)
+                elif action not in subjects:
+                    subjects.add(action)
+        if num_users == len(subjects) and num_actions == len(actions):
+            break
+    return actions
+
+
+def generate(users, groups, depth):
+    rows = []
+    for level in range(depth):
+        for g in range(groups):
+            group = 'group%d_%d' % (level, g)
+            if level:
+                rows.append((group, 'group%d_%d' % (level - 1,
+                                                   random.randrange(groups))))
+            rows.append((group, random.choice(ACTIONS[:-1])))
+    for u in range(users):
+        user = 'user%d' % u
+        for i in range(2):
+            rows.append((user, 'group%d_%d' % (random.randrange(depth),
+                                               random.randrange(groups))))
+    rows.append(('user0', 'TRAC_ADMIN'))
+    rows.append(('authenticated', 'WIKI_VIEW'))
+    return list(set(rows))
+
+
+def timed(label, func, *args):
+    start = time.time()
+    result = func(*args)
+    print '%-45s %8.3f s' % (label, time.time() - start)
+    return result
+
+
+def main(users=20000, groups=200, depth=4):
+    random.seed(0)
+    env = EnvironmentStub(enable=[DefaultPermissionStore,
+                                  DefaultPermissionGroupProvider])
+    rows = generate(users, groups, depth)
+    env.db_transaction.executemany("INSERT INTO permission VALUES (%s,%s)",
+                                   rows)
+    env.known_users = [('user%d' % u, None, None) for u in range(users)]
+    store = DefaultPermissionStore(env)
+    print '%d users, %d groups, depth %d: %d permission records' % \
+          (users, groups * depth, depth, len(rows))
+
+    timed('build index', lambda: store._permission_index)
+    sample = ['user%d' % random.randrange(users) for i in range(100)]
+    timed('get_user_permissions x %d' % len(sample),
+          lambda: [store.get_user_permissions(u) for u in sample])
+    timed('fixed point x %d' % len(sample),
+          lambda: [fixed_point_permissions(rows, [u, 'anonymous',
+                                                  'authenticated'])
+                   for u in sample])
+    for u in sample:
+        assert set(store.get_user_permissions(u)) == \
+               fixed_point_permissions(rows, [u, 'anonymous', 'authenticated'])
+    timed("get_users_with_permissions(['TRAC_ADMIN'])",
+          store.get_users_with_permissions, ['TRAC_ADMIN'])
+    timed("get_users_with_permissions(['TICKET_MODIFY'])",
+          store.get_users_with_permissions, ['TICKET_MODIFY'])
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
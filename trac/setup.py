@@ -141,12 +141,14 @@ facilities.
         trac.versioncontrol.svn_authz = trac.versioncontrol.svn_authz
         trac.versioncontrol.web_ui = trac.versioncontrol.web_ui
         trac.web.auth = trac.web.auth
+        trac.web.metrics = trac.web.metrics
         trac.web.session = trac.web.session
         trac.wiki.admin = trac.wiki.admin
         trac.wiki.interwiki = trac.wiki.interwiki
         trac.wiki.macros = trac.wiki.macros
         trac.wiki.web_ui = trac.wiki.web_ui
         trac.wiki.web_api = trac.wiki.web_api
+        tracopt.db.sql_profiler = tracopt.db.sql_profiler
         tracopt.mimeview.enscript = tracopt.mimeview.enscript
         tracopt.mimeview.php = tracopt.mimeview.php
         tracopt.mimeview.silvercity = tracopt.mimeview.silvercity[SilverCity]
@@ -32,8 +32,10 @@ from genshi.builder import tag
 
 from trac.admin.api import IAdminPanelProvider
 from trac.core import *
+from trac.db.api import DatabaseManager
+from trac.db.pool import reset_pool_stats
 from trac.loader import get_plugin_info, get_plugins_dir
-from trac.perm import PermissionSystem, IPermissionRequestor
+from trac.perm import PermissionError, PermissionSystem, IPermissionRequestor
 from trac.util.datefmt import all_timezones
 from trac.util.text import exception_to_unicode, \
                             unicode_to_base64, unicode_from_base64
@@ -355,6 +357,38 @@ class LoggingAdminPanel(Component):
         return 'admin_logging.html', {'log': data}
 
 
+class DatabasePoolAdminPanel(Component):
+    """Show the usage statistics of the database connection pool."""
+
+    implements(IAdminPanelProvider)
+
+    # IAdminPanelProvider methods
+
+    def get_admin_panels(self, req):
+        if 'TRAC_ADMIN' in req.perm and not getattr(self.env, 'parent', None):
+            yield ('general', _('General'), 'dbpool', _('Database Pool'))
+
+    def render_admin_panel(self, req, cat, page, path_info):
+        if getattr(self.env, 'parent', None):
+            raise PermissionError()
+        req.perm.require('TRAC_ADMIN')
+
+        if req.method == 'POST':
+            if req.args.get('reset'):
+                reset_pool_stats()
+                add_notice(req, _('The statistics have been reset.'))
+            req.redirect(req.href.admin(cat, page))
+
+        dbm = DatabaseManager(self.env)
+        data = {
+            'stats': dbm.get_pool_stats(),
+            'min_size': dbm.pool_min_size,
+            'idle_timeout': dbm.pool_idle_timeout,
+            'timeout': dbm.timeout,
+        }
+        return 'admin_dbpool.html', data
+
+
 class PermissionAdminPanel(Component):
 
     implements(IAdminPanelProvider, IPermissionRequestor)
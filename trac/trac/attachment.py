@@ -26,13 +26,15 @@ import posixpath
 import re
 import shutil
 import sys
+import tempfile
+import threading
 import unicodedata
 
 from genshi.builder import tag
 
 from trac.admin import AdminCommandError, IAdminCommandProvider, PrefixList, \
                        console_datetime_format, get_dir_list
-from trac.config import BoolOption, IntOption
+from trac.config import BoolOption, ExtensionOption, IntOption
 from trac.core import *
 from trac.mimeview import *
 from trac.perm import PermissionError, IPermissionPolicy
@@ -41,7 +43,7 @@ from trac.search import search_to_sql, shorten_result
 from trac.util import content_disposition, get_reporter_id
 from trac.util.compat import sha1
 from trac.util.datefmt import format_datetime, from_utimestamp, \
-                              to_datetime, to_utimestamp, utc
+                              http_date, to_datetime, to_utimestamp, utc
 from trac.util.text import exception_to_unicode, path_to_unicode, \
                            pretty_size, print_table, unicode_unquote
 from trac.util.translation import _, tag_
@@ -117,6 +119,56 @@ class ILegacyAttachmentPolicyDelegate(Interface):
             """
 
 
+class IAttachmentStorage(Interface):
+    """Extension point interface for components storing the content of
+    attachments. (''since 1.0.2'')
+
+    The content of a new attachment is first stored in a ''blob'', outside
+    of any database transaction, and the blob is then linked to the
+    attachment while the attachment record is inserted.
+    """
+
+    def create_blob(fileobj):
+        """Store the content read from the `fileobj` file object in a new
+        blob.
+
+        Return a `(blob, size)` tuple, where `blob` identifies the blob
+        for `link_blob()` and `discard_blob()`, and `size` is the length
+        of the content.
+        """
+
+    def link_blob(blob, parent_realm, parent_id, filename):
+        """Make the blob the content of the given attachment.
+
+        Return `False` if the attachment already has content, so that
+        another filename can be used.
+        """
+
+    def discard_blob(blob):
+        """Remove a blob which has not been linked to an attachment."""
+
+    def open(parent_realm, parent_id, filename):
+        """Return a seekable file object, usable as a context manager,
+        reading the content of the attachment.
+
+        Raise an `IOError` if the attachment has no content.
+        """
+
+    def get_local_path(parent_realm, parent_id, filename):
+        """Return the path of a local file holding the content of the
+        attachment, or `None` if the content is stored elsewhere."""
+
+    def delete(parent_realm, parent_id, filename):
+        """Delete the content of the attachment, if it exists."""
+
+    def move(parent_realm, parent_id, filename, new_realm, new_id):
+        """Move the content of the attachment to another parent resource.
+
+        Raise a `TracError` if the new parent already has an attachment
+        with the same filename.
+        """
+
+
 class Attachment(object):
 
     def __init__(self, env, parent_realm_or_attachment_resource,
@@ -166,6 +218,12 @@ class Attachment(object):
                                      title=self.title),
                                    _('Invalid Attachment'))
 
+    def _exists(self, filename):
+        return bool(self.env.db_query("""
+            SELECT filename FROM attachment
+            WHERE type=%s AND id=%s AND filename=%s
+            """, (self.parent_realm, self.parent_id, filename)))
+
     # _get_path() and _get_hashed_filename() are class methods so that they
     # can be used in db28.py.
 
@@ -222,16 +280,8 @@ class Attachment(object):
             db("""
                 DELETE FROM attachment WHERE type=%s AND id=%s AND filename=%s
                     """, (self.parent_realm, self.parent_id, self.filename))
-            path = self.path
-            if os.path.isfile(path):
-                try:
-                    os.unlink(path)
-                except OSError, e:
-                    self.env.log.error("Failed to delete attachment "
-                                       "file %s: %s",
-                                       path,
-                                       exception_to_unicode(e, traceback=True))
-                    raise TracError(_("Could not delete attachment"))
+            AttachmentModule(self.env).storage.delete(
+                self.parent_realm, self.parent_id, self.filename)
 
         self.env.log.info("Attachment removed: %s" % self.title)
 
@@ -255,7 +305,7 @@ class Attachment(object):
                               '%(realm)s:%(id)s is invalid',
                               att=self.filename, realm=new_realm, id=new_id))
 
-        if os.path.exists(new_path):
+        if Attachment(self.env, new_realm, new_id)._exists(self.filename):
             raise TracError(_('Cannot reparent attachment "%(att)s" as '
                               'it already exists in %(realm)s:%(id)s',
                               att=self.filename, realm=new_realm, id=new_id))
@@ -264,19 +314,9 @@ class Attachment(object):
                   WHERE type=%s AND id=%s AND filename=%s
                   """, (new_realm, new_id, self.parent_realm, self.parent_id,
                         self.filename))
-            dirname = os.path.dirname(new_path)
-            if not os.path.exists(dirname):
-                os.makedirs(dirname)
-            path = self.path
-            if os.path.isfile(path):
-                try:
-                    os.rename(path, new_path)
-                except OSError, e:
-                    self.env.log.error("Failed to move attachment file %s: %s",
-                                       path,
-                                       exception_to_unicode(e, traceback=True))
-                    raise TracError(_("Could not reparent attachment %(name)s",
-                                      name=self.filename))
+            AttachmentModule(self.env).storage.move(
+                self.parent_realm, self.parent_id, self.filename,
+                new_realm, new_id)
 
         old_realm, old_id = self.parent_realm, self.parent_id
         self.parent_realm, self.parent_id = new_realm, new_id
@@ -298,11 +338,15 @@ class Attachment(object):
     def insert(self, filename, fileobj, size, t=None, db=None):
         """Create a new Attachment record and save the file content.
 
+        The content is read from `fileobj` before the record is inserted,
+        and the recorded size is the length of the content read.
+
         .. versionchanged :: 1.0
            the `db` parameter is no longer needed
            (will be removed in version 1.1.1)
+        .. versionchanged :: 1.0.2
+           the `size` parameter is ignored
         """
-        self.size = int(size) if size else 0
         self.filename = None
         if t is None:
             t = datetime.now(utc)
@@ -322,26 +366,50 @@ class Attachment(object):
                               att=filename, realm=self.parent_realm,
                               id=self.parent_id))
 
-        if not os.access(dir, os.F_OK):
-            os.makedirs(dir)
-        filename, targetfile = self._create_unique_file(dir, filename)
-        with targetfile:
-            with self.env.db_transaction as db:
-                db("INSERT INTO attachment VALUES (%s,%s,%s,%s,%s,%s,%s,%s)",
-                   (self.parent_realm, self.parent_id, filename, self.size,
-                    to_utimestamp(t), self.description, self.author,
-                    self.ipnr))
-                shutil.copyfileobj(fileobj, targetfile)
-                self.resource.id = self.filename = filename
-
-                self.env.log.info("New attachment: %s by %s", self.title,
-                                  self.author)
+        # Store the content without holding a database transaction
+        storage = AttachmentModule(self.env).storage
+        blob, self.size = storage.create_blob(fileobj)
+        linked = False
+        try:
+            parts = os.path.splitext(filename)
+            idx = 1
+            while 1:
+                if not self._exists(filename) and \
+                        storage.link_blob(blob, self.parent_realm,
+                                          self.parent_id, filename):
+                    # The blob is now released with the attachment content
+                    linked = True
+                    try:
+                        self.env.db_transaction("""
+                            INSERT INTO attachment
+                            VALUES (%s,%s,%s,%s,%s,%s,%s,%s)
+                            """, (self.parent_realm, self.parent_id,
+                                  filename, self.size, to_utimestamp(t),
+                                  self.description, self.author, self.ipnr))
+                    except:
+                        storage.delete(self.parent_realm, self.parent_id,
+                                       filename)
+                        raise
+                    break
+                idx += 1
+                # A sanity check
+                if idx > 100:
+                    raise TracError(_("Failed to create unique name: "
+                                      "%(name)s", name=filename))
+                filename = '%s.%d%s' % (parts[0], idx, parts[1])
+        except:
+            if not linked:
+                storage.discard_blob(blob)
+            raise
+        self.resource.id = self.filename = filename
+
+        self.env.log.info("New attachment: %s by %s", self.title,
+                          self.author)
 
         for listener in AttachmentModule(self.env).change_listeners:
             listener.attachment_added(self)
         ResourceSystem(self.env).resource_created(self)
 
-
     @classmethod
     def select(cls, env, parent_realm, parent_id, db=None):
         """Iterator yielding all `Attachment` instances attached to
@@ -372,7 +440,7 @@ class Attachment(object):
             for attachment in cls.select(env, parent_realm, parent_id, db):
                 attachment_dir = os.path.dirname(attachment.path)
                 attachment.delete()
-        if attachment_dir:
+        if attachment_dir and os.path.isdir(attachment_dir):
             try:
                 os.rmdir(attachment_dir)
             except OSError, e:
@@ -388,7 +456,7 @@ class Attachment(object):
                                               db)):
                 attachment_dir = os.path.dirname(attachment.path)
                 attachment.reparent(new_realm, new_id)
-        if attachment_dir:
+        if attachment_dir and os.path.isdir(attachment_dir):
             try:
                 os.rmdir(attachment_dir)
             except OSError, e:
@@ -396,45 +464,249 @@ class Attachment(object):
                     attachment_dir, exception_to_unicode(e, traceback=True))
 
     def open(self):
-        path = self.path
-        self.env.log.debug('Trying to open attachment at %s', path)
+        self.env.log.debug('Trying to open attachment %s', self.title)
         try:
-            fd = open(path, 'rb')
+            fd = AttachmentModule(self.env).storage.open(
+                self.parent_realm, self.parent_id, self.filename)
         except IOError:
             raise ResourceNotFound(_("Attachment '%(filename)s' not found",
                                      filename=self.filename))
         return fd
 
-    def _create_unique_file(self, dir, filename):
-        parts = os.path.splitext(filename)
+
+class FileSystemAttachmentStorage(Component):
+    """Store the content of attachments in files below the
+    `files/attachments` directory of the environment.
+    (''since 1.0.2'')"""
+
+    implements(IAttachmentStorage)
+
+    CHUNK_SIZE = 65536
+
+    # IAttachmentStorage methods
+
+    def create_blob(self, fileobj):
+        return self._write_temp_file(fileobj, self._attachments_dir)
+
+    def link_blob(self, blob, parent_realm, parent_id, filename):
+        path = self._get_path(parent_realm, parent_id, filename)
+        f = self._create_file(path)
+        if f is None:
+            return False
+        with f:
+            if os.name == 'nt':
+                # The reserved file can't be replaced by renaming
+                self._copy_blob(blob, f)
+            else:
+                os.rename(blob, path)
+        self.discard_blob(blob)
+        return True
+
+    def discard_blob(self, blob):
+        if os.path.isfile(blob):
+            os.unlink(blob)
+
+    def open(self, parent_realm, parent_id, filename):
+        return open(self._get_path(parent_realm, parent_id, filename), 'rb')
+
+    def get_local_path(self, parent_realm, parent_id, filename):
+        return self._get_path(parent_realm, parent_id, filename)
+
+    def delete(self, parent_realm, parent_id, filename):
+        path = self._get_path(parent_realm, parent_id, filename)
+        if os.path.isfile(path):
+            try:
+                os.unlink(path)
+            except OSError, e:
+                self.log.error("Failed to delete attachment file %s: %s",
+                               path, exception_to_unicode(e, traceback=True))
+                raise TracError(_("Could not delete attachment"))
+
+    def move(self, parent_realm, parent_id, filename, new_realm, new_id):
+        path = self._get_path(parent_realm, parent_id, filename)
+        new_path = self._get_path(new_realm, new_id, filename)
+        if os.path.exists(new_path):
+            raise TracError(_('Cannot reparent attachment "%(att)s" as '
+                              'it already exists in %(realm)s:%(id)s',
+                              att=filename, realm=new_realm, id=new_id))
+        self._make_parent_dir(new_path)
+        if os.path.isfile(path):
+            try:
+                os.rename(path, new_path)
+            except OSError, e:
+                self.log.error("Failed to move attachment file %s: %s",
+                               path, exception_to_unicode(e, traceback=True))
+                raise TracError(_("Could not reparent attachment %(name)s",
+                                  name=filename))
+
+    # Internal methods
+
+    @property
+    def _attachments_dir(self):
+        return os.path.join(self.env.path, 'files', 'attachments')
+
+    def _get_path(self, parent_realm, parent_id, filename):
+        return Attachment._get_path(self.env.path, parent_realm, parent_id,
+                                    filename)
+
+    def _make_parent_dir(self, path):
+        dirname = os.path.dirname(path)
+        if not os.path.exists(dirname):
+            os.makedirs(dirname)
+
+    def _create_file(self, path):
+        """Create a new file, or return `None` if it already exists."""
+        self._make_parent_dir(path)
         flags = os.O_CREAT + os.O_WRONLY + os.O_EXCL
         if hasattr(os, 'O_BINARY'):
             flags += os.O_BINARY
-        idx = 1
-        while 1:
-            path = os.path.join(dir, self._get_hashed_filename(filename))
+        try:
+            return os.fdopen(os.open(path, flags, 0666), 'wb')
+        except OSError, e:
+            if e.errno != errno.EEXIST:
+                raise
+            return None
+
+    def _copy_blob(self, blob, f):
+        with open(blob, 'rb') as source:
+            shutil.copyfileobj(source, f, self.CHUNK_SIZE)
+
+    def _write_temp_file(self, fileobj, dir, digest=None):
+        """Copy the content of `fileobj` to a new temporary file in `dir`,
+        updating `digest` with the content.
+
+        Return the path of the file and the length of the content.
+        """
+        if not os.path.exists(dir):
+            os.makedirs(dir)
+        fd, path = tempfile.mkstemp(prefix='.upload-', dir=dir)
+        size = 0
+        try:
+            f = os.fdopen(fd, 'wb')
+            try:
+                while 1:
+                    data = fileobj.read(self.CHUNK_SIZE)
+                    if not data:
+                        break
+                    if digest is not None:
+                        digest.update(data)
+                    f.write(data)
+                    size += len(data)
+            finally:
+                f.close()
+        except:
+            os.unlink(path)
+            raise
+        return path, size
+
+
+class DeduplicatingAttachmentStorage(FileSystemAttachmentStorage):
+    """Store the content of attachments like `FileSystemAttachmentStorage`,
+    but keep a single copy of identical contents. (''since 1.0.2'')
+
+    Each distinct content is stored once below the `files/blobs` directory
+    of the environment, named after its SHA-1 checksum, and the files of
+    the attachments are hard links to it. Where hard links are not
+    available, the files of the attachments are copies and the blobs are
+    kept when the attachments are deleted.
+    """
+
+    # IAttachmentStorage methods
+
+    def create_blob(self, fileobj):
+        digest = sha1()
+        path, size = self._write_temp_file(fileobj, self._blobs_dir, digest)
+        blob = self._get_blob_path(digest.hexdigest())
+        self._make_parent_dir(blob)
+        if os.path.exists(blob):
+            os.unlink(path)
+        else:
             try:
-                return filename, os.fdopen(os.open(path, flags, 0666), 'w')
+                os.rename(path, blob)
             except OSError, e:
+                # Stored concurrently by another upload, on Windows
                 if e.errno != errno.EEXIST:
                     raise
-                idx += 1
-                # A sanity check
-                if idx > 100:
-                    raise Exception('Failed to create unique name: ' + path)
-                filename = '%s.%d%s' % (parts[0], idx, parts[1])
+                os.unlink(path)
+        return blob, size
+
+    def link_blob(self, blob, parent_realm, parent_id, filename):
+        path = self._get_path(parent_realm, parent_id, filename)
+        if not hasattr(os, 'link'):
+            f = self._create_file(path)
+            if f is None:
+                return False
+            with f:
+                self._copy_blob(blob, f)
+            return True
+        self._make_parent_dir(path)
+        try:
+            os.link(blob, path)
+        except OSError, e:
+            if e.errno != errno.EEXIST:
+                raise
+            return False
+        return True
+
+    def discard_blob(self, blob):
+        self._release_blob(blob)
+
+    def delete(self, parent_realm, parent_id, filename):
+        path = self._get_path(parent_realm, parent_id, filename)
+        blob = None
+        if os.path.isfile(path) and os.stat(path).st_nlink == 2:
+            # Only linked from the blobs directory after the deletion
+            blob = self._get_blob_path(self._checksum(path))
+        super(DeduplicatingAttachmentStorage, self).delete(
+            parent_realm, parent_id, filename)
+        if blob:
+            self._release_blob(blob)
+
+    # Internal methods
+
+    @property
+    def _blobs_dir(self):
+        return os.path.join(self.env.path, 'files', 'blobs')
+
+    def _get_blob_path(self, checksum):
+        return os.path.join(self._blobs_dir, checksum[0:2], checksum)
+
+    def _checksum(self, path):
+        digest = sha1()
+        with open(path, 'rb') as f:
+            while 1:
+                data = f.read(self.CHUNK_SIZE)
+                if not data:
+                    break
+                digest.update(data)
+        return digest.hexdigest()
+
+    def _release_blob(self, blob):
+        # Remove the blob when no attachment links to it anymore
+        try:
+            if os.stat(blob).st_nlink == 1:
+                os.unlink(blob)
+        except OSError, e:
+            self.log.warning("Failed to remove attachment blob %s: %s",
+                             blob, exception_to_unicode(e))
 
 
 class AttachmentModule(Component):
 
     implements(IRequestHandler, INavigationContributor, IWikiSyntaxProvider,
-               IResourceManager)
+               IResourceManager, IAttachmentChangeListener)
 
     change_listeners = ExtensionPoint(IAttachmentChangeListener)
     manipulators = ExtensionPoint(IAttachmentManipulator)
 
     CHUNK_SIZE = 4096
 
+    storage = ExtensionOption('attachment', 'storage', IAttachmentStorage,
+                              'FileSystemAttachmentStorage',
+        """Name of the component storing the content of attachments.
+        `DeduplicatingAttachmentStorage` keeps a single copy of identical
+        files. (''since 1.0.2'')""")
+
     max_size = IntOption('attachment', 'max_size', 262144,
         """Maximum allowed file size (in bytes) for ticket and wiki
         attachments.""")
@@ -456,6 +728,14 @@ class AttachmentModule(Component):
         For public sites where anonymous users can create attachments it is
         recommended to leave this option disabled (which is the default).""")
 
+    prerender_previews = BoolOption('attachment', 'prerender_previews',
+                                    'false',
+        """Whether the preview of new attachments should be rendered in
+        a background thread as soon as they are uploaded, so that it is
+        already in the preview cache when the attachment is first viewed.
+        This has no effect unless `[mimeviewer] preview_cache_size` is set.
+        (''since 1.0.2'')""")
+
     # INavigationContributor methods
 
     def get_active_navigation_item(self, req):
@@ -686,12 +966,59 @@ class AttachmentModule(Component):
     def resource_exists(self, resource):
         try:
             attachment = Attachment(self.env, resource)
-            return os.path.exists(attachment.path)
         except ResourceNotFound:
             return False
+        # Only content stored in local files can be checked cheaply
+        path = self.storage.get_local_path(attachment.parent_realm,
+                                           attachment.parent_id,
+                                           attachment.filename)
+        return path is None or os.path.exists(path)
+
+    # IAttachmentChangeListener methods
+
+    def attachment_added(self, attachment):
+        if self.prerender_previews and \
+                Mimeview(self.env).preview_cache is not None and \
+                attachment.size < Mimeview(self.env).max_preview_size:
+            thread = threading.Thread(target=self._render_preview,
+                                      args=(attachment,))
+            thread.setDaemon(True)
+            thread.start()
+
+    def attachment_deleted(self, attachment):
+        pass
+
+    def attachment_reparented(self, attachment, old_parent_realm,
+                              old_parent_id):
+        pass
 
     # Internal methods
 
+    def _preview_cache_key(self, attachment):
+        """Return the key identifying the content of `attachment` in the
+        preview cache."""
+        return ('attachment', attachment.parent_realm, attachment.parent_id,
+                attachment.filename, to_utimestamp(attachment.date),
+                attachment.size)
+
+    def _render_preview(self, attachment):
+        """Render the preview of `attachment` the way it is shown on its
+        page, which stores it in the preview cache."""
+        try:
+            with attachment.open() as fd:
+                mimeview = Mimeview(self.env)
+                mime_type = mimeview.get_mimetype(attachment.filename,
+                                                  fd.read(1000))
+                fd.seek(0)
+                mimeview.preview_data(
+                    web_context(None, attachment.resource), fd,
+                    attachment.size, mime_type, attachment.filename,
+                    annotations=['lineno'],
+                    cache_key=self._preview_cache_key(attachment))
+        except Exception, e:
+            self.log.warning("Can't render the preview of %s: %s",
+                             attachment.title, exception_to_unicode(e))
+
     def _do_save(self, req, attachment):
         req.perm(attachment.resource).require('ATTACHMENT_CREATE')
         parent_resource = attachment.resource.parent
@@ -894,7 +1221,12 @@ class AttachmentModule(Component):
                 if 'charset=' not in mime_type:
                     charset = mimeview.get_charset(str_data, mime_type)
                     mime_type = mime_type + '; charset=' + charset
-                req.send_file(attachment.path, mime_type)
+                path = self.storage.get_local_path(attachment.parent_realm,
+                                                   attachment.parent_id,
+                                                   attachment.filename)
+                if path:
+                    req.send_file(path, mime_type)
+                self._send_content(req, attachment, fd, mime_type)
 
             # add ''Plain Text'' alternate link if needed
             if (self.render_unsafe_content and
@@ -916,10 +1248,27 @@ class AttachmentModule(Component):
 
             data['preview'] = mimeview.preview_data(
                 web_context(req, attachment.resource), fd,
-                os.fstat(fd.fileno()).st_size, mime_type,
-                attachment.filename, raw_href, annotations=['lineno'])
+                attachment.size, mime_type,
+                attachment.filename, raw_href, annotations=['lineno'],
+                cache_key=self._preview_cache_key(attachment))
             return data
 
+    def _send_content(self, req, attachment, fd, mime_type):
+        """Send the content of an attachment which is not stored in a
+        local file."""
+        req.send_response(200)
+        req.send_header('Content-Type', mime_type)
+        req.send_header('Content-Length', attachment.size)
+        req.send_header('Last-Modified', http_date(attachment.date))
+        req.end_headers()
+        if req.method != 'HEAD':
+            while 1:
+                data = fd.read(self.CHUNK_SIZE)
+                if not data:
+                    break
+                req.write(data)
+        raise RequestDone
+
     def _format_link(self, formatter, ns, target, label):
         link, params, fragment = formatter.split_link(target)
         ids = link.split(':', 2)
@@ -14,6 +14,7 @@
 from __future__ import with_statement
 
 from .core import Component
+from .db.api import DatabaseManager
 from .util import arity
 from .util.concurrency import ThreadLocal, threading
 
@@ -200,10 +201,14 @@ class CacheManager(Component):
         # Get cache metadata
         local_meta = self._local.meta
         local_cache = self._local.cache
+        # The generations must be read from the primary database, as
+        # a replica could be lagging behind the invalidations
+        dbm = DatabaseManager(getattr(self.env, 'parent', None) or self.env)
         if local_meta is None:
             # First cache usage in this request, retrieve cache metadata
             # from the database and make a thread-local copy of the cache
-            meta = self.env.db_query("SELECT id, generation FROM cache")
+            with dbm.primary_reads():
+                meta = self.env.db_query("SELECT id, generation FROM cache")
             self._local.meta = local_meta = dict(meta)
             self._local.cache = local_cache = self._cache.copy()
 
@@ -217,34 +222,37 @@ class CacheManager(Component):
         except KeyError:
             pass
 
-        with self.env.db_query as db:
-            with self._lock:
-                # Get data from the process cache
-                try:
-                    (data, generation) = local_cache[id] = self._cache[id]
-                    if generation == db_generation:
+        with dbm.primary_reads():
+            with self.env.db_query as db:
+                with self._lock:
+                    # Get data from the process cache
+                    try:
+                        (data, generation) = local_cache[id] = \
+                            self._cache[id]
+                        if generation == db_generation:
+                            return data
+                    except KeyError:
+                        generation = None   # Force retrieval from the DB
+
+                    # Check if the process cache has the newest version, as
+                    # it may have been updated after the metadata retrieval
+                    for db_generation, in db(
+                            "SELECT generation FROM cache WHERE id=%s", (id,)):
+                        break
+                    else:
+                        db_generation = -1
+                    if db_generation == generation:
                         return data
-                except KeyError:
-                    generation = None   # Force retrieval from the database
-
-                # Check if the process cache has the newest version, as it may
-                # have been updated after the metadata retrieval
-                for db_generation, in db(
-                        "SELECT generation FROM cache WHERE id=%s", (id,)):
-                    break
-                else:
-                    db_generation = -1
-                if db_generation == generation:
-                    return data
 
-                # Retrieve data from the database
-                if arity(retriever) == 2:
-                    data = retriever(instance, db)
-                else:
-                    data = retriever(instance)
-                local_cache[id] = self._cache[id] = (data, db_generation)
-                local_meta[id] = db_generation
-                return data
+                    # Retrieve data from the database
+                    if arity(retriever) == 2:
+                        data = retriever(instance, db)
+                    else:
+                        data = retriever(instance)
+                    local_cache[id] = self._cache[id] = \
+                        (data, db_generation)
+                    local_meta[id] = db_generation
+                    return data
 
     def invalidate(self, id):
         """Invalidate cached data for the given id."""
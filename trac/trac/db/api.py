@@ -20,14 +20,15 @@ import os
 import time
 import urllib
 
-from trac.config import BoolOption, IntOption, Option
+from trac.config import BoolOption, IntOption, ListOption, Option
 from trac.core import *
-from trac.util.concurrency import ThreadLocal
-from trac.util.text import unicode_passwd
+from trac.util.concurrency import ThreadLocal, threading
+from trac.util.text import exception_to_unicode, unicode_passwd
 from trac.util.translation import _
 
-from .pool import ConnectionPool
-from .util import ConnectionWrapper
+from .pool import ConnectionPool, get_pool_stats
+from .profiler import start_query_profile, stop_query_profile
+from .util import ConnectionWrapper, is_select
 
 
 def with_transaction(env, db=None):
@@ -97,6 +98,7 @@ def with_transaction(env, db=None):
                 fn(ldb)
                 ldb.commit()
                 _transaction_local.wdb = None
+                _transaction_local.written = True
             except:
                 _transaction_local.wdb = None
                 ldb.rollback()
@@ -138,49 +140,127 @@ class TransactionContextManager(DbContextManager):
     """
 
     def __enter__(self):
-        db = self.dbmgr._transaction_local.wdb # outermost writable db
+        tl = self.dbmgr._transaction_local
+        db = tl.wdb # outermost writable db
         if not db:
-            db = self.dbmgr._transaction_local.rdb # reuse wrapped connection
-            if db:
+            db = tl.rdb # reuse wrapped connection
+            if db and not tl.replica:
                 db = ConnectionWrapper(db.cnx, db.log)
             else:
                 db = self.dbmgr.get_connection()
-            self.dbmgr._transaction_local.wdb = self.db = db
+            tl.wdb = self.db = db
         return db
 
     def __exit__(self, et, ev, tb):
         if self.db:
-            self.dbmgr._transaction_local.wdb = None
+            tl = self.dbmgr._transaction_local
+            tl.wdb = None
             if et is None:
                 self.db.commit()
+                tl.written = True
             else:
                 self.db.rollback()
-            if not self.dbmgr._transaction_local.rdb:
+            if not tl.rdb or tl.replica:
                 self.db.close()
 
 
 class QueryContextManager(DbContextManager):
     """Database Context Manager for retrieving a read-only
     `~trac.db.util.ConnectionWrapper`.
+
+    When `[trac] database_replicas` are configured, the outermost
+    such context manager gets its connection from a replica, unless
+    the thread already committed a transaction during the current
+    request or reads from the primary database were requested with
+    `DatabaseManager.primary_reads`.
     """
 
     def __enter__(self):
-        db = self.dbmgr._transaction_local.rdb # outermost readonly db
-        if not db:
-            db = self.dbmgr._transaction_local.wdb # reuse wrapped connection
+        tl = self.dbmgr._transaction_local
+        db = tl.rdb # outermost readonly db
+        if db and tl.replica and (tl.wdb or tl.written or tl.primary):
+            # The replica may lag behind the writes of this thread
+            if tl.wdb:
+                db = ConnectionWrapper(tl.wdb.cnx, tl.wdb.log, readonly=True)
+            else:
+                db = self.db = self.dbmgr.get_connection(readonly=True)
+        elif not db:
+            db = tl.wdb # reuse wrapped connection
             if db:
                 db = ConnectionWrapper(db.cnx, db.log, readonly=True)
             else:
-                db = self.dbmgr.get_connection(readonly=True)
-            self.dbmgr._transaction_local.rdb = self.db = db
+                db = self.dbmgr.get_query_connection()
+            tl.rdb = self.db = db
         return db
 
     def __exit__(self, et, ev, tb):
         if self.db:
-            self.dbmgr._transaction_local.rdb = None
-            if not self.dbmgr._transaction_local.wdb:
+            tl = self.dbmgr._transaction_local
+            if self.db is not tl.rdb:
+                self.db.close()
+                return
+            tl.rdb = None
+            tl.replica = False
+            if not tl.wdb:
                 self.db.close()
 
+    def iterate(self, query, params=None, arraysize=None):
+        """Execute a SELECT `query` and iterate over the resulting rows,
+        without loading the whole result set in memory.
+
+        The rows are fetched `arraysize` at a time, which defaults to
+        the `[trac] database_fetch_size` option. The connection is
+        obtained and the query executed when the iteration starts, and
+        the connection stays open until the iteration is complete or
+        the iterator is closed.
+
+        :see: `~trac.db.util.ConnectionWrapper.iterate`
+        """
+        if not is_select(query):
+            raise ValueError("only a SELECT can be iterated")
+        if arraysize is None:
+            arraysize = self.dbmgr.fetch_size
+        return self._iterate(query, params, arraysize)
+
+    def _iterate(self, query, params, arraysize):
+        # An iterator dropped before it is started never takes the
+        # connection, so the context can't be left open
+        with self as db:
+            rows = db.iterate(query, params, arraysize)
+            try:
+                for row in rows:
+                    yield row
+            finally:
+                rows.close()
+
+
+class PrimaryReadsContextManager(object):
+    """Context manager within which the read-only connections are
+    obtained from the primary database, never from a replica.
+
+    :see: `DatabaseManager.primary_reads`
+    """
+
+    def __init__(self, dbmgr):
+        self.dbmgr = dbmgr
+
+    def __enter__(self):
+        self.dbmgr._transaction_local.primary += 1
+
+    def __exit__(self, et, ev, tb):
+        self.dbmgr._transaction_local.primary -= 1
+
+
+class DatabaseReplica(object):
+    """Routing state of a read replica of the database."""
+
+    def __init__(self, index, pool):
+        self.index = index
+        self.pool = pool
+        self.down_until = 0
+        self.lag_checked = 0
+        self.lag = None
+
 
 class IDatabaseConnector(Interface):
     """Extension point interface for components that support the
@@ -240,9 +320,62 @@ class DatabaseManager(Component):
         """Show the SQL queries in the Trac log, at DEBUG level.
         ''(Since 0.11.5)''""")
 
+    sql_profile = BoolOption('trac', 'sql_profile', False,
+        """Gather statistics about the SQL queries executed during each
+        request, and log a summary at INFO level: number of queries,
+        time spent in the database and in SQL translation. Statements
+        executed at least `duplicate_query_threshold` times during a
+        request are reported as warnings. ''(Since 1.0.2)''""")
+
+    slow_query_threshold = IntOption('trac', 'slow_query_threshold', '0',
+        """Duration, in milliseconds, above which a query is logged as a
+        warning, together with the component issuing it. Use '0' to
+        disable the slow query log. ''(Since 1.0.2)''""")
+
+    duplicate_query_threshold = IntOption('trac',
+                                          'duplicate_query_threshold', '10',
+        """Number of executions of the same SQL statement within a
+        request above which `sql_profile` reports it, as it usually
+        reveals a query issued in a loop. ''(Since 1.0.2)''""")
+
+    fetch_size = IntOption('trac', 'database_fetch_size', '1000',
+        """Number of rows retrieved at a time when iterating over large
+        result sets with a streaming cursor (`db_query.iterate`).
+        ''(Since 1.0.2)''""")
+
+    pool_min_size = IntOption('trac', 'database_pool_min_size', '0',
+        """Number of idle database connections kept open in the
+        connection pool. These connections are opened as soon as the
+        environment first accesses the database. ''(Since 1.0.2)''""")
+
+    pool_idle_timeout = IntOption('trac', 'database_pool_idle_timeout',
+                                  '120',
+        """Number of seconds after which idle connections in excess of
+        `database_pool_min_size` are closed. ''(Since 1.0.2)''""")
+
+    replica_uris = ListOption('trac', 'database_replicas', '',
+        doc="""Comma-separated list of database connection strings of
+        read-only replicas of the `database` (e.g. PostgreSQL hot
+        standbys). Read-only queries are distributed among them in
+        turn, unless the request has already written to the database.
+        ''(Since 1.0.2)''""")
+
+    replica_max_lag = IntOption('trac', 'database_replica_max_lag', '30',
+        """Maximum replication delay, in seconds, for a replica to be
+        used. Use '0' to disable the replication delay check.
+        ''(Since 1.0.2)''""")
+
+    replica_check_interval = 10
+    replica_retry_delay = 60
+
     def __init__(self):
         self._cnx_pool = None
-        self._transaction_local = ThreadLocal(wdb=None, rdb=None)
+        self._transaction_local = ThreadLocal(wdb=None, rdb=None,
+                                              replica=False, written=False,
+                                              primary=0)
+        self._replicas = None
+        self._replica_lock = threading.Lock()
+        self._replica_next = 0
 
     def init_db(self):
         connector, args = self.get_connector()
@@ -258,20 +391,152 @@ class DatabaseManager(Component):
         """
         if not self._cnx_pool:
             connector, args = self.get_connector()
-            self._cnx_pool = ConnectionPool(5, connector, **args)
+            self._cnx_pool = ConnectionPool(5, connector,
+                                            minsize=self.pool_min_size,
+                                            idle_timeout=
+                                                self.pool_idle_timeout,
+                                            **args)
+            if self.pool_min_size > 0:
+                self._cnx_pool.prewarm()
         db = self._cnx_pool.get_cnx(self.timeout or None)
         if readonly:
             db = ConnectionWrapper(db, readonly=True)
         return db
 
+    def get_query_connection(self):
+        """Get a read-only database connection for running queries.
+
+        The connection is taken from an available replica if any,
+        otherwise from the primary database.
+        """
+        tl = self._transaction_local
+        if self.replica_uris and not (tl.written or tl.primary):
+            db = self._get_replica_connection()
+            if db:
+                tl.replica = True
+                return db
+        return self.get_connection(readonly=True)
+
+    def primary_reads(self):
+        """Return a context manager within which read-only connections
+        are obtained from the primary database.
+
+        This is meant for reads which must not lag behind writes made
+        by other processes, like the cache generations.
+        """
+        return PrimaryReadsContextManager(self)
+
+    def _get_replica_connection(self):
+        with self._replica_lock:
+            if self._replicas is None:
+                self._replicas = []
+                for idx, uri in enumerate(self.replica_uris):
+                    connector, args = self.get_connector(uri)
+                    pool = ConnectionPool(5, connector,
+                                          idle_timeout=self.pool_idle_timeout,
+                                          **args)
+                    self._replicas.append(DatabaseReplica(idx, pool))
+            replicas = self._replicas[self._replica_next:] + \
+                       self._replicas[:self._replica_next]
+            self._replica_next = (self._replica_next + 1) % len(replicas)
+        now = time.time()
+        for replica in replicas:
+            if replica.down_until > now:
+                continue
+            try:
+                db = replica.pool.get_cnx(self.timeout or None)
+            except Exception, e:
+                self.log.warning("Database replica #%d unavailable: %s",
+                                 replica.index, exception_to_unicode(e))
+                replica.down_until = now + self.replica_retry_delay
+                continue
+            if self.replica_max_lag and \
+                    replica.lag_checked + self.replica_check_interval <= now:
+                replica.lag_checked = now
+                get_replication_lag = getattr(db, 'get_replication_lag',
+                                              None)
+                if get_replication_lag:
+                    try:
+                        replica.lag = get_replication_lag()
+                    except Exception, e:
+                        self.log.warning("Replication lag of database "
+                                         "replica #%d unknown: %s",
+                                         replica.index,
+                                         exception_to_unicode(e))
+                        replica.lag = None
+                    if replica.lag is None:
+                        replica.down_until = now + self.replica_retry_delay
+            if replica.down_until > now or \
+                    (self.replica_max_lag and replica.lag is not None and
+                     replica.lag > self.replica_max_lag):
+                db.close()
+                continue
+            return ConnectionWrapper(db, readonly=True)
+
     def get_exceptions(self):
         return self.get_connector()[0].get_exceptions()
 
+    def get_pool_stats(self):
+        """Return the usage statistics of the process-wide connection
+        pool.
+
+        :see: `~trac.db.pool.ConnectionPoolBackend.get_stats`
+        """
+        return get_pool_stats()
+
+    def release_primary(self):
+        """Let the read-only queries of the current thread be routed
+        to the replicas again, after the thread committed a transaction.
+
+        This is done at the end of each request.
+        """
+        self._transaction_local.written = False
+
+    def start_query_profile(self, name=None):
+        """Start gathering statistics about the SQL queries executed by
+        the current thread, if `sql_profile` or `slow_query_threshold`
+        is set.
+
+        :return: the active `QueryProfile`, or `None` if profiling is
+                 disabled.
+        :since: 1.0.2
+        """
+        if not self.sql_profile and self.slow_query_threshold <= 0:
+            return None
+        return start_query_profile(name, self.log,
+                                   self.slow_query_threshold / 1000.0)
+
+    def end_query_profile(self):
+        """Stop gathering statistics about the SQL queries executed by
+        the current thread, and log them if `sql_profile` is set.
+
+        :return: the `QueryProfile` which was active, if any.
+        :since: 1.0.2
+        """
+        profile = stop_query_profile()
+        if profile is None or not self.sql_profile:
+            return profile
+        self.log.info("SQL profile: name=%s queries=%d statements=%d "
+                      "db_ms=%.1f translate_ms=%.1f elapsed_ms=%.1f slow=%d",
+                      profile.name, profile.count, len(profile.statements),
+                      profile.duration * 1000,
+                      profile.translation_time * 1000,
+                      profile.elapsed * 1000, len(profile.slow))
+        for stats in profile.get_duplicates(self.duplicate_query_threshold):
+            self.log.warning("SQL profile: name=%s repeated=%d db_ms=%.1f "
+                             "caller=%s sql=%s", profile.name, stats.count,
+                             stats.duration * 1000, stats.caller or '?',
+                             ' '.join(stats.sql.split()))
+        return profile
+
     def shutdown(self, tid=None):
+        self.release_primary()
         if self._cnx_pool:
             self._cnx_pool.shutdown(tid)
             if not tid:
                 self._cnx_pool = None
+        if not tid:
+            self._replicas = None
 
     def backup(self, dest=None):
         """Save a backup of the database.
@@ -296,8 +561,11 @@ class DatabaseManager(Component):
             os.makedirs(backup_dir)
         return connector.backup(dest)
 
-    def get_connector(self):
-        scheme, args = _parse_db_str(self.connection_uri)
+    def get_connector(self, connection_uri=None):
+        """Return the `IDatabaseConnector` and the connection arguments
+        for the given connection string, by default the `database`.
+        """
+        scheme, args = _parse_db_str(connection_uri or self.connection_uri)
         candidates = [
             (priority, connector)
             for connector in self.connectors
@@ -34,21 +34,29 @@ try:
     import MySQLdb.cursors
     has_mysqldb = True
 
-    class MySQLUnicodeCursor(MySQLdb.cursors.Cursor):
+    class MySQLUnicodeCursorMixIn(object):
         def _convert_row(self, row):
             return tuple(v.decode('utf-8') if isinstance(v, str) else v
                          for v in row)
         def fetchone(self):
-            row = super(MySQLUnicodeCursor, self).fetchone()
+            row = super(MySQLUnicodeCursorMixIn, self).fetchone()
             return self._convert_row(row) if row else None
         def fetchmany(self, num):
-            rows = super(MySQLUnicodeCursor, self).fetchmany(num)
+            rows = super(MySQLUnicodeCursorMixIn, self).fetchmany(num)
             return [self._convert_row(row) for row in rows] \
                    if rows is not None else []
         def fetchall(self):
-            rows = super(MySQLUnicodeCursor, self).fetchall()
+            rows = super(MySQLUnicodeCursorMixIn, self).fetchall()
             return [self._convert_row(row) for row in rows] \
                    if rows is not None else []
+
+    class MySQLUnicodeCursor(MySQLUnicodeCursorMixIn,
+                             MySQLdb.cursors.Cursor):
+        pass
+
+    class MySQLUnicodeSSCursor(MySQLUnicodeCursorMixIn,
+                               MySQLdb.cursors.SSCursor):
+        pass
 except ImportError:
     has_mysqldb = False
 
@@ -72,6 +80,10 @@ class MySQLConnector(Component):
      * `read_default_file`: Read default client values from the given file
      * `read_default_group`: Configuration group to use from the default file
      * `unix_socket`: Use a Unix socket at the given path to connect
+     * `cursor`: Set to `unbuffered` for retrieving the rows of large
+       result sets from the server as they are iterated (`SSCursor`).
+       As MySQL doesn't allow other queries on the connection until
+       such a result set is exhausted, this is off by default.
     """
     implements(IDatabaseConnector)
 
@@ -250,8 +262,11 @@ class MySQLConnection(ConnectionWrapper):
         if port == None:
             port = 3306
         opts = {}
+        self._unbuffered = False
         for name, value in params.iteritems():
-            if name in ('init_command', 'read_default_file',
+            if name == 'cursor':
+                self._unbuffered = value == 'unbuffered'
+            elif name in ('init_command', 'read_default_file',
                         'read_default_group', 'unix_socket'):
                 opts[name] = value
             elif name in ('compress', 'named_pipe'):
@@ -302,6 +317,21 @@ class MySQLConnection(ConnectionWrapper):
         # MySQL handles sequence updates automagically
         pass
 
+    def get_replication_lag(self):
+        """Return the replication delay of this slave server in seconds,
+        0 for a master server or `None` if replication is stopped.
+        """
+        cursor = self.cnx.cursor()
+        try:
+            cursor.execute("SHOW SLAVE STATUS")
+            row = cursor.fetchone()
+            if not row:
+                return 0
+            cols = [d[0] for d in cursor.description]
+            return row[cols.index('Seconds_Behind_Master')]
+        finally:
+            cursor.close()
+
     def rollback(self):
         self.cnx.ping()
         try:
@@ -319,3 +349,8 @@ class MySQLConnection(ConnectionWrapper):
 
     def cursor(self):
         return IterableCursor(MySQLUnicodeCursor(self.cnx), self.log)
+
+    def stream_cursor(self):
+        if not self._unbuffered:
+            return self.cursor()
+        return IterableCursor(MySQLUnicodeSSCursor(self.cnx), self.log)
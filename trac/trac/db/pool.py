@@ -31,6 +31,39 @@ class TimeoutError(Exception):
     available after a given timeout."""
 
 
+class DurationHistogram(object):
+    """Distribution of durations (in seconds), counted in buckets
+    delimited by the given upper `bounds`.
+    """
+
+    def __init__(self, bounds=(0.001, 0.01, 0.1, 1, 10)):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, duration):
+        idx = 0
+        for bound in self.bounds:
+            if duration <= bound:
+                break
+            idx += 1
+        self.counts[idx] += 1
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+
+    def as_dict(self):
+        """Return the distribution as a dictionary, with the `buckets`
+        given as a list of `(upper_bound, count)` tuples, the last
+        upper bound being `None`.
+        """
+        return {'buckets': zip(self.bounds + (None,), self.counts),
+                'count': self.count, 'total': self.total, 'max': self.max,
+                'mean': self.total / self.count if self.count else 0.0}
+
+
 class PooledConnection(ConnectionWrapper):
     """A database connection that can be pooled. When closed, it gets returned
     to the pool.
@@ -65,6 +98,82 @@ class ConnectionPoolBackend(object):
         self._pool_key = []
         self._pool_time = []
         self._waiters = 0
+        self._settings = {}
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._checkout_time = {}
+        self._stats = dict.fromkeys(('checkouts', 'reuses', 'waits',
+                                     'timeouts', 'created', 'reaped'), 0)
+        self._wait_histogram = DurationHistogram()
+        self._checkout_histogram = DurationHistogram()
+
+    def configure(self, kwargs, minsize=0, idle_timeout=120):
+        """Set the number of idle connections to keep in the pool and
+        the delay after which the other idle connections are closed,
+        for the connections created with `kwargs`.
+        """
+        with self._available:
+            self._settings[unicode(kwargs)] = (minsize, idle_timeout)
+
+    def prewarm(self, connector, kwargs):
+        """Open new connections until the configured minimum number of
+        idle connections for `kwargs` is reached, within the limit of
+        the pool size.
+
+        Return the number of connections opened.
+        """
+        key = unicode(kwargs)
+        with self._available:
+            minsize = self._settings.get(key, (0, None))[0]
+            needed = min(minsize - self._pool_key.count(key),
+                         self._maxsize - len(self._active) - len(self._pool))
+        cnxs = []
+        for i in xrange(needed):
+            cnx = connector.get_connection(**kwargs)
+            if not cnx.poolable or cnx in cnxs:
+                break # e.g. in-memory SQLite database
+            cnxs.append(cnx)
+        opened = 0
+        with self._available:
+            for cnx in cnxs:
+                if len(self._active) + len(self._pool) >= self._maxsize:
+                    cnx.close()
+                    continue
+                self._pool.append(cnx)
+                self._pool_key.append(key)
+                self._pool_time.append(time.time())
+                self._stats['created'] += 1
+                opened += 1
+            self._available.notify(opened)
+        return opened
+
+    def get_stats(self):
+        """Return a snapshot of the pool usage statistics, as a
+        dictionary.
+
+        Besides the current number of `active` and `idle` connections
+        and of `waiters`, the counters are accumulated since the pool
+        was created, or since the last `reset_stats`: number of
+        `checkouts` of a connection by a thread, of `reuses` of the
+        connection already held by a thread, of `waits` for a
+        connection to become available and of `timeouts`, number of
+        connections `created` and of idle connections `reaped`. The
+        time spent waiting for a connection (`wait_time`) and the time
+        a connection was held by a thread (`checkout_time`) are given
+        as `DurationHistogram` dictionaries.
+        """
+        with self._available:
+            stats = dict(self._stats)
+            stats.update(maxsize=self._maxsize, active=len(self._active),
+                         idle=len(self._pool), waiters=self._waiters,
+                         wait_time=self._wait_histogram.as_dict(),
+                         checkout_time=self._checkout_histogram.as_dict())
+        return stats
+
+    def reset_stats(self):
+        with self._available:
+            self._reset_stats()
 
     def get_cnx(self, connector, kwargs, timeout=None):
         cnx = None
@@ -78,12 +187,14 @@ class ConnectionPoolBackend(object):
             if (tid, key) in self._active:
                 cnx, num = self._active[(tid, key)]
                 num += 1
+                self._stats['reuses'] += 1
             else:
                 if self._waiters == 0:
                     cnx = self._take_cnx(connector, kwargs, key, tid)
                 if not cnx:
                     self._waiters += 1
-                    self._available.wait()
+                    self._stats['waits'] += 1
+                    self._available.wait(timeout)
                     self._waiters -= 1
                     cnx = self._take_cnx(connector, kwargs, key, tid)
                 num = 1
@@ -112,10 +223,17 @@ class ConnectionPoolBackend(object):
                 cnx = None
 
         if cnx:
-            if deferred:
-                # replace placeholder with real Connection
-                with self._available:
+            with self._available:
+                if deferred:
+                    # replace placeholder with real Connection
                     self._active[(tid, key)] = (cnx, num)
+                    if op != 'ping':
+                        self._stats['created'] += 1
+                if num == 1:
+                    now = time.time()
+                    self._checkout_time[(tid, key)] = now
+                    self._stats['checkouts'] += 1
+                    self._wait_histogram.add(now - start)
             return PooledConnection(self, cnx, key, tid, log)
 
         if deferred:
@@ -126,6 +244,8 @@ class ConnectionPoolBackend(object):
                 return self.get_cnx(connector, kwargs)
 
         # if we didn't get a cnx after wait(), something's fishy...
+        with self._available:
+            self._stats['timeouts'] += 1
         timeout = time.time() - start
         errmsg = _("Unable to get database connection within %(time)d seconds.",
                    time=timeout)
@@ -164,6 +284,9 @@ class ConnectionPoolBackend(object):
             cnx, num = self._active[(tid, key)]
             if num == 1:
                 del self._active[(tid, key)]
+                since = self._checkout_time.pop((tid, key), None)
+                if since is not None:
+                    self._checkout_histogram.add(time.time() - since)
             else:
                 self._active[(tid, key)] = (cnx, num - 1)
         if num == 1:
@@ -182,21 +305,41 @@ class ConnectionPoolBackend(object):
                 self._available.notify()
 
     def shutdown(self, tid=None):
-        """Close pooled connections not used in a while"""
-        delay = 120
-        if tid is None:
-            delay = 0
-        when = time.time() - delay
+        """Close pooled connections not used in a while.
+
+        Connections idle for longer than the `idle_timeout` configured
+        for their key are closed, as long as at least `minsize` idle
+        connections remain for that key.
+        """
+        now = time.time()
         with self._available:
             if tid is None: # global shutdown, also close active connections
                 for db, num in self._active.values():
                     db.close()
                 self._active = {}
-            while self._pool_time and self._pool_time[0] <= when:
-                db = self._pool.pop(0)
-                db.close()
-                self._pool_key.pop(0)
-                self._pool_time.pop(0)
+                self._checkout_time = {}
+                while self._pool:
+                    self._pool.pop(0).close()
+                    self._pool_key.pop(0)
+                    self._pool_time.pop(0)
+                return
+            idle = {}
+            for key in self._pool_key:
+                idle[key] = idle.get(key, 0) + 1
+            idx = 0
+            while idx < len(self._pool):
+                key = self._pool_key[idx]
+                minsize, idle_timeout = self._settings.get(key, (0, 120))
+                if self._pool_time[idx] > now - idle_timeout:
+                    idx += 1 # connections are ordered by time for a key
+                elif idle[key] > minsize:
+                    self._pool.pop(idx).close()
+                    self._pool_key.pop(idx)
+                    self._pool_time.pop(idx)
+                    idle[key] -= 1
+                    self._stats['reaped'] += 1
+                else:
+                    idx += 1
 
 
 _pool_size = int(os.environ.get('TRAC_DB_POOL_SIZE', 10))
@@ -204,14 +347,32 @@ _backend = ConnectionPoolBackend(_pool_size)
 
 
 class ConnectionPool(object):
-    def __init__(self, maxsize, connector, **kwargs):
+    def __init__(self, maxsize, connector, minsize=0, idle_timeout=120,
+                 **kwargs):
         # maxsize not used right now but kept for api compatibility
         self._connector = connector
         self._kwargs = kwargs
+        _backend.configure(kwargs, minsize, idle_timeout)
 
     def get_cnx(self, timeout=None):
         return _backend.get_cnx(self._connector, self._kwargs, timeout)
 
+    def prewarm(self):
+        return _backend.prewarm(self._connector, self._kwargs)
+
     def shutdown(self, tid=None):
         _backend.shutdown(tid)
 
+
+
+def get_pool_stats():
+    """Return the usage statistics of the process-wide connection pool.
+
+    :see: `ConnectionPoolBackend.get_stats`
+    """
+    return _backend.get_stats()
+
+
+def reset_pool_stats():
+    """Reset the usage statistics of the process-wide connection pool."""
+    _backend.reset_stats()
@@ -14,7 +14,7 @@
 #
 # Author: Christopher Lenz <cmlenz@gmx.de>
 
-import re, os
+import itertools, re, os
 
 from genshi import Markup
 
@@ -45,6 +45,8 @@ except ImportError:
 
 _like_escape_re = re.compile(r'([/_%])')
 
+_stream_cursor_ids = itertools.count(1)
+
 # Mapping from "abstract" SQL types to DB-specific types
 _type_map = {
     'int64': 'bigint',
@@ -258,6 +260,34 @@ class PostgreSQLConnection(ConnectionWrapper):
             SELECT setval('"%s_%s_seq"', (SELECT MAX(id) FROM %s))
             """ % (table, column, table))
 
+    def get_replication_lag(self):
+        """Return the number of seconds since the last transaction
+        replayed on this hot standby server, or 0 for a primary server
+        or a standby server which replayed all the changes it received.
+        """
+        cursor = self.cnx.cursor()
+        try:
+            # Without new transactions on the primary server, the last
+            # replayed one only gets older
+            cursor.execute("""
+                SELECT CASE WHEN NOT pg_is_in_recovery() OR
+                                 pg_last_xlog_receive_location() =
+                                 pg_last_xlog_replay_location()
+                            THEN 0
+                            ELSE COALESCE(EXTRACT(EPOCH FROM
+                                now() - pg_last_xact_replay_timestamp()), 0)
+                            END""")
+            return float(cursor.fetchone()[0])
+        finally:
+            cursor.close()
+
     def cursor(self):
         return IterableCursor(self.cnx.cursor(), self.log)
 
+    def stream_cursor(self):
+        """Return a named cursor, for which the result set is kept on
+        the server side and transferred as the rows are fetched.
+        """
+        name = 'trac_stream_%d' % _stream_cursor_ids.next()
+        return IterableCursor(self.cnx.cursor(name), self.log)
+
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at http://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at http://trac.edgewall.org/log/.
+
+"""Gathering of SQL query statistics, typically for a single request.
+
+A `QueryProfile` is installed for the current thread using
+`start_query_profile()`; while it is active, every statement executed
+through an `IterableCursor` is timed and recorded in the profile.
+"""
+
+import sys
+import time
+
+from trac.core import Component
+from trac.util.concurrency import ThreadLocal
+
+__all__ = ['QueryProfile', 'get_query_profile', 'start_query_profile',
+           'stop_query_profile']
+
+
+_SKIPPED_MODULES = frozenset(['trac.db.api', 'trac.db.mysql_backend',
+                              'trac.db.pool', 'trac.db.postgres_backend',
+                              'trac.db.profiler', 'trac.db.sqlite_backend',
+                              'trac.db.util', 'multiproduct.dbcursor'])
+
+_local = ThreadLocal(profile=None)
+
+
+class QueryStats(object):
+    """Statistics for one SQL statement."""
+
+    __slots__ = ('sql', 'count', 'duration', 'max', 'caller')
+
+    def __init__(self, sql, caller):
+        self.sql = sql
+        self.count = 0
+        self.duration = 0.0
+        self.max = 0.0
+        self.caller = caller
+
+
+class QueryProfile(object):
+    """Collect the count and duration of the SQL queries executed by
+    the current thread.
+
+    Statements are grouped by their SQL text, so a statement executed
+    many times with different parameters (the typical "N+1" pattern)
+    shows up as a single entry with a high count.
+
+    Queries taking longer than `slow_threshold` seconds are logged as
+    warnings on `log`, together with the component issuing them.
+    """
+
+    def __init__(self, name=None, log=None, slow_threshold=0):
+        self.name = name
+        self.log = log
+        self.slow_threshold = slow_threshold
+        self.start = time.time()
+        self.count = 0
+        self.duration = 0.0
+        self.translations = 0
+        self.translation_time = 0.0
+        self.statements = {}
+        self.slow = []
+
+    def add_query(self, sql, duration):
+        """Record the execution of `sql`, which took `duration` seconds.
+        """
+        self.count += 1
+        self.duration += duration
+        stats = self.statements.get(sql)
+        if stats is None:
+            stats = self.statements[sql] = QueryStats(sql, get_caller())
+        stats.count += 1
+        stats.duration += duration
+        if duration > stats.max:
+            stats.max = duration
+        if self.slow_threshold and duration >= self.slow_threshold:
+            caller = get_caller()
+            self.slow.append((duration, sql, caller))
+            if self.log:
+                self.log.warning("Slow query: %.1f ms from %s: %s",
+                                 duration * 1000, caller or '?',
+                                 ' '.join(sql.split()))
+
+    def add_translation(self, duration):
+        """Record the time spent translating a statement before its
+        execution (e.g. for product scoping)."""
+        self.translations += 1
+        self.translation_time += duration
+
+    def get_duplicates(self, threshold):
+        """Return the statistics of the statements executed at least
+        `threshold` times, most frequent first."""
+        duplicates = [stats for stats in self.statements.itervalues()
+                      if stats.count >= threshold]
+        duplicates.sort(key=lambda stats: (-stats.count, -stats.duration))
+        return duplicates
+
+    def get_slowest(self, limit=10):
+        """Return the statistics of the `limit` statements with the
+        highest cumulated duration."""
+        statements = sorted(self.statements.itervalues(),
+                            key=lambda stats: -stats.duration)
+        return statements[:limit]
+
+    @property
+    def elapsed(self):
+        return time.time() - self.start
+
+
+def get_caller():
+    """Return the name of the innermost component method in the call
+    stack, skipping the database layer itself."""
+    frame = sys._getframe(1)
+    try:
+        while frame is not None:
+            if frame.f_globals.get('__name__') not in _SKIPPED_MODULES:
+                obj = frame.f_locals.get('self')
+                if isinstance(obj, Component):
+                    cls = obj.__class__
+                    return '%s.%s.%s' % (cls.__module__, cls.__name__,
+                                         frame.f_code.co_name)
+            frame = frame.f_back
+    finally:
+        del frame
+
+
+def get_query_profile():
+    """Return the `QueryProfile` active in the current thread, if any."""
+    return _local.profile
+
+
+def start_query_profile(name=None, log=None, slow_threshold=0):
+    """Install a new `QueryProfile` for the current thread and return
+    it. A previously active profile is replaced."""
+    profile = _local.profile = QueryProfile(name, log, slow_threshold)
+    return profile
+
+
+def stop_query_profile():
+    """Remove and return the `QueryProfile` active in the current
+    thread."""
+    profile = _local.profile
+    _local.profile = None
+    return profile
@@ -290,7 +290,19 @@ class SQLiteConnection(ConnectionWrapper):
         ConnectionWrapper.__init__(self, cnx, log)
 
     def cursor(self):
-        cursor = self.cnx.cursor((PyFormatCursor, EagerCursor)[self._eager])
+        return self._cursor((PyFormatCursor, EagerCursor)[self._eager])
+
+    def stream_cursor(self):
+        """Return a cursor fetching the rows lazily, regardless of the
+        `cursor` connection string parameter.
+
+        Note that the read lock on the database is held until all the
+        rows have been fetched or the cursor is closed.
+        """
+        return self._cursor(PyFormatCursor)
+
+    def _cursor(self, factory):
+        cursor = self.cnx.cursor(factory)
         self._active_cursors[cursor] = True
         cursor.cnx = self
         return IterableCursor(cursor, self.log)
@@ -1,6 +1,7 @@
 import unittest
 
-from trac.db.tests import api, mysql_test, postgres_test, util
+from trac.db.tests import api, mysql_test, pool, postgres_test, profiler, \
+                          util
 
 from trac.db.tests.functional import functionalSuite
 
@@ -9,7 +10,9 @@ def suite():
     suite = unittest.TestSuite()
     suite.addTest(api.suite())
     suite.addTest(mysql_test.suite())
+    suite.addTest(pool.suite())
     suite.addTest(postgres_test.suite())
+    suite.addTest(profiler.suite())
     suite.addTest(util.suite())
     return suite
 
@@ -3,6 +3,9 @@
 from __future__ import with_statement
 
 import os
+import shutil
+import sqlite3
+import tempfile
 import unittest
 
 from trac.db.api import DatabaseManager, _parse_db_str, get_column_names, \
@@ -341,12 +344,130 @@ class ConnectionTestCase(unittest.TestCase):
         self.assertEqual(43, self.env.db_query(
                 "SELECT id FROM report WHERE author='next-id'")[0][0])
 
+    def test_iterate(self):
+        self.env.db_transaction.executemany(
+            "INSERT INTO report (id, author) VALUES (%s, %s)",
+            [(i, 'author%d' % i) for i in xrange(1, 8)])
+        rows = self.env.db_query.iterate(
+            "SELECT id, author FROM report WHERE id>%s ORDER BY id", (2,),
+            arraysize=2)
+        self.assertEqual((3, 'author3'), rows.next())
+        self.assertEqual([(4, 'author4'), (5, 'author5'), (6, 'author6'),
+                          (7, 'author7')], list(rows))
+
+    def test_iterate_default_fetch_size(self):
+        self.env.config.set('trac', 'database_fetch_size', 3)
+        self.env.db_transaction.executemany(
+            "INSERT INTO report (id, author) VALUES (%s, %s)",
+            [(i, 'author%d' % i) for i in xrange(1, 8)])
+        self.assertEqual(range(1, 8), [id for id, in
+            self.env.db_query.iterate("SELECT id FROM report ORDER BY id")])
+
+    def test_iterate_nested_queries(self):
+        self.env.db_transaction.executemany(
+            "INSERT INTO report (id, author) VALUES (%s, %s)",
+            [(i, 'author%d' % i) for i in xrange(1, 8)])
+        authors = []
+        for id, in self.env.db_query.iterate(
+                "SELECT id FROM report ORDER BY id", arraysize=2):
+            authors.extend(author for author, in self.env.db_query(
+                "SELECT author FROM report WHERE id=%s", (id,)))
+        self.assertEqual(['author%d' % i for i in xrange(1, 8)], authors)
+
+    def test_iterate_not_started(self):
+        rows = self.env.db_query.iterate("SELECT id FROM report")
+        del rows
+        tl = DatabaseManager(self.env)._transaction_local
+        self.assertEqual(None, tl.rdb)
+
+    def test_iterate_only_select(self):
+        self.assertRaises(ValueError, self.env.db_query.iterate,
+                          "DELETE FROM report")
+        with self.env.db_transaction as db:
+            self.assertRaises(ValueError, db.iterate, "DELETE FROM report")
+
+    def test_iterate_select_variants(self):
+        self.env.db_transaction("INSERT INTO report (id) VALUES (1)")
+        for query in ("\n  select id from report",
+                      "WITH r AS (SELECT id FROM report) SELECT id FROM r"):
+            self.assertEqual([(1,)], list(self.env.db_query.iterate(query)))
+
+
+class ReplicaTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.env = EnvironmentStub()
+        self.dbm = DatabaseManager(self.env)
+        self.env.db_transaction(
+            "INSERT INTO system (name, value) VALUES ('where', 'primary')")
+        self.dbm.release_primary()
+        self.tempdir = tempfile.mkdtemp()
+        self.replica_path = os.path.join(self.tempdir, 'replica.db')
+        cnx = sqlite3.connect(self.replica_path)
+        cnx.execute("CREATE TABLE system (name text PRIMARY KEY, value text)")
+        cnx.execute("INSERT INTO system VALUES ('where', 'replica')")
+        cnx.commit()
+        cnx.close()
+        self.env.config.set('trac', 'database_replicas',
+                            'sqlite:' + self.replica_path)
+
+    def tearDown(self):
+        self.dbm.shutdown()
+        self.env.reset_db()
+        shutil.rmtree(self.tempdir)
+
+    def _where(self):
+        return self.env.db_query("SELECT value FROM system "
+                                 "WHERE name='where'")[0][0]
+
+    def test_query_uses_replica(self):
+        self.assertEqual('replica', self._where())
+        with self.env.db_query as db:
+            self.assertEqual('replica', self._where())
+
+    def test_transaction_uses_primary(self):
+        with self.env.db_transaction as db:
+            self.assertEqual('primary', db("SELECT value FROM system "
+                                           "WHERE name='where'")[0][0])
+            self.assertEqual('primary', self._where())
+
+    def test_transaction_within_replica_query(self):
+        with self.env.db_query as db:
+            self.assertEqual('replica', self._where())
+            with self.env.db_transaction as db:
+                db("UPDATE system SET value='updated' WHERE name='where'")
+                self.assertEqual('updated', self._where())
+            self.assertEqual('updated', self._where())
+        self.assertEqual('updated', self._where())
+
+    def test_read_your_writes(self):
+        self.env.db_transaction("UPDATE system SET value='updated' "
+                                "WHERE name='where'")
+        self.assertEqual('updated', self._where())
+        self.dbm.release_primary()
+        self.assertEqual('replica', self._where())
+
+    def test_primary_reads(self):
+        with self.dbm.primary_reads():
+            self.assertEqual('primary', self._where())
+        self.assertEqual('replica', self._where())
+        with self.env.db_query as db:
+            with self.dbm.primary_reads():
+                self.assertEqual('primary', self._where())
+            self.assertEqual('replica', self._where())
+
+    def test_unavailable_replica(self):
+        os.remove(self.replica_path)
+        self.assertEqual('primary', self._where())
+        self.assertEqual('primary', self._where())
+
 
 def suite():
     suite = unittest.TestSuite()
     suite.addTest(unittest.makeSuite(ParseConnectionStringTestCase, 'test'))
     suite.addTest(unittest.makeSuite(StringsTestCase, 'test'))
     suite.addTest(unittest.makeSuite(ConnectionTestCase, 'test'))
+    suite.addTest(unittest.makeSuite(ReplicaTestCase, 'test'))
     suite.addTest(unittest.makeSuite(WithTransactionTest, 'test'))
     return suite
 
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at http://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at http://trac.edgewall.org/log/.
+
+import time
+import unittest
+
+from trac.db.pool import ConnectionPoolBackend, DurationHistogram
+
+
+class Connection(object):
+
+    poolable = True
+    closed = False
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class Connector(object):
+
+    def __init__(self):
+        self.connections = []
+
+    def get_connection(self, **kwargs):
+        cnx = Connection()
+        self.connections.append(cnx)
+        return cnx
+
+
+class DurationHistogramTestCase(unittest.TestCase):
+
+    def test_add(self):
+        hist = DurationHistogram((0.1, 1))
+        for duration in (0.05, 0.1, 0.5, 2, 3):
+            hist.add(duration)
+        stats = hist.as_dict()
+        self.assertEqual([(0.1, 2), (1, 1), (None, 2)], stats['buckets'])
+        self.assertEqual(5, stats['count'])
+        self.assertAlmostEqual(5.65, stats['total'])
+        self.assertAlmostEqual(1.13, stats['mean'])
+        self.assertEqual(3, stats['max'])
+
+    def test_empty(self):
+        stats = DurationHistogram().as_dict()
+        self.assertEqual(0, stats['count'])
+        self.assertEqual(0.0, stats['mean'])
+
+
+class ConnectionPoolBackendTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.backend = ConnectionPoolBackend(3)
+        self.connector = Connector()
+        self.kwargs = {'path': 'test'}
+
+    def tearDown(self):
+        self.backend.shutdown()
+
+    def test_stats(self):
+        db = self.backend.get_cnx(self.connector, self.kwargs)
+        nested = self.backend.get_cnx(self.connector, self.kwargs)
+        stats = self.backend.get_stats()
+        self.assertEqual(1, stats['active'])
+        self.assertEqual(0, stats['idle'])
+        self.assertEqual(1, stats['checkouts'])
+        self.assertEqual(1, stats['reuses'])
+        self.assertEqual(1, stats['created'])
+        self.assertEqual(1, stats['wait_time']['count'])
+        self.assertEqual(0, stats['checkout_time']['count'])
+        nested.close()
+        db.close()
+        stats = self.backend.get_stats()
+        self.assertEqual(0, stats['active'])
+        self.assertEqual(1, stats['idle'])
+        self.assertEqual(1, stats['checkout_time']['count'])
+
+        self.backend.get_cnx(self.connector, self.kwargs).close()
+        stats = self.backend.get_stats()
+        self.assertEqual(2, stats['checkouts'])
+        self.assertEqual(1, stats['created'])
+
+        self.backend.reset_stats()
+        stats = self.backend.get_stats()
+        self.assertEqual(0, stats['checkouts'])
+        self.assertEqual(1, stats['idle'])
+
+    def test_prewarm(self):
+        self.backend.configure(self.kwargs, minsize=2)
+        self.assertEqual(2, self.backend.prewarm(self.connector,
+                                                 self.kwargs))
+        self.assertEqual(0, self.backend.prewarm(self.connector,
+                                                 self.kwargs))
+        stats = self.backend.get_stats()
+        self.assertEqual(2, stats['idle'])
+        self.assertEqual(2, stats['created'])
+        self.backend.get_cnx(self.connector, self.kwargs).close()
+        self.assertEqual(2, len(self.connector.connections))
+
+    def test_prewarm_within_maxsize(self):
+        self.backend.configure(self.kwargs, minsize=5)
+        self.assertEqual(3, self.backend.prewarm(self.connector,
+                                                 self.kwargs))
+
+    def test_reap_idle_connections(self):
+        self.backend.configure(self.kwargs, minsize=1, idle_timeout=0)
+        self.backend.configure({'path': 'other'}, idle_timeout=0)
+        self.backend.prewarm(self.connector, self.kwargs)
+        db1 = self.backend.get_cnx(self.connector, self.kwargs)
+        db2 = self.backend.get_cnx(self.connector, {'path': 'other'})
+        db1.close()
+        db2.close()
+        self.assertEqual(2, self.backend.get_stats()['idle'])
+        time.sleep(0.01)
+        self.backend.shutdown(tid=1)
+        stats = self.backend.get_stats()
+        self.assertEqual(1, stats['idle'])
+        self.assertEqual(1, stats['reaped'])
+        self.assertEqual([False, True],
+                         [cnx.closed for cnx in self.connector.connections])
+
+    def test_keep_recent_idle_connections(self):
+        self.backend.get_cnx(self.connector, self.kwargs).close()
+        self.backend.shutdown(tid=1)
+        self.assertEqual(1, self.backend.get_stats()['idle'])
+        self.backend.shutdown()
+        self.assertEqual(0, self.backend.get_stats()['idle'])
+        self.assertTrue(self.connector.connections[0].closed)
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(DurationHistogramTestCase, 'test'))
+    suite.addTest(unittest.makeSuite(ConnectionPoolBackendTestCase, 'test'))
+    return suite
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='suite')
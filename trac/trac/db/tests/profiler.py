@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at http://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at http://trac.edgewall.org/log/.
+
+import unittest
+
+from trac.core import Component
+from trac.db.api import DatabaseManager
+from trac.db.profiler import QueryProfile, get_query_profile, \
+                             start_query_profile, stop_query_profile
+from trac.test import EnvironmentStub
+
+
+class RecordingLog(object):
+
+    def __init__(self):
+        self.records = []
+
+    def warning(self, msg, *args):
+        self.records.append(('warning', msg % args))
+
+    def info(self, msg, *args):
+        self.records.append(('info', msg % args))
+
+
+class QueryIssuer(Component):
+
+    def run(self, sql):
+        self.env.db_query(sql)
+
+
+class QueryProfileTestCase(unittest.TestCase):
+
+    def test_add_query(self):
+        profile = QueryProfile('test')
+        profile.add_query('SELECT 1', 0.5)
+        profile.add_query('SELECT 2', 0.25)
+        profile.add_query('SELECT 1', 1.5)
+        self.assertEqual(3, profile.count)
+        self.assertEqual(2.25, profile.duration)
+        stats = profile.statements['SELECT 1']
+        self.assertEqual(2, stats.count)
+        self.assertEqual(2.0, stats.duration)
+        self.assertEqual(1.5, stats.max)
+        self.assertEqual(['SELECT 1', 'SELECT 2'],
+                         [s.sql for s in profile.get_slowest()])
+        self.assertEqual(['SELECT 1'],
+                         [s.sql for s in profile.get_slowest(1)])
+
+    def test_duplicates(self):
+        profile = QueryProfile()
+        for i in range(3):
+            profile.add_query('SELECT 1', 0.1)
+        profile.add_query('SELECT 2', 0.1)
+        self.assertEqual(['SELECT 1'],
+                         [s.sql for s in profile.get_duplicates(3)])
+        self.assertEqual(['SELECT 1', 'SELECT 2'],
+                         [s.sql for s in profile.get_duplicates(1)])
+
+    def test_slow_query_log(self):
+        log = RecordingLog()
+        profile = QueryProfile(log=log, slow_threshold=0.5)
+        profile.add_query('SELECT 1', 0.1)
+        profile.add_query('SELECT\n  2', 0.6)
+        self.assertEqual(1, len(profile.slow))
+        self.assertEqual('SELECT\n  2', profile.slow[0][1])
+        self.assertEqual([('warning', 'Slow query: 600.0 ms from ?: '
+                                      'SELECT 2')], log.records)
+
+    def test_translation(self):
+        profile = QueryProfile()
+        profile.add_translation(0.25)
+        profile.add_translation(0.5)
+        self.assertEqual(2, profile.translations)
+        self.assertEqual(0.75, profile.translation_time)
+
+
+class QueryProfilingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.env = EnvironmentStub()
+        self.dbm = DatabaseManager(self.env)
+
+    def tearDown(self):
+        stop_query_profile()
+        self.env.reset_db()
+
+    def test_no_profile(self):
+        self.env.db_query("SELECT 1")
+        self.assertEqual(None, get_query_profile())
+
+    def test_record_queries(self):
+        profile = start_query_profile('test')
+        QueryIssuer(self.env).run("SELECT 1")
+        self.env.db_query("SELECT 1")
+        self.env.db_query("SELECT 2")
+        self.assertEqual(profile, stop_query_profile())
+        self.assertEqual(3, profile.count)
+        stats = profile.statements['SELECT 1']
+        self.assertEqual(2, stats.count)
+        self.assertEqual(__name__ + '.QueryIssuer.run', stats.caller)
+        self.assertEqual(None, get_query_profile())
+
+    def test_disabled_by_default(self):
+        self.assertEqual(None, self.dbm.start_query_profile('test'))
+        self.assertEqual(None, self.dbm.end_query_profile())
+
+    def test_end_query_profile(self):
+        self.env.config.set('trac', 'sql_profile', True)
+        self.env.config.set('trac', 'duplicate_query_threshold', 2)
+        log = self.dbm.log = RecordingLog()
+        profile = self.dbm.start_query_profile('/test')
+        self.env.db_query("SELECT 1")
+        self.env.db_query("SELECT 1")
+        self.env.db_query("SELECT 2")
+        self.assertEqual(profile, self.dbm.end_query_profile())
+        self.assertEqual(2, len(log.records))
+        self.assertEqual('info', log.records[0][0])
+        self.assertTrue(log.records[0][1].startswith(
+            'SQL profile: name=/test queries=3 statements=2 '))
+        self.assertEqual('warning', log.records[1][0])
+        self.assertTrue(log.records[1][1].startswith(
+            'SQL profile: name=/test repeated=2 '))
+        self.assertTrue(log.records[1][1].endswith(' sql=SELECT 1'))
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(QueryProfileTestCase, 'test'))
+    suite.addTest(unittest.makeSuite(QueryProfilingTestCase, 'test'))
+    return suite
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='suite')
@@ -13,7 +13,7 @@
 
 import unittest
 
-from trac.db.util import sql_escape_percent
+from trac.db.util import is_select, sql_escape_percent
 
 # TODO: test IterableCursor, ConnectionWrapper
 
@@ -32,9 +32,20 @@ class SQLEscapeTestCase(unittest.TestCase):
         self.assertEqual("'%%s %%i'", sql_escape_percent("'%s %i'"))
 
 
+class IsSelectTestCase(unittest.TestCase):
+    def test_is_select(self):
+        self.assertTrue(is_select("SELECT 1"))
+        self.assertTrue(is_select("\n  select 1"))
+        self.assertTrue(is_select("(SELECT 1) UNION (SELECT 2)"))
+        self.assertTrue(is_select("WITH t AS (SELECT 1) SELECT * FROM t"))
+        self.assertFalse(is_select("DELETE FROM report"))
+        self.assertFalse(is_select("INSERT INTO report SELECT * FROM t"))
+
+
 def suite():
     suite = unittest.TestSuite()
     suite.addTest(unittest.makeSuite(SQLEscapeTestCase, 'test'))
+    suite.addTest(unittest.makeSuite(IsSelectTestCase, 'test'))
     return suite
 
 if __name__ == '__main__':
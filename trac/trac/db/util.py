@@ -15,6 +15,10 @@
 #
 # Author: Christopher Lenz <cmlenz@gmx.de>
 
+import time
+
+from trac.db.profiler import get_query_profile
+
 
 def sql_escape_percent(sql):
     import re
@@ -22,6 +26,30 @@ def sql_escape_percent(sql):
                   lambda m: m.group(0).replace('%', '%%'), sql)
 
 
+def is_select(query):
+    """Return `True` if `query` is a SELECT, possibly parenthesized or
+    introduced by a WITH clause."""
+    return query.lstrip(' \t\r\n(').upper().startswith(('SELECT', 'WITH'))
+
+
+def fetch_rows(cursor, arraysize):
+    """Generate the rows of an executed `cursor`, retrieving them
+    `arraysize` rows at a time ("fetchmany").
+
+    The cursor is closed once all the rows have been generated, or
+    when the generator is closed.
+    """
+    try:
+        while True:
+            rows = cursor.fetchmany(arraysize)
+            if not rows:
+                return
+            for row in rows:
+                yield row
+    finally:
+        cursor.close()
+
+
 class IterableCursor(object):
     """Wrapper for DB-API cursor objects that makes the cursor iterable
     and escapes all "%"s used inside literal strings with parameterized
@@ -46,6 +74,26 @@ class IterableCursor(object):
             yield row
 
     def execute(self, sql, args=None):
+        profile = get_query_profile()
+        if profile is None:
+            return self._execute(sql, args)
+        start = time.time()
+        try:
+            return self._execute(sql, args)
+        finally:
+            profile.add_query(sql, time.time() - start)
+
+    def executemany(self, sql, args):
+        profile = get_query_profile()
+        if profile is None:
+            return self._executemany(sql, args)
+        start = time.time()
+        try:
+            return self._executemany(sql, args)
+        finally:
+            profile.add_query(sql, time.time() - start)
+
+    def _execute(self, sql, args=None):
         if self.log:
             self.log.debug('SQL: %s', sql)
             try:
@@ -65,7 +113,7 @@ class IterableCursor(object):
             return self.cursor.execute(sql_escape_percent(sql), args)
         return self.cursor.execute(sql)
 
-    def executemany(self, sql, args):
+    def _executemany(self, sql, args):
         if self.log:
             self.log.debug('SQL: %r', sql)
             self.log.debug('args: %r', args)
@@ -94,6 +142,9 @@ class ConnectionWrapper(object):
 
     :since 1.0: added a 'readonly' flag preventing the forwarding of
                 `commit` and `rollback`
+
+    :since 1.0.2: added `iterate` and `stream_cursor` for retrieving
+                  large result sets without loading them in memory
     """
     __slots__ = ('cnx', 'log', 'readonly')
 
@@ -141,6 +192,37 @@ class ConnectionWrapper(object):
         cursor.close()
         return rows
 
+    def iterate(self, query, params=None, arraysize=1000):
+        """Execute a SELECT `query` and iterate over the resulting rows.
+
+        Contrary to `execute`, the rows are not all loaded in memory:
+        they are retrieved from a `stream_cursor()`, `arraysize` rows
+        at a time. The query itself is executed immediately.
+
+        Other queries can be issued on the connection while iterating,
+        but the transaction must not be committed or rolled back
+        before the iteration is complete.
+        """
+        if not self.check_select(query):
+            raise ValueError("only a SELECT can be iterated")
+        cursor = self.stream_cursor()
+        try:
+            cursor.execute(query, params)
+        except:
+            cursor.close()
+            raise
+        return fetch_rows(cursor, arraysize)
+
+    def stream_cursor(self):
+        """Return a cursor suited for iterating over large result sets.
+
+        Database backends supporting it return a server-side cursor
+        or a cursor which doesn't prefetch the results, otherwise this
+        is the same as `cursor()`.
+        """
+        stream_cursor = getattr(self.cnx, 'stream_cursor', None)
+        return stream_cursor() if stream_cursor else self.cnx.cursor()
+
     def check_select(self, query):
         """Verify if the query is compatible according to the readonly nature
         of the wrapped Connection.
@@ -149,7 +231,7 @@ class ConnectionWrapper(object):
         :raise: `ValueError` if this is not a SELECT and the wrapped
                 Connection is read-only.
         """
-        dql = query.lstrip().startswith('SELECT')
+        dql = is_select(query)
         if self.readonly and not dql:
             raise ValueError("a 'readonly' connection can only do a SELECT")
         return dql
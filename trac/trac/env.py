@@ -26,7 +26,7 @@ from urlparse import urlsplit
 
 from trac import db_default
 from trac.admin import AdminCommandError, IAdminCommandProvider
-from trac.cache import CacheManager
+from trac.cache import CacheManager, cached
 from trac.config import *
 from trac.core import Component, ComponentManager, implements, Interface, \
                       ExtensionPoint, TracError
@@ -42,7 +42,8 @@ from trac.util.translation import _, N_
 from trac.versioncontrol import RepositoryManager
 from trac.web.href import Href
 
-__all__ = ['Environment', 'IEnvironmentSetupParticipant', 'open_environment']
+__all__ = ['Environment', 'IEnvironmentSetupParticipant', 'UserDirectory',
+           'open_environment']
 
 
 # Content of the VERSION file in the environment
@@ -479,6 +480,12 @@ class Environment(Component, ComponentManager):
             for row in env.db_query("SELECT ..."):
                 ...
 
+        Large result sets can be iterated over without loading all
+        the rows in memory::
+
+            for row in env.db_query.iterate("SELECT ..."):
+                ...
+
         """
         return QueryContextManager(self)
 
@@ -527,6 +534,10 @@ class Environment(Component, ComponentManager):
         RepositoryManager(self).shutdown(tid)
         DatabaseManager(self).shutdown(tid)
         if tid is None:
+            from trac.notification import QueuedEmailSender
+            sender = self.components.get(QueuedEmailSender)
+            if sender is not None:
+                sender.shutdown()
             self.log.removeHandler(self._log_handler)
             self._log_handler.flush()
             self._log_handler.close()
@@ -657,8 +668,17 @@ class Environment(Component, ComponentManager):
 
         :since 1.0: deprecation warning: the `cnx` parameter is no
                     longer used and will be removed in version 1.1.1
+
+        :since 1.0.2: the users are retrieved from the `UserDirectory`
+                      cache
         """
-        for username, name, email in self.db_query("""
+        for user in UserDirectory(self).get_known_users():
+            yield user
+
+    def _load_known_users(self):
+        """Retrieve the known users from the database, for filling the
+        `UserDirectory` cache."""
+        return self.db_query("""
                 SELECT DISTINCT s.sid, n.value, e.value
                 FROM session AS s
                  LEFT JOIN session_attribute AS n ON (n.sid=s.sid
@@ -666,8 +686,7 @@ class Environment(Component, ComponentManager):
                  LEFT JOIN session_attribute AS e ON (e.sid=s.sid
                   AND e.authenticated=1 AND e.name = 'email')
                 WHERE s.authenticated=1 ORDER BY s.sid
-                """):
-            yield username, name, email
+                """)
 
     def backup(self, dest=None):
         """Create a backup of the database.
@@ -737,6 +756,71 @@ class Environment(Component, ComponentManager):
         return self._abs_href
 
 
+class UserDirectory(Component):
+    """Cache of the known users, i.e. the users having an authenticated
+    session, together with their name and e-mail address.
+
+    The directory is shared by the global environment and all the
+    product environments. It must be invalidated with `invalidate()`
+    whenever an authenticated session is created or deleted, or when
+    its name or e-mail attribute changes.
+
+    The returned lists and dictionaries are shared and must not be
+    modified.
+    """
+
+    @cached
+    def _users(self):
+        users = [tuple(user) for user in self.env._load_known_users()]
+        by_username = {}
+        name_map = {}
+        email_map = {}
+        by_email = {}
+        for user in users:
+            username, name, email = user
+            by_username[username] = user
+            if name:
+                name_map[username] = name
+            if email:
+                email_map[username] = email
+                by_email.setdefault(email.lower(), username)
+        return users, by_username, name_map, email_map, by_email
+
+    def _get_users(self):
+        env = getattr(self.env, 'parent', None) or self.env
+        return UserDirectory(env)._users
+
+    def get_known_users(self):
+        """Return the list of `(username, name, email)` tuples of the
+        known users, ordered by username."""
+        return self._get_users()[0]
+
+    def get_user(self, username):
+        """Return the `(username, name, email)` tuple of the given user,
+        or `None` if the user is unknown."""
+        return self._get_users()[1].get(username)
+
+    def get_name_map(self):
+        """Return a dictionary of usernames to names, for the users
+        having set their name."""
+        return self._get_users()[2]
+
+    def get_email_map(self):
+        """Return a dictionary of usernames to e-mail addresses, for the
+        users having set their e-mail address."""
+        return self._get_users()[3]
+
+    def find_user(self, email):
+        """Return the username of the user having the given e-mail
+        address (compared case-insensitively), or `None`."""
+        return self._get_users()[4].get(email.lower())
+
+    def invalidate(self):
+        """Discard the cached users, in all the processes."""
+        env = getattr(self.env, 'parent', None) or self.env
+        del UserDirectory(env)._users
+
+
 class EnvironmentSetup(Component):
     """Manage automatic environment upgrades."""
 
@@ -59,6 +59,7 @@ that can be `read()`.
   corresponding ticket (#3332 as well).
 """
 
+import os
 import re
 from StringIO import StringIO
 
@@ -71,6 +72,7 @@ from trac.config import IntOption, ListOption, Option
 from trac.core import *
 from trac.resource import Resource
 from trac.util import Ranges, content_disposition
+from trac.util.diskcache import DiskCache
 from trac.util.text import exception_to_unicode, to_utf8, to_unicode
 from trac.util.translation import _, tag_
 
@@ -483,6 +485,11 @@ class IHTMLPreviewRenderer(Interface):
     #: be decorated with annotations
     returns_source = False
 
+    #: indicate whether the source code returned by this renderer only
+    #: depends on the content and the configuration, so that it can be
+    #: stored in the preview cache (''since 1.0.2'')
+    cacheable = False
+
     def get_extra_mimetypes():
         """Augment the Mimeview system with new mimetypes associations.
 
@@ -507,6 +514,15 @@ class IHTMLPreviewRenderer(Interface):
         0 and 9, where 0 means no support and 9 means "perfect" support.
         """
 
+    def add_resources(context):
+        """Add the stylesheets and scripts needed by the output of `render`
+        to the request of the `context`.
+
+        This is an optional method, called for `cacheable` renderers when
+        a preview is taken from the cache instead of calling `render`.
+        (''since 1.0.2'')
+        """
+
     def render(context, mimetype, content, filename=None, url=None):
         """Render an XHTML preview of the raw `content` in a RenderingContext.
 
@@ -532,6 +548,11 @@ class IHTMLPreviewAnnotator(Interface):
     """Extension point interface for components that can annotate an XHTML
     representation of file contents with additional information."""
 
+    #: indicate whether the annotations only depend on the line numbers
+    #: and content, so that the annotated preview can be stored in the
+    #: preview cache (''since 1.0.2'')
+    cacheable = False
+
     def get_annotation_type():
         """Return a (type, label, description) tuple
         that defines the type of annotation and provides human readable names.
@@ -639,6 +660,17 @@ class Mimeview(Component):
         doc="""Comma-separated list of MIME types that should be treated as
         binary data. (''since 0.11.5'')""")
 
+    preview_cache_dir = Option('mimeviewer', 'preview_cache_dir',
+                               'previewcache',
+        """Directory where the rendered previews of attachments and
+        repository files are cached. Relative paths are resolved from the
+        environment directory. (''since 1.0.2'')""")
+
+    preview_cache_size = IntOption('mimeviewer', 'preview_cache_size', 0,
+        """Maximum size in bytes of the cached previews. Once it is
+        exceeded, the least recently used previews are removed. Set this
+        to 0 to disable the cache. (''since 1.0.2'')""")
+
     def __init__(self):
         self._mime_map = None
         self._mime_map_patterns = None
@@ -701,7 +733,7 @@ class Mimeview(Component):
             yield annotator.get_annotation_type()
 
     def render(self, context, mimetype, content, filename=None, url=None,
-               annotations=None, force_source=False):
+               annotations=None, force_source=False, cache_key=None):
         """Render an XHTML preview of the given `content`.
 
         `content` is the same as an `IHTMLPreviewRenderer.render`'s
@@ -717,12 +749,29 @@ class Mimeview(Component):
         When rendering with an `IHTMLPreviewRenderer` fails, a warning is added
         to the request associated with the context (if any), unless the
         `disable_warnings` hint is set to `True`.
+
+        If given, `cache_key` must identify the `content` and change
+        whenever it changes, e.g. a path and a revision. The source code
+        previews are then stored in the `preview_cache`, and the content
+        isn't read at all on later renderings (''since 1.0.2'').
         """
         if not content:
             return ''
         if not isinstance(context, RenderingContext):
             raise TypeError("RenderingContext expected (since 0.11)")
 
+        cache = self.preview_cache if cache_key is not None else None
+        if cache is not None:
+            key = self._get_preview_cache_key(context, cache_key, mimetype,
+                                              filename, annotations,
+                                              force_source)
+            if key is None:
+                cache = None
+            else:
+                result = self._get_cached_preview(context, cache, key)
+                if result is not None:
+                    return result
+
         # Ensure we have a MIME type for this content
         full_mimetype = mimetype
         if not full_mimetype:
@@ -789,12 +838,20 @@ class Mimeview(Component):
                 # Render content as source code
                 if annotations:
                     m = context.req.args.get('marks') if context.req else None
-                    return self._render_source(context, result, annotations,
-                                               m and Ranges(m))
+                    result = self._render_source(context, result, annotations,
+                                                 m and Ranges(m))
                 else:
                     if isinstance(result, list):
                         result = Markup('\n').join(result)
-                    return tag.div(class_='code')(tag.pre(result)).generate()
+                    result = tag.div(class_='code')(tag.pre(result)).generate()
+                if cache is not None and getattr(renderer, 'cacheable',
+                                                 False):
+                    if isinstance(result, Fragment):
+                        result = result.generate()
+                    result = Markup(result.render('xhtml', encoding=None))
+                    cache.put(key, '%s\n%s' % (renderer.__class__.__name__,
+                                               result.encode('utf-8')))
+                return result
 
             except Exception, e:
                 self.log.warning('HTML preview using %s failed: %s',
@@ -807,6 +864,56 @@ class Mimeview(Component):
                           renderer=renderer.__class__.__name__,
                           err=exception_to_unicode(e)))
 
+    @property
+    def preview_cache(self):
+        """The `DiskCache` of the rendered previews, or `None` if disabled.
+
+        :since 1.0.2:
+        """
+        env = getattr(self.env, 'parent', None) or self.env
+        if env is not self.env:
+            return Mimeview(env).preview_cache
+        size = self.preview_cache_size
+        if size <= 0:
+            return None
+        path = self.preview_cache_dir
+        if not os.path.isabs(path):
+            path = os.path.join(env.path, path)
+        cache = getattr(self, '_preview_cache', None)
+        if cache is None or cache.path != path:
+            cache = self._preview_cache = DiskCache(path, size)
+        cache.max_size = size
+        return cache
+
+    def _get_preview_cache_key(self, context, cache_key, mimetype, filename,
+                               annotations, force_source):
+        """Return the key of the preview in the cache, or `None` if one of
+        the `annotations` can't be cached."""
+        labels = []
+        for annotator in self.annotators:
+            atype, alabel, atitle = annotator.get_annotation_type()
+            if annotations and atype in annotations:
+                if not getattr(annotator, 'cacheable', False):
+                    return None
+                labels.append((atype, unicode(alabel), unicode(atitle)))
+        marks = context.req.args.get('marks') if context.req else None
+        return (self.env.path, cache_key, mimetype, filename,
+                tuple(annotations or ()), sorted(labels), bool(force_source),
+                marks, [r.__class__.__name__ for r in self.renderers],
+                sorted(self.config.options('mimeviewer')))
+
+    def _get_cached_preview(self, context, cache, key):
+        data = cache.get(key)
+        if data is None:
+            return None
+        name, html = data.split('\n', 1)
+        for renderer in self.renderers:
+            if renderer.__class__.__name__ == name:
+                if hasattr(renderer, 'add_resources'):
+                    renderer.add_resources(context)
+                break
+        return Markup(html.decode('utf-8'))
+
     def _render_source(self, context, stream, annotations, marks=None):
         from trac.web.chrome import add_warning
         annotators, labels, titles = {}, {}, {}
@@ -988,10 +1095,12 @@ class Mimeview(Component):
         return types
 
     def preview_data(self, context, content, length, mimetype, filename,
-                     url=None, annotations=None, force_source=False):
+                     url=None, annotations=None, force_source=False,
+                     cache_key=None):
         """Prepares a rendered preview of the given `content`.
 
         Note: `content` will usually be an object with a `read` method.
+        See `render` for the `cache_key` parameter.
         """
         data = {'raw_href': url, 'size': length,
                 'max_file_size': self.max_preview_size,
@@ -1002,7 +1111,8 @@ class Mimeview(Component):
             data['max_file_size_reached'] = True
         else:
             result = self.render(context, mimetype, content, filename, url,
-                                 annotations, force_source=force_source)
+                                 annotations, force_source=force_source,
+                                 cache_key=cache_key)
             data['rendered'] = result
         return data
 
@@ -1108,6 +1218,8 @@ class LineNumberAnnotator(Component):
     """Text annotator that adds a column with line numbers."""
     implements(IHTMLPreviewAnnotator)
 
+    cacheable = True
+
     # ITextAnnotator methods
 
     def get_annotation_type(self):
@@ -1132,6 +1244,7 @@ class PlainTextRenderer(Component):
 
     expand_tabs = True
     returns_source = True
+    cacheable = True
 
     def get_quality_ratio(self, mimetype):
         if mimetype in Mimeview(self.env).treat_as_binary:
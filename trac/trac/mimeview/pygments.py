@@ -64,6 +64,7 @@ class PygmentsRenderer(Component):
 
     expand_tabs = True
     returns_source = True
+    cacheable = True
 
     QUALITY_RATIO = 7
 
@@ -111,12 +112,17 @@ class PygmentsRenderer(Component):
         except KeyError:
             return 0
 
-    def render(self, context, mimetype, content, filename=None, rev=None):
+    def add_resources(self, context):
         req = context.req
+        if req:
+            add_stylesheet(req, '/pygments/%s.css' %
+                           req.session.get('pygments_style',
+                                           self.default_style))
+
+    def render(self, context, mimetype, content, filename=None, rev=None):
         if self._types is None:
             self._init_types()
-        add_stylesheet(req, '/pygments/%s.css' %
-                       req.session.get('pygments_style', self.default_style))
+        self.add_resources(context)
         try:
             if len(content) > 0:
                 mimetype = mimetype.split(';', 1)[0]
@@ -12,6 +12,9 @@
 # history and logs, available at http://trac.edgewall.org/log/.
 
 import doctest
+import os
+import shutil
+import tempfile
 import unittest
 from StringIO import StringIO
 import sys
@@ -19,8 +22,9 @@ import sys
 from trac.core import *
 from trac.test import EnvironmentStub
 from trac.mimeview import api
-from trac.mimeview.api import get_mimetype, IContentConverter, Mimeview, \
-                              _group_lines
+from trac.mimeview.api import get_mimetype, IContentConverter, \
+                              IHTMLPreviewAnnotator, Mimeview, _group_lines
+from trac.web.chrome import web_context
 from genshi import Stream, Namespace
 from genshi.core import Attrs, TEXT, START, END
 from genshi.input import HTMLParser
@@ -102,6 +106,79 @@ class MimeviewTestCase(unittest.TestCase):
         self.assertEqual(Converter1(self.env), conversions[1][-1])
         self.assertEqual(Converter2(self.env), conversions[2][-1])
 
+
+class UnreadableContent(object):
+
+    def read(self, size=-1):
+        raise AssertionError("Content read")
+
+
+class PreviewCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.env = EnvironmentStub(default_data=False,
+            enable=['trac.mimeview.api.*',
+                    '%s.RevisionAnnotator' % self.__module__])
+        self.path = tempfile.mkdtemp(prefix='trac-previewcache-')
+        self.env.config.set('mimeviewer', 'preview_cache_dir', self.path)
+        self.env.config.set('mimeviewer', 'preview_cache_size', 100000)
+        self.mimeview = Mimeview(self.env)
+        self.context = web_context(None, 'attachment', 'file.txt')
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+        self.env.reset_db()
+
+    def _render(self, content, key, annotations=['lineno']):
+        return self.mimeview.render(self.context, 'text/plain', content,
+                                    'file.txt', annotations=annotations,
+                                    cache_key=key)
+
+    def _cached_files(self):
+        return [name for dirpath, dirnames, filenames in os.walk(self.path)
+                     for name in filenames]
+
+    def test_render_from_cache(self):
+        rendered = self._render('line 1\nline 2\n', ('file.txt', 1))
+        self.assertTrue('<th id="L2">' in rendered)
+        self.assertEqual(1, len(self._cached_files()))
+        self.assertEqual(rendered, self._render(UnreadableContent(),
+                                                ('file.txt', 1)))
+        self.assertEqual(unicode(rendered),
+                         unicode(self._render('line 1\nline 2\n', None)))
+
+    def test_content_change(self):
+        self._render('line 1\n', ('file.txt', 1))
+        rendered = self._render('line 2\n', ('file.txt', 2))
+        self.assertTrue('line 2' in rendered)
+        self.assertEqual(2, len(self._cached_files()))
+
+    def test_annotations_in_key(self):
+        self._render('line 1\n', ('file.txt', 1))
+        rendered = self._render('line 1\n', ('file.txt', 1), [])
+        self.assertFalse('<th id="L1">' in rendered)
+        self.assertEqual(2, len(self._cached_files()))
+
+    def test_uncacheable_annotator(self):
+        class RevisionAnnotator(Component):
+            implements(IHTMLPreviewAnnotator)
+            def get_annotation_type(self):
+                return 'rev', 'Rev', 'Revision'
+            def get_annotation_data(self, context):
+                return None
+            def annotate_row(self, context, row, lineno, line, data):
+                row.append('42')
+
+        self._render('line 1\n', ('file.txt', 1), ['rev', 'lineno'])
+        self.assertEqual([], self._cached_files())
+
+    def test_disabled(self):
+        self.env.config.set('mimeviewer', 'preview_cache_size', 0)
+        self.assertEqual(None, self.mimeview.preview_cache)
+        self._render('line 1\n', ('file.txt', 1))
+        self.assertEqual([], self._cached_files())
+
+
 class GroupLinesTestCase(unittest.TestCase):
 
     def test_empty_stream(self):
@@ -213,6 +290,7 @@ def suite():
     suite.addTest(doctest.DocTestSuite(api))
     suite.addTest(unittest.makeSuite(GetMimeTypeTestCase, 'test'))
     suite.addTest(unittest.makeSuite(MimeviewTestCase, 'test'))
+    suite.addTest(unittest.makeSuite(PreviewCacheTestCase, 'test'))
     suite.addTest(unittest.makeSuite(GroupLinesTestCase, 'test'))
     return suite
 
@@ -13,20 +13,28 @@
 # individuals. For the exact contribution history, see the revision
 # history and logs, available at http://trac.edgewall.org/log/.
 
+from __future__ import with_statement
+
 import os
 import re
 import smtplib
+import socket
 from subprocess import Popen, PIPE
 import time
 
 from genshi.builder import tag
 
 from trac import __version__
+from trac.admin import IAdminCommandProvider
 from trac.config import BoolOption, ExtensionOption, IntOption, Option
 from trac.core import *
+from trac.env import UserDirectory
+from trac.util import hex_entropy
 from trac.util.compat import close_fds
-from trac.util.text import CRLF, fix_eol
+from trac.util.concurrency import threading
+from trac.util.text import CRLF, exception_to_unicode, fix_eol, printout
 from trac.util.translation import _, deactivate, reactivate
+from trac.web.metrics import IMetricsProvider, format_counters
 
 MAXHEADERLEN = 76
 EMAIL_LOOKALIKE_PATTERN = (
@@ -146,39 +154,61 @@ class SmtpEmailSender(Component):
         """Use SSL/TLS to send notifications over SMTP. (''since 0.10'')""")
 
     def send(self, from_addr, recipients, message):
+        server = self.open_connection()
+        try:
+            self.send_message(server, from_addr, recipients, message)
+        finally:
+            self.close_connection(server)
+
+    def open_connection(self):
+        """Connect and log in to the SMTP server.
+
+        The returned connection can be used for sending several
+        messages with `send_message`, and must be closed with
+        `close_connection`. (''since 1.0.2'')
+        """
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port)
+        # server.set_debuglevel(True)
+        try:
+            if self.use_tls:
+                server.ehlo()
+                if not server.esmtp_features.has_key('starttls'):
+                    raise TracError(_("TLS enabled but server does not "
+                                      "support TLS"))
+                server.starttls()
+                server.ehlo()
+            if self.smtp_user:
+                server.login(self.smtp_user.encode('utf-8'),
+                             self.smtp_password.encode('utf-8'))
+        except:
+            server.close()
+            raise
+        return server
+
+    def send_message(self, server, from_addr, recipients, message):
+        """Send a message over a connection returned by
+        `open_connection`. (''since 1.0.2'')"""
         # Ensure the message complies with RFC2822: use CRLF line endings
         message = fix_eol(message, CRLF)
 
         self.log.info("Sending notification through SMTP at %s:%d to %s"
                       % (self.smtp_server, self.smtp_port, recipients))
-        server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-        # server.set_debuglevel(True)
-        if self.use_tls:
-            server.ehlo()
-            if not server.esmtp_features.has_key('starttls'):
-                raise TracError(_("TLS enabled but server does not support " \
-                                  "TLS"))
-            server.starttls()
-            server.ehlo()
-        if self.smtp_user:
-            server.login(self.smtp_user.encode('utf-8'),
-                         self.smtp_password.encode('utf-8'))
         start = time.time()
         server.sendmail(from_addr, recipients, message)
         t = time.time() - start
         if t > 5:
             self.log.warning('Slow mail submission (%.2f s), '
                              'check your mail setup' % t)
-        if self.use_tls:
-            # avoid false failure detection when the server closes
-            # the SMTP connection with TLS enabled
-            import socket
-            try:
-                server.quit()
-            except socket.sslerror:
-                pass
-        else:
+
+    def close_connection(self, server):
+        """Close a connection returned by `open_connection`.
+        (''since 1.0.2'')"""
+        try:
             server.quit()
+        except (socket.error, smtplib.SMTPException):
+            # avoid false failure detection when the server closes
+            # the SMTP connection with TLS enabled, or after an error
+            server.close()
 
 
 class SendmailEmailSender(Component):
@@ -209,6 +239,316 @@ class SendmailEmailSender(Component):
                             % (child.returncode, err.strip(), cmdline))
 
 
+class MailSpool(object):
+    """Directory holding e-mail messages waiting for delivery.
+
+    Each message is stored in its own file in the `new` subdirectory,
+    the name of the file containing the time at which the delivery is
+    due and the number of failed delivery attempts. Messages are
+    claimed for delivery by moving them to the `work` subdirectory, so
+    that several processes can share the spool. Messages which can't
+    be delivered are eventually moved to the `failed` subdirectory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        for name in ('tmp', 'new', 'work', 'failed'):
+            dir = os.path.join(path, name)
+            if not os.path.isdir(dir):
+                os.makedirs(dir)
+
+    def put(self, from_addr, recipients, message, attempts=0, due=None):
+        """Add a message to the spool."""
+        def encode(value):
+            return value.encode('utf-8') if isinstance(value, unicode) \
+                   else value
+        if due is None:
+            due = time.time()
+        name = '%d-%d-%s' % (due * 1000000, attempts, hex_entropy(16))
+        tmp = os.path.join(self.path, 'tmp', name)
+        with open(tmp, 'wb') as f:
+            f.write('%s\n%s\n' % (encode(from_addr),
+                                  ' '.join(encode(r) for r in recipients)))
+            f.write(message)
+        os.rename(tmp, os.path.join(self.path, 'new', name))
+
+    def claim(self, limit, now=None):
+        """Claim up to `limit` messages whose delivery is due at `now`
+        (by default, the current time).
+
+        Return a list of `(name, attempts, from_addr, recipients,
+        message)` tuples. Each message must then be passed to either
+        `remove`, `retry` or `fail`.
+        """
+        if now is None:
+            now = time.time()
+        now *= 1000000
+        messages = []
+        for name in sorted(os.listdir(os.path.join(self.path, 'new')),
+                           key=_due_time):
+            if len(messages) >= limit or _due_time(name) > now:
+                break
+            work = os.path.join(self.path, 'work', name)
+            try:
+                os.rename(os.path.join(self.path, 'new', name), work)
+            except OSError:
+                continue # claimed by another process
+            # The claim time is used by `recover`
+            os.utime(work, None)
+            with open(work, 'rb') as f:
+                from_addr = f.readline().rstrip('\n')
+                recipients = f.readline().rstrip('\n').split()
+                message = f.read()
+            messages.append((name, int(name.split('-')[1]), from_addr,
+                             recipients, message))
+        return messages
+
+    def remove(self, name):
+        """Remove a delivered message."""
+        os.unlink(os.path.join(self.path, 'work', name))
+
+    def retry(self, name, delay):
+        """Put back a claimed message in the spool, for another attempt
+        after `delay` seconds."""
+        attempts = int(name.split('-')[1]) + 1
+        due = (time.time() + delay) * 1000000
+        uid = name.split('-', 2)[2]
+        os.rename(os.path.join(self.path, 'work', name),
+                  os.path.join(self.path, 'new',
+                               '%d-%d-%s' % (due, attempts, uid)))
+
+    def fail(self, name):
+        """Give up delivering a claimed message."""
+        os.rename(os.path.join(self.path, 'work', name),
+                  os.path.join(self.path, 'failed', name))
+
+    def recover(self, timeout):
+        """Put back in the spool the messages claimed more than
+        `timeout` seconds ago, e.g. by a process which died."""
+        work = os.path.join(self.path, 'work')
+        limit = time.time() - timeout
+        for name in os.listdir(work):
+            path = os.path.join(work, name)
+            try:
+                if os.path.getmtime(path) < limit:
+                    os.rename(path, os.path.join(self.path, 'new', name))
+            except OSError:
+                pass
+
+    def count(self, name='new'):
+        """Return the number of messages in the given subdirectory."""
+        return len(os.listdir(os.path.join(self.path, name)))
+
+
+def _due_time(name):
+    return int(name.split('-', 1)[0])
+
+
+class QueuedEmailSender(Component):
+    """E-mail sender storing the messages in a spool directory, from
+    which they are delivered by a background thread.
+
+    The notifications are therefore no longer delayed by the mail
+    delivery. The messages are delivered through the sender selected
+    by `[notification] queue_email_sender`; for `SmtpEmailSender`, a
+    single connection is used for all the messages ready for delivery.
+    Failed deliveries are retried after increasing delays.
+
+    Messages left in the spool by a previous process are delivered
+    when the next message is queued, or with `trac-admin`
+    `notification flush`.
+    """
+
+    implements(IAdminCommandProvider, IEmailSender, IMetricsProvider)
+
+    queue_email_sender = ExtensionOption('notification',
+                                         'queue_email_sender', IEmailSender,
+                                         'SmtpEmailSender',
+        """Name of the component implementing `IEmailSender` used for
+        delivering the messages queued by `QueuedEmailSender`.
+        (''since 1.0.2'')""")
+
+    queue_dir = Option('notification', 'queue_dir', 'spool',
+        """Directory where the messages are queued by `QueuedEmailSender`.
+        Relative paths are resolved from the environment directory.
+        (''since 1.0.2'')""")
+
+    queue_retry_delay = IntOption('notification', 'queue_retry_delay', 60,
+        """Number of seconds before the first new delivery attempt of a
+        queued message, doubled after each failure. (''since 1.0.2'')""")
+
+    queue_max_attempts = IntOption('notification', 'queue_max_attempts', 10,
+        """Number of delivery attempts of a queued message before giving
+        up. (''since 1.0.2'')""")
+
+    queue_batch_size = IntOption('notification', 'queue_batch_size', 100,
+        """Maximum number of queued messages sent over a single
+        connection. (''since 1.0.2'')""")
+
+    # Number of seconds between checks for messages to retry
+    poll_interval = 30
+    # Number of seconds after which messages claimed by a worker are
+    # considered abandoned
+    claim_timeout = 3600
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._worker = None
+        self._stopped = False
+        self._spool = None
+
+    # IEmailSender methods
+
+    def send(self, from_addr, recipients, message):
+        parent = getattr(self.env, 'parent', None)
+        if parent is not None:
+            return QueuedEmailSender(parent).send(from_addr, recipients,
+                                                  message)
+        self.spool.put(from_addr, recipients, message)
+        self.log.debug("Queued notification to %s", recipients)
+        self._start_worker()
+        self._wakeup.set()
+
+    # IAdminCommandProvider methods
+
+    def get_admin_commands(self):
+        yield ('notification queue', '',
+               'Show the number of queued and failed notifications',
+               None, self._do_queue)
+        yield ('notification flush', '',
+               'Deliver the queued notifications which are due',
+               None, self._do_flush)
+
+    # IMetricsProvider methods
+
+    def get_metrics(self):
+        if self.config.get('notification', 'email_sender') != \
+                self.__class__.__name__:
+            return ''
+        queued, failed = self.get_queue_depth()
+        return format_counters('trac_notification_queue_depth',
+                               "Notifications waiting for delivery.",
+                               'state', {'queued': queued, 'failed': failed},
+                               metric_type='gauge')
+
+    # Public API
+
+    @property
+    def spool(self):
+        """The `MailSpool` holding the queued messages."""
+        if self._spool is None:
+            path = self.queue_dir
+            if not os.path.isabs(path):
+                path = os.path.join(self.env.path, path)
+            self._spool = MailSpool(path)
+        return self._spool
+
+    def shutdown(self):
+        """Stop the background delivery thread. The messages left in
+        the spool are delivered by the next process."""
+        with self._lock:
+            self._stopped = True
+        self._wakeup.set()
+
+    def get_queue_depth(self):
+        """Return the number of messages waiting for delivery, and the
+        number of messages which couldn't be delivered."""
+        return self.spool.count('new'), self.spool.count('failed')
+
+    def flush(self):
+        """Deliver the queued messages which are due, and return the
+        number of messages delivered."""
+        # Messages put back for a retry are left for the next flush
+        now = time.time()
+        delivered = 0
+        while True:
+            messages = self.spool.claim(self.queue_batch_size, now)
+            if not messages:
+                return delivered
+            delivered += self._deliver(messages)
+
+    # Internal methods
+
+    def _deliver(self, messages):
+        sender = self.queue_email_sender
+        pooled = hasattr(sender, 'open_connection')
+        server = None
+        delivered = 0
+        try:
+            for name, attempts, from_addr, recipients, message in messages:
+                try:
+                    if not pooled:
+                        sender.send(from_addr, recipients, message)
+                    else:
+                        if server is None:
+                            server = sender.open_connection()
+                        sender.send_message(server, from_addr, recipients,
+                                            message)
+                except Exception, e:
+                    if server is not None and \
+                            isinstance(e, (socket.error,
+                                           smtplib.SMTPServerDisconnected)):
+                        try:
+                            sender.close_connection(server)
+                        except Exception:
+                            pass
+                        server = None
+                    self._failed(name, attempts, recipients, e)
+                else:
+                    self.spool.remove(name)
+                    delivered += 1
+        finally:
+            if server is not None:
+                sender.close_connection(server)
+        return delivered
+
+    def _failed(self, name, attempts, recipients, e):
+        attempts += 1
+        if attempts >= self.queue_max_attempts:
+            self.log.error("Failed to deliver notification to %s, giving "
+                           "up after %d attempts: %s", recipients, attempts,
+                           exception_to_unicode(e))
+            self.spool.fail(name)
+        else:
+            delay = self.queue_retry_delay * 2 ** (attempts - 1)
+            self.log.warning("Failed to deliver notification to %s, "
+                             "retrying in %d seconds: %s", recipients,
+                             delay, exception_to_unicode(e))
+            self.spool.retry(name, delay)
+
+    def _start_worker(self):
+        with self._lock:
+            if self._stopped:
+                return
+            if self._worker is None or not self._worker.isAlive():
+                self.spool.recover(self.claim_timeout)
+                self._worker = threading.Thread(target=self._run,
+                                                name='QueuedEmailSender')
+                self._worker.setDaemon(True)
+                self._worker.start()
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            if self._stopped:
+                break
+            try:
+                self.flush()
+            except Exception, e:
+                self.log.error("Failed to deliver queued notifications: %s",
+                               exception_to_unicode(e, traceback=True))
+
+    def _do_queue(self):
+        queued, failed = self.get_queue_depth()
+        printout(_("Queued notifications: %(queued)d, failed: %(failed)d",
+                   queued=queued, failed=failed))
+
+    def _do_flush(self):
+        printout(_("%(count)d notifications delivered", count=self.flush()))
+
+
 class Notify(object):
     """Generic notification class for Trac.
 
@@ -283,13 +623,9 @@ class NotifyEmail(Notify):
         domains = self.env.config.get('notification', 'ignore_domains', '')
         self._ignore_domains = [x.strip() for x in domains.lower().split(',')]
         # Get the name and email addresses of all known users
-        self.name_map = {}
-        self.email_map = {}
-        for username, name, email in self.env.get_known_users():
-            if name:
-                self.name_map[username] = name
-            if email:
-                self.email_map[username] = email
+        users = UserDirectory(self.env)
+        self.name_map = users.get_name_map()
+        self.email_map = users.get_email_map()
 
     def _init_pref_encoding(self):
         from email.Charset import Charset, QP, BASE64, SHORTEST
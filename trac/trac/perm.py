@@ -24,14 +24,18 @@ from time import time
 
 from trac.admin import AdminCommandError, IAdminCommandProvider, get_dir_list
 from trac.cache import cached
-from trac.config import ExtensionOption, OrderedExtensionsOption
+from trac.config import ExtensionOption, IntOption, OrderedExtensionsOption
 from trac.core import *
+from trac.db.pool import DurationHistogram
 from trac.resource import get_resource_name, manager_for_neighborhood, \
                           Neighborhood, Resource
 from trac.util import file_or_std
+from trac.util.concurrency import threading
 from trac.util.text import path_to_unicode, print_table, printout, \
                            stream_encoding, to_unicode, wrap
 from trac.util.translation import _
+from trac.web.metrics import IMetricsProvider, format_counters, \
+                             format_histograms
 
 __all__ = ['IPermissionRequestor', 'IPermissionStore', 'IPermissionPolicy',
            'IPermissionGroupProvider', 'PermissionError', 'PermissionSystem']
@@ -120,7 +124,14 @@ class IPermissionGroupProvider(Interface):
 
 
 class IPermissionPolicy(Interface):
-    """A security policy provider used for fine grained permission checks."""
+    """A security policy provider used for fine grained permission checks.
+
+    A policy whose decisions only depend on the `check_permission`
+    arguments and on the permission store contents can set the
+    `cacheable_decisions` class attribute to `True`, allowing the
+    `PermissionSystem` to reuse its decisions across requests (see
+    `[trac] permission_decision_cache_ttl`). ''(Since 1.0.2)''
+    """
 
     def check_permission(action, username, resource, perm):
         """Check that the action can be performed by username on the resource
@@ -160,6 +171,48 @@ class IPermissionPolicy(Interface):
         """
 
 
+class PermissionIndex(object):
+    """Precomputed lookup tables for a list of `(subject, action)`
+    permission records.
+
+    `actions` maps each subject to the set of actions granted to it,
+    either directly or through the groups it belongs to, recursively.
+    `subjects` is the inverse mapping, from each action to the subjects
+    being granted that action.
+    """
+
+    def __init__(self, perms):
+        self.perms = perms
+        direct = {}
+        groups = {}
+        for subject, action in perms:
+            if action.isupper():
+                direct.setdefault(subject, set()).add(action)
+            else:
+                # action is actually the name of the permission group here
+                groups.setdefault(subject, set()).add(action)
+        self.actions = {}
+        self.subjects = {}
+        for subject in set(direct) | set(groups):
+            actions = self.actions[subject] = \
+                      self._expand(subject, direct, groups)
+            for action in actions:
+                self.subjects.setdefault(action, set()).add(subject)
+
+    def _expand(self, subject, direct, groups):
+        actions = set()
+        seen = set([subject])
+        pending = [subject]
+        while pending:
+            subject = pending.pop()
+            actions.update(direct.get(subject, ()))
+            for group in groups.get(subject, ()):
+                if group not in seen:
+                    seen.add(group)
+                    pending.append(group)
+        return frozenset(actions)
+
+
 class DefaultPermissionStore(Component):
     """Default implementation of permission storage and group management.
 
@@ -170,6 +223,8 @@ class DefaultPermissionStore(Component):
 
     group_providers = ExtensionPoint(IPermissionGroupProvider)
 
+    _index = None
+
     def get_user_permissions(self, username):
         """Retrieve the permissions for the given user and return them in a
         dictionary.
@@ -179,25 +234,10 @@ class DefaultPermissionStore(Component):
         the action column: such a record represents a group and not an actual
         permission, and declares that the user is part of that group.
         """
-        subjects = set([username])
-        for provider in self.group_providers:
-            subjects.update(provider.get_permission_groups(username) or [])
-
-        actions = set()
-        perms = self._all_permissions
-        while True:
-            num_users = len(subjects)
-            num_actions = len(actions)
-            for user, action in perms:
-                if user in subjects:
-                    if action.isupper() and action not in actions:
-                        actions.add(action)
-                    if not action.isupper() and action not in subjects:
-                        # action is actually the name of the permission
-                        # group here
-                        subjects.add(action)
-            if num_users == len(subjects) and num_actions == len(actions):
-                break
+        index = self._permission_index
+        actions = set(index.actions.get(username, ()))
+        for subject in self._get_groups(username):
+            actions.update(index.actions.get(subject, ()))
         return list(actions)
 
     def get_users_with_permissions(self, permissions):
@@ -205,16 +245,19 @@ class DefaultPermissionStore(Component):
 
         Users are returned as a list of usernames.
         """
-        # get_user_permissions() takes care of the magic 'authenticated' group.
-        # The optimized loop we had before didn't.  This is very inefficient,
-        # but it works.
+        index = self._permission_index
+        subjects = set()
+        for action in permissions:
+            subjects.update(index.subjects.get(action, ()))
+        if not subjects:
+            return []
         result = set()
-        users = set([u[0] for u in self.env.get_known_users()])
-        for user in users:
-            userperms = self.get_user_permissions(user)
-            for group in permissions:
-                if group in userperms:
-                    result.add(user)
+        for user in set([u[0] for u in self.env.get_known_users()]):
+            # The groups from the providers take care of the magic
+            # 'authenticated' group.
+            if user in subjects or \
+                    any(group in subjects for group in self._get_groups(user)):
+                result.add(user)
         return list(result)
 
     def get_all_permissions(self):
@@ -230,6 +273,22 @@ class DefaultPermissionStore(Component):
         return [(username, action) for username, action in
                 self.env.db_query("SELECT username, action FROM permission")]
 
+    @property
+    def _permission_index(self):
+        """The `PermissionIndex` of the permission table, rebuilt when
+        the cached permissions are invalidated."""
+        perms = self._all_permissions
+        index = self._index
+        if index is None or index.perms is not perms:
+            index = self._index = PermissionIndex(perms)
+        return index
+
+    def _get_groups(self, username):
+        groups = set()
+        for provider in self.group_providers:
+            groups.update(provider.get_permission_groups(username) or [])
+        return groups
+
     def grant_permission(self, username, action):
         """Grants a user the permission to perform the specified action."""
         self.env.db_transaction("INSERT INTO permission VALUES (%s, %s)",
@@ -270,6 +329,8 @@ class DefaultPermissionPolicy(Component):
 
     implements(IPermissionPolicy)
 
+    cacheable_decisions = True
+
     # Number of seconds a cached user permission set is valid for.
     CACHE_EXPIRY = 5
     # How frequently to clear the entire permission cache
@@ -307,7 +368,7 @@ class PermissionSystem(Component):
 
     required = True
 
-    implements(IPermissionRequestor)
+    implements(IMetricsProvider, IPermissionRequestor)
 
     requestors = ExtensionPoint(IPermissionRequestor)
 
@@ -327,10 +388,21 @@ class PermissionSystem(Component):
         LegacyAttachmentPolicy (map ATTACHMENT_* permissions to realm specific
         ones)""")
 
+    decision_cache_ttl = IntOption('trac', 'permission_decision_cache_ttl',
+                                   '0',
+        """Number of seconds during which the permission decisions are
+        cached across requests. Only the decisions made by policies
+        declaring them cacheable are kept. The cached decisions are
+        discarded whenever permissions are granted or revoked, or when
+        products are modified. Use '0' to disable the cache.
+        ''(Since 1.0.2)''""")
+
     # Number of seconds a cached user permission set is valid for.
     CACHE_EXPIRY = 5
     # How frequently to clear the entire permission cache
     CACHE_REAP_TIME = 60
+    # Maximum number of cached permission decisions
+    DECISION_CACHE_SIZE = 100000
 
     def __init__(self):
         self.permission_cache = {}
@@ -345,10 +417,26 @@ class PermissionSystem(Component):
             raise TracError(_('%(name)s is not a valid action.', name=action))
 
         self.store.grant_permission(username, action)
+        self.reset_decision_cache()
 
     def revoke_permission(self, username, action):
         """Revokes the permission of the specified user to perform an action."""
         self.store.revoke_permission(username, action)
+        self.reset_decision_cache()
+
+    def reset_decision_cache(self):
+        """Discard the permission decisions cached across requests, in
+        all processes and for all products.
+
+        This must be called when the data the cacheable policies rely
+        on is changed. :since 1.0.2:
+        """
+        if self.decision_cache_ttl > 0:
+            del self._decision_cache
+
+    @cached
+    def _decision_cache(self):
+        return {}
 
     def get_actions_dict(self):
         """Get all actions from permission requestors as a `dict`.
@@ -470,18 +558,58 @@ class PermissionSystem(Component):
                 else:
                     return PermissionSystem(compmgr).check_permission(
                             action, username, resource, perm)
+        ttl = self.decision_cache_ttl
+        if ttl > 0:
+            key = (username, action, _resource_key(resource))
+            cache = self._decision_cache
+            now = time()
+            cached = cache.get(key)
+            if cached and now - cached[1] < ttl:
+                _policy_metrics.hit()
+                return cached[0]
+        decision, cacheable = self._check_policies(action, username,
+                                                   resource, perm)
+        if ttl > 0 and cacheable:
+            if len(cache) >= self.DECISION_CACHE_SIZE:
+                cache.clear()
+            cache[key] = (decision, now)
+        return decision
+
+    def _check_policies(self, action, username, resource, perm):
+        """Apply the policies in turn and return the decision, and
+        whether all the policies involved declared their decisions
+        cacheable."""
+        cacheable = True
         for policy in self.policies:
+            start = time()
             decision = policy.check_permission(action, username, resource,
                                                perm)
+            _policy_metrics.add(policy.__class__.__name__, time() - start)
+            cacheable = cacheable and \
+                        getattr(policy, 'cacheable_decisions', False)
             if decision is not None:
                 if not decision:
                     self.log.debug("%s denies %s performing %s on %r",
                                    policy.__class__.__name__, username,
                                    action, resource)
-                return decision
+                return decision, cacheable
         self.log.debug("No policy allowed %s performing %s on %r",
                        username, action, resource)
-        return False
+        return False, cacheable
+
+    # IMetricsProvider methods
+
+    def get_metrics(self):
+        stats = get_policy_stats()
+        return format_histograms('trac_permission_policy_seconds',
+                                 "Evaluation time of the permission policies.",
+                                 ('policy',),
+                                 dict(((policy,), values) for policy, values
+                                      in stats['policies'].iteritems())) + \
+               format_counters('trac_permission_cache_hits_total',
+                               "Permission decisions retrieved from the "
+                               "cache.", 'cache',
+                               {'decision': stats['cache_hits']})
 
     # IPermissionRequestor methods
 
@@ -497,6 +625,61 @@ class PermissionSystem(Component):
         return [('TRAC_ADMIN', actions), 'EMAIL_VIEW']
 
 
+def _resource_key(resource):
+    key = ()
+    while resource:
+        key += (resource.realm, resource.id, resource.version)
+        resource = resource.parent
+    return key
+
+
+class PolicyMetrics(object):
+    """Process-wide statistics about the permission policies: the
+    evaluation time of each policy component, and the use of the
+    decision cache."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def add(self, name, duration):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = DurationHistogram(
+                    (0.0001, 0.001, 0.01, 0.1, 1))
+            histogram.add(duration)
+
+    def hit(self):
+        self.cache_hits += 1
+
+    def get_stats(self):
+        """Return a dictionary with the number of `cache_hits`, and the
+        `policies` histograms (as returned by `as_dict`) by policy
+        name."""
+        with self._lock:
+            return {'cache_hits': self.cache_hits,
+                    'policies': dict((name, histogram.as_dict())
+                                     for name, histogram
+                                     in self._histograms.iteritems())}
+
+    def reset(self):
+        self.cache_hits = 0
+        self._histograms = {}
+
+
+_policy_metrics = PolicyMetrics()
+
+
+def get_policy_stats():
+    """Return the permission policy statistics of the process.
+
+    :see: `PolicyMetrics.get_stats`
+    :since: 1.0.2
+    """
+    return _policy_metrics.get_stats()
+
+
 class PermissionCache(object):
     """Cache that maintains the permissions of a single user.
 
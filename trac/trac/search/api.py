@@ -41,6 +41,44 @@ class ISearchSource(Interface):
         """
 
 
+class ISearchIndex(Interface):
+    """Extension point interface for full-text indexes which can answer
+    the searches of the built-in search sources, instead of scanning the
+    database.
+
+    :since 1.0.2:
+    """
+
+    def find_resources(req, realm, terms):
+        """Return the identifiers of the resources of `realm` matching
+        all the `terms`, or `None` if the index can't search `realm`.
+
+        The identifiers of changesets are `(reponame, rev)` pairs, the
+        identifiers of the other resources are their `id`.
+        """
+
+
+class FullTextSearch(Component):
+    """Delegate the searches of the built-in search sources to the
+    first `ISearchIndex` able to answer them.
+
+    :since 1.0.2:
+    """
+
+    indexes = ExtensionPoint(ISearchIndex)
+
+    def find_resources(self, req, realm, terms):
+        """Return the identifiers of the resources of `realm` matching
+        all the `terms`, or `None` if no index can search `realm`, in
+        which case the search source should query the database.
+        """
+        for index in self.indexes:
+            ids = index.find_resources(req, realm, terms)
+            if ids is not None:
+                return ids
+        return None
+
+
 def search_to_sql(db, columns, terms):
     """Convert a search query into an SQL WHERE clause and corresponding
     parameters.
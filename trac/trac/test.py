@@ -32,7 +32,7 @@ except ImportError:
 
 from trac.config import Configuration
 from trac.core import Component, ComponentManager
-from trac.env import Environment
+from trac.env import Environment, UserDirectory
 from trac.db.api import _parse_db_str, DatabaseManager
 from trac.db.sqlite_backend import SQLiteConnection
 from trac.db.util import ConnectionWrapper
@@ -301,7 +301,7 @@ class EnvironmentStub(Environment):
         self.href = Href('/trac.cgi')
         self.abs_href = Href('http://example.org/trac.cgi')
 
-        self.known_users = []
+        self._known_users = []
         translation.activate(locale_en)
 
     def reset_db(self, default_data=None):
@@ -390,9 +390,18 @@ class EnvironmentStub(Environment):
             return True
         return Environment.is_component_enabled(self, cls)
 
-    def get_known_users(self, cnx=None):
+    def _load_known_users(self):
         return self.known_users
 
+    def _get_known_users_stub(self):
+        return self._known_users
+
+    def _set_known_users_stub(self, users):
+        self._known_users = users
+        UserDirectory(self).invalidate()
+
+    known_users = property(_get_known_users_stub, _set_known_users_stub)
+
 
 def locate(fn):
     """Locates a binary on the path.
@@ -1,7 +1,7 @@
 import unittest
 
-from trac.tests import attachment, config, core, env, perm, resource, \
-                       wikisyntax, functional
+from trac.tests import attachment, config, core, emailqueue, env, perm, \
+                       resource, wikisyntax, functional
 
 def suite():
     suite = unittest.TestSuite()
@@ -14,6 +14,7 @@ def basicSuite():
     suite.addTest(attachment.suite())
     suite.addTest(config.suite())
     suite.addTest(core.suite())
+    suite.addTest(emailqueue.suite())
     suite.addTest(env.suite())
     suite.addTest(perm.suite())
     suite.addTest(resource.suite())
@@ -1,17 +1,24 @@
 # -*- coding: utf-8 -*-
 
+from __future__ import with_statement
+
+import io
 import os.path
 import shutil
 from StringIO import StringIO
 import tempfile
 import unittest
 
-from trac.attachment import Attachment, AttachmentModule
+from trac.attachment import Attachment, AttachmentModule, \
+                           DeduplicatingAttachmentStorage, IAttachmentStorage
 from trac.core import Component, implements, TracError
+from trac.mimeview.api import Mimeview
 from trac.perm import IPermissionPolicy, PermissionCache
-from trac.resource import Resource, resource_exists
+from trac.resource import Resource, ResourceNotFound, resource_exists
 from trac.test import EnvironmentStub
 from trac.tests.resource import TestResourceChangeListener
+from trac.web.api import Request, RequestDone
+from trac.web.chrome import web_context
 
 
 hashes = {
@@ -40,6 +47,76 @@ class TicketOnlyViewsTicket(Component):
             return None
 
 
+class ObjectStore(object):
+    """In-memory stand-in for an S3-like object store."""
+
+    def __init__(self):
+        self.objects = {}
+
+    def put(self, key, data):
+        self.objects[key] = data
+
+    def get(self, key):
+        return self.objects[key]
+
+    def copy(self, source, key):
+        self.objects[key] = self.objects[source]
+
+    def delete(self, key):
+        self.objects.pop(key, None)
+
+
+class ObjectStoreAttachmentStorage(Component):
+    """Store the content of attachments in an `ObjectStore`."""
+
+    implements(IAttachmentStorage)
+
+    def __init__(self):
+        self.store = ObjectStore()
+
+    def _key(self, parent_realm, parent_id, filename):
+        return '/'.join((parent_realm, unicode(parent_id), filename))
+
+    def create_blob(self, fileobj):
+        data = fileobj.read()
+        blob = 'uploads/%d' % len(self.store.objects)
+        self.store.put(blob, data)
+        return blob, len(data)
+
+    def link_blob(self, blob, parent_realm, parent_id, filename):
+        key = self._key(parent_realm, parent_id, filename)
+        if key in self.store.objects:
+            return False
+        self.store.copy(blob, key)
+        self.store.delete(blob)
+        return True
+
+    def discard_blob(self, blob):
+        self.store.delete(blob)
+
+    def open(self, parent_realm, parent_id, filename):
+        try:
+            data = self.store.get(self._key(parent_realm, parent_id,
+                                            filename))
+        except KeyError:
+            raise IOError("No such object")
+        return io.BytesIO(data)
+
+    def get_local_path(self, parent_realm, parent_id, filename):
+        return None
+
+    def delete(self, parent_realm, parent_id, filename):
+        self.store.delete(self._key(parent_realm, parent_id, filename))
+
+    def move(self, parent_realm, parent_id, filename, new_realm, new_id):
+        key = self._key(parent_realm, parent_id, filename)
+        new_key = self._key(new_realm, new_id, filename)
+        if new_key in self.store.objects:
+            raise TracError("Exists")
+        self.store.copy(key, new_key)
+        self.store.delete(key)
+
+
 class AttachmentTestCase(unittest.TestCase):
 
     def setUp(self):
@@ -206,6 +283,25 @@ class AttachmentTestCase(unittest.TestCase):
         assert not os.path.exists(path1) and os.path.exists(attachment1.path)
         assert os.path.exists(attachment2.path)
 
+    def test_render_preview(self):
+        self.env.config.set('mimeviewer', 'preview_cache_size', 100000)
+        attachment = Attachment(self.env, 'wiki', 'SomePage')
+        attachment.insert('foo.txt', StringIO('line 1\n'), 7)
+        module = AttachmentModule(self.env)
+        module._render_preview(attachment)
+        mimeview = Mimeview(self.env)
+        self.assertEqual(1, len(os.listdir(mimeview.preview_cache.path)))
+
+        class UnreadableContent(object):
+            def read(self, size=-1):
+                raise AssertionError("Content read")
+        data = mimeview.preview_data(
+            web_context(None, attachment.resource), UnreadableContent(), 7,
+            mimeview.get_mimetype('foo.txt', 'line 1\n'), 'foo.txt',
+            annotations=['lineno'],
+            cache_key=module._preview_cache_key(attachment))
+        self.assertTrue('line 1' in data['rendered'])
+
     def test_legacy_permission_on_parent(self):
         """Ensure that legacy action tests are done on parent.  As
         `ATTACHMENT_VIEW` maps to `TICKET_VIEW`, the `TICKET_VIEW` is tested
@@ -223,6 +319,161 @@ class AttachmentTestCase(unittest.TestCase):
         self.assertTrue(resource_exists(self.env, att.resource))
 
 
+class AttachmentStorageTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.env = EnvironmentStub(enable=['trac.*',
+                                           ObjectStoreAttachmentStorage])
+        self.env.path = tempfile.mkdtemp(prefix='trac-tempenv-')
+        self.env.config.set('attachment', 'storage',
+                            'ObjectStoreAttachmentStorage')
+        self.store = ObjectStoreAttachmentStorage(self.env).store
+
+    def tearDown(self):
+        shutil.rmtree(self.env.path)
+        self.env.reset_db()
+
+    def _read(self, attachment):
+        with attachment.open() as fd:
+            return fd.read()
+
+    def test_insert_and_open(self):
+        attachment = Attachment(self.env, 'ticket', 42)
+        attachment.insert('foo.txt', StringIO('Hello'), 0)
+        attachment = Attachment(self.env, 'ticket', 42, 'foo.txt')
+        self.assertEqual(5, attachment.size)
+        self.assertEqual('Hello', self._read(attachment))
+        self.assertEqual({'ticket/42/foo.txt': 'Hello'}, self.store.objects)
+        self.assertFalse(os.path.exists(os.path.join(self.env.path,
+                                                     'files')))
+
+    def test_insert_unique(self):
+        for content in ('one', 'two'):
+            attachment = Attachment(self.env, 'ticket', 42)
+            attachment.insert('foo.txt', StringIO(content), 0)
+        self.assertEqual('foo.2.txt', attachment.filename)
+        self.assertEqual('two', self._read(attachment))
+        self.assertEqual(['ticket/42/foo.2.txt', 'ticket/42/foo.txt'],
+                         sorted(self.store.objects))
+
+    def test_insert_failure_discards_blob(self):
+        def link_blob(*args):
+            raise IOError("Store unavailable")
+        ObjectStoreAttachmentStorage(self.env).link_blob = link_blob
+        attachment = Attachment(self.env, 'ticket', 42)
+        self.assertRaises(IOError, attachment.insert, 'foo.txt',
+                          StringIO('Hello'), 0)
+        self.assertEqual({}, self.store.objects)
+        self.assertEqual([], list(Attachment.select(self.env, 'ticket', 42)))
+
+    def test_reparent_and_delete(self):
+        attachment = Attachment(self.env, 'wiki', 'SomePage')
+        attachment.insert('foo.txt', StringIO('Hello'), 0)
+        attachment.reparent('ticket', 123)
+        self.assertEqual({'ticket/123/foo.txt': 'Hello'}, self.store.objects)
+        attachment.delete()
+        self.assertEqual({}, self.store.objects)
+        self.assertRaises(ResourceNotFound, attachment.open)
+
+    def test_send_content(self):
+        attachment = Attachment(self.env, 'ticket', 42)
+        attachment.insert('foo.txt', StringIO('Hello'), 0)
+        headers_sent = {}
+        body = StringIO()
+        def start_response(status, headers):
+            headers_sent.update(dict(headers))
+            return body.write
+        req = Request({'REQUEST_METHOD': 'GET', 'wsgi.url_scheme': 'http',
+                       'SERVER_NAME': 'example.org', 'SERVER_PORT': 80,
+                       'SCRIPT_NAME': '/trac'}, start_response)
+        with attachment.open() as fd:
+            self.assertRaises(RequestDone,
+                              AttachmentModule(self.env)._send_content,
+                              req, attachment, fd, 'text/plain')
+        self.assertEqual('5', headers_sent['Content-Length'])
+        self.assertEqual('Hello', body.getvalue())
+
+    def test_resource_exists(self):
+        attachment = Attachment(self.env, 'ticket', 42)
+        attachment.insert('foo.txt', StringIO('Hello'), 0)
+        self.assertTrue(resource_exists(self.env, attachment.resource))
+        attachment.delete()
+        self.assertFalse(resource_exists(self.env, attachment.resource))
+
+    def test_reparent_existing(self):
+        for realm, id in (('wiki', 'SomePage'), ('ticket', 123)):
+            attachment = Attachment(self.env, realm, id)
+            attachment.insert('foo.txt', StringIO(realm), 0)
+        attachment = Attachment(self.env, 'wiki', 'SomePage', 'foo.txt')
+        self.assertRaises(TracError, attachment.reparent, 'ticket', 123)
+        self.assertEqual('wiki', self._read(attachment))
+
+
+class DeduplicatingAttachmentStorageTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.env = EnvironmentStub()
+        self.env.path = tempfile.mkdtemp(prefix='trac-tempenv-')
+        self.env.config.set('attachment', 'storage',
+                            'DeduplicatingAttachmentStorage')
+        self.blobs_dir = os.path.join(self.env.path, 'files', 'blobs')
+
+    def tearDown(self):
+        shutil.rmtree(self.env.path)
+        self.env.reset_db()
+
+    def _blobs(self):
+        return [name for dirpath, dirnames, filenames
+                     in os.walk(self.blobs_dir) for name in filenames]
+
+    def _insert(self, parent_id, filename, content):
+        attachment = Attachment(self.env, 'ticket', parent_id)
+        attachment.insert(filename, StringIO(content), 0)
+        return attachment
+
+    def test_identical_content_is_stored_once(self):
+        attachment1 = self._insert(1, 'foo.txt', 'Hello')
+        attachment2 = self._insert(2, 'bar.txt', 'Hello')
+        attachment3 = self._insert(2, 'baz.txt', 'World')
+        self.assertTrue(isinstance(AttachmentModule(self.env).storage,
+                                   DeduplicatingAttachmentStorage))
+        if hasattr(os, 'link'):
+            self.assertTrue(os.path.samefile(attachment1.path,
+                                             attachment2.path))
+        self.assertEqual(2, len(self._blobs()))
+        with attachment2.open() as fd:
+            self.assertEqual('Hello', fd.read())
+
+        attachment1.delete()
+        self.assertEqual(2, len(self._blobs()))
+        attachment2.delete()
+        attachment3.reparent('wiki', 'SomePage')
+        if hasattr(os, 'link'):
+            self.assertEqual(1, len(self._blobs()))
+        with attachment3.open() as fd:
+            self.assertEqual('World', fd.read())
+
+    def test_insert_unique(self):
+        self._insert(1, 'foo.txt', 'Hello')
+        attachment = self._insert(1, 'foo.txt', 'Hello')
+        self.assertEqual('foo.2.txt', attachment.filename)
+        self.assertEqual(1, len(self._blobs()))
+
+    def test_insert_failure_releases_blob_once(self):
+        self.env.db_transaction("""
+            INSERT INTO attachment (type, id, filename) VALUES (%s,%s,%s)
+            """, ('ticket', '1', 'foo.txt'))
+        discarded = []
+        storage = AttachmentModule(self.env).storage
+        storage.discard_blob = discarded.append
+        attachment = Attachment(self.env, 'ticket', 1)
+        attachment._exists = lambda filename: False
+        self.assertRaises(self.env.db_exc.IntegrityError, attachment.insert,
+                          'foo.txt', StringIO('Hello'), 0)
+        self.assertEqual([], discarded)
+        self.assertEqual([], self._blobs())
+
+
 class AttachmentResourceChangeListenerTestCase(unittest.TestCase):
     DUMMY_PARENT_REALM = "wiki"
     DUMMY_PARENT_ID = "WikiStart"
@@ -278,6 +529,9 @@ class AttachmentResourceChangeListenerTestCase(unittest.TestCase):
 def suite():
     suite = unittest.TestSuite()
     suite.addTest(unittest.makeSuite(AttachmentTestCase, 'test'))
+    suite.addTest(unittest.makeSuite(AttachmentStorageTestCase, 'test'))
+    suite.addTest(unittest.makeSuite(DeduplicatingAttachmentStorageTestCase,
+                                     'test'))
     suite.addTest(unittest.makeSuite(
         AttachmentResourceChangeListenerTestCase, 'test'))
     return suite
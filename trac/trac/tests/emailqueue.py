@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at http://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at http://trac.edgewall.org/log/.
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from trac.core import Component, implements
+from trac.notification import IEmailSender, MailSpool, QueuedEmailSender, \
+                              SmtpEmailSender
+from trac.test import EnvironmentStub
+from trac.tests.notification import SMTPServerStore, SMTPThreadedServer
+
+SMTP_TEST_PORT = 8000 + os.getpid() % 1000
+
+
+class SMTPServerMultiStore(SMTPServerStore):
+    """Keep all the messages received by the server"""
+
+    def __init__(self):
+        SMTPServerStore.__init__(self)
+        self.messages = []
+        self.connections = 0
+
+    def helo(self, args):
+        SMTPServerStore.helo(self, args)
+        self.connections += 1
+
+    def mail_from(self, args):
+        self.recipients = []
+        SMTPServerStore.mail_from(self, args)
+
+    def data(self, args):
+        SMTPServerStore.data(self, args)
+        self.messages.append((self.sender, self.recipients, self.message))
+
+
+class FailingEmailSender(Component):
+    """Email sender failing for the recipients in `failing`"""
+
+    implements(IEmailSender)
+
+    def __init__(self):
+        self.failing = set()
+        self.sent = []
+
+    def send(self, from_addr, recipients, message):
+        if self.failing.intersection(recipients):
+            raise IOError("Delivery failed")
+        self.sent.append((from_addr, recipients, message))
+
+
+class MailSpoolTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp(prefix='trac-spool-')
+        self.spool = MailSpool(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_put_claim_remove(self):
+        self.spool.put('joe@example.org', [u'jim@example.org',
+                                           'jack@example.org'], 'body\r\n')
+        self.assertEqual(1, self.spool.count())
+        messages = self.spool.claim(10)
+        self.assertEqual(1, len(messages))
+        name, attempts, from_addr, recipients, message = messages[0]
+        self.assertEqual(0, attempts)
+        self.assertEqual('joe@example.org', from_addr)
+        self.assertEqual(['jim@example.org', 'jack@example.org'], recipients)
+        self.assertEqual('body\r\n', message)
+        self.assertEqual(0, self.spool.count())
+        self.assertEqual([], self.spool.claim(10))
+        self.spool.remove(name)
+        self.assertEqual(0, self.spool.count('work'))
+
+    def test_claim_due_only(self):
+        self.spool.put('joe@example.org', ['jim@example.org'], 'later',
+                       due=time.time() + 3600)
+        self.spool.put('joe@example.org', ['jim@example.org'], 'now')
+        messages = self.spool.claim(10)
+        self.assertEqual(['now'], [m[4] for m in messages])
+        self.assertEqual(1, self.spool.count())
+
+    def test_claim_limit(self):
+        for i in range(5):
+            self.spool.put('joe@example.org', ['jim@example.org'], str(i))
+        self.assertEqual(3, len(self.spool.claim(3)))
+        self.assertEqual(2, len(self.spool.claim(3)))
+
+    def test_retry_and_fail(self):
+        self.spool.put('joe@example.org', ['jim@example.org'], 'body')
+        name = self.spool.claim(1)[0][0]
+        self.spool.retry(name, 0)
+        name, attempts = self.spool.claim(1)[0][:2]
+        self.assertEqual(1, attempts)
+        self.spool.retry(name, 3600)
+        self.assertEqual([], self.spool.claim(1))
+        self.assertEqual(1, self.spool.count())
+
+    def test_recover(self):
+        self.spool.put('joe@example.org', ['jim@example.org'], 'body')
+        self.spool.claim(1)
+        self.spool.recover(3600)
+        self.assertEqual(0, self.spool.count())
+        self.spool.recover(-1)
+        self.assertEqual(1, self.spool.count())
+
+    def test_recover_keeps_old_message_just_claimed(self):
+        self.spool.put('joe@example.org', ['jim@example.org'], 'body')
+        new = os.path.join(self.path, 'new')
+        past = time.time() - 7200
+        for name in os.listdir(new):
+            os.utime(os.path.join(new, name), (past, past))
+        self.assertEqual(1, len(self.spool.claim(1)))
+        self.spool.recover(3600)
+        self.assertEqual(0, self.spool.count())
+        self.assertEqual(1, self.spool.count('work'))
+
+
+class QueuedEmailSenderTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.env = EnvironmentStub(enable=[QueuedEmailSender,
+                                           FailingEmailSender])
+        self.path = tempfile.mkdtemp(prefix='trac-spool-')
+        self.env.config.set('notification', 'queue_dir', self.path)
+        self.env.config.set('notification', 'queue_email_sender',
+                            'FailingEmailSender')
+        self.sender = QueuedEmailSender(self.env)
+        # Deliver explicitly, without the background thread
+        self.sender._start_worker = lambda: None
+        self.target = FailingEmailSender(self.env)
+
+    def tearDown(self):
+        self.sender.shutdown()
+        shutil.rmtree(self.path)
+        self.env.reset_db()
+
+    def test_send_queues(self):
+        self.sender.send('joe@example.org', ['jim@example.org'], 'body')
+        self.assertEqual((1, 0), self.sender.get_queue_depth())
+        self.assertEqual([], self.target.sent)
+        self.assertEqual(1, self.sender.flush())
+        self.assertEqual([('joe@example.org', ['jim@example.org'], 'body')],
+                         self.target.sent)
+        self.assertEqual((0, 0), self.sender.get_queue_depth())
+
+    def test_retry_with_backoff(self):
+        self.env.config.set('notification', 'queue_retry_delay', 0)
+        self.target.failing.add('jim@example.org')
+        self.sender.send('joe@example.org', ['jim@example.org'], 'body')
+        self.sender.send('joe@example.org', ['jack@example.org'], 'body')
+        self.assertEqual(1, self.sender.flush())
+        self.assertEqual((1, 0), self.sender.get_queue_depth())
+        self.target.failing.clear()
+        self.assertEqual(1, self.sender.flush())
+        self.assertEqual(['jack@example.org', 'jim@example.org'],
+                         [r[0] for f, r, m in self.target.sent])
+
+    def test_give_up(self):
+        self.env.config.set('notification', 'queue_retry_delay', 0)
+        self.env.config.set('notification', 'queue_max_attempts', 2)
+        self.target.failing.add('jim@example.org')
+        self.sender.send('joe@example.org', ['jim@example.org'], 'body')
+        self.assertEqual(0, self.sender.flush())
+        self.assertEqual((1, 0), self.sender.get_queue_depth())
+        self.assertEqual(0, self.sender.flush())
+        self.assertEqual((0, 1), self.sender.get_queue_depth())
+
+    def test_queue_depth_metrics(self):
+        self.assertEqual('', self.sender.get_metrics())
+        self.env.config.set('notification', 'email_sender',
+                            'QueuedEmailSender')
+        self.sender.send('joe@example.org', ['jim@example.org'], 'body')
+        self.assertEqual('# HELP trac_notification_queue_depth '
+                         'Notifications waiting for delivery.\n'
+                         '# TYPE trac_notification_queue_depth gauge\n'
+                         'trac_notification_queue_depth{state="failed"} 0\n'
+                         'trac_notification_queue_depth{state="queued"} 1\n',
+                         self.sender.get_metrics())
+
+    def test_background_delivery(self):
+        del self.sender._start_worker
+        self.sender.send('joe@example.org', ['jim@example.org'], 'body')
+        for i in range(50):
+            if self.target.sent:
+                break
+            time.sleep(0.1)
+        self.assertEqual(1, len(self.target.sent))
+
+    def test_shutdown_stops_worker(self):
+        del self.sender._start_worker
+        self.sender.send('joe@example.org', ['jim@example.org'], 'body')
+        worker = self.sender._worker
+        self.sender.shutdown()
+        worker.join(5)
+        self.assertFalse(worker.isAlive())
+        self.sender.send('joe@example.org', ['jim@example.org'], 'body')
+        self.assertTrue(self.sender._worker is worker)
+
+
+class QueuedSmtpDeliveryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.smtpd = SMTPThreadedServer(SMTP_TEST_PORT)
+        self.smtpd.store = SMTPServerMultiStore()
+        self.smtpd.start()
+        self.env = EnvironmentStub(enable=[QueuedEmailSender,
+                                           SmtpEmailSender])
+        self.path = tempfile.mkdtemp(prefix='trac-spool-')
+        self.env.config.set('notification', 'queue_dir', self.path)
+        self.env.config.set('notification', 'smtp_server', '127.0.0.1')
+        self.env.config.set('notification', 'smtp_port', SMTP_TEST_PORT)
+        self.sender = QueuedEmailSender(self.env)
+        self.sender._start_worker = lambda: None
+
+    def tearDown(self):
+        self.smtpd.stop()
+        shutil.rmtree(self.path)
+        self.env.reset_db()
+
+    def test_single_connection(self):
+        for i in range(3):
+            self.sender.send('joe@example.org', ['user%d@example.org' % i],
+                             'Subject: %d\n\nbody %d\n' % (i, i))
+        self.assertEqual(3, self.sender.flush())
+        store = self.smtpd.store
+        self.assertEqual(1, store.connections)
+        self.assertEqual(['user0@example.org', 'user1@example.org',
+                          'user2@example.org'],
+                         [r[0] for s, r, m in store.messages])
+        self.assertEqual('Subject: 2\r\n\r\nbody 2', store.messages[2][2])
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(MailSpoolTestCase, 'test'))
+    suite.addTest(unittest.makeSuite(QueuedEmailSenderTestCase, 'test'))
+    suite.addTest(unittest.makeSuite(QueuedSmtpDeliveryTestCase, 'test'))
+    return suite
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='suite')
@@ -1,7 +1,8 @@
 from __future__ import with_statement
 
 from trac import db_default
-from trac.env import Environment
+from trac.env import Environment, UserDirectory
+from trac.web.session import DetachedSession
 
 import os.path
 import unittest
@@ -50,6 +51,36 @@ class EnvironmentTestCase(unittest.TestCase):
         self.assertEqual((None, 'joe@example.com'), users['joe'])
         self.assertEqual(('Jane', None), users['jane'])
 
+    def test_user_directory(self):
+        """Testing the UserDirectory cache"""
+        with self.env.db_transaction as db:
+            db.executemany("INSERT INTO session VALUES (%s,%s,0)",
+               [('tom', 1), ('joe', 1)])
+            db.executemany("INSERT INTO session_attribute VALUES (%s,%s,%s,%s)",
+               [('tom', 1, 'name', 'Tom'),
+                ('tom', 1, 'email', 'Tom@example.com')])
+        users = UserDirectory(self.env)
+        self.assertEqual(('tom', 'Tom', 'Tom@example.com'),
+                         users.get_user('tom'))
+        self.assertEqual(None, users.get_user('jane'))
+        self.assertEqual('tom', users.find_user('tom@EXAMPLE.com'))
+        self.assertEqual({'tom': 'Tom'}, users.get_name_map())
+
+        # Changes made behind the cache's back are not seen
+        with self.env.db_transaction as db:
+            db("INSERT INTO session VALUES ('jane',1,0)")
+        self.assertEqual(['joe', 'tom'],
+                         [u[0] for u in self.env.get_known_users()])
+
+        # Saving the name or email of a session invalidates the cache
+        session = DetachedSession(self.env, 'joe')
+        session['email'] = 'joe@example.com'
+        session.save()
+        self.assertEqual(['jane', 'joe', 'tom'],
+                         [u[0] for u in self.env.get_known_users()])
+        self.assertEqual({'joe': 'joe@example.com',
+                          'tom': 'Tom@example.com'}, users.get_email_map())
+
 
 def suite():
     return unittest.makeSuite(EnvironmentTestCase,'test')
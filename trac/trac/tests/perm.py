@@ -1,5 +1,6 @@
 from trac import perm
 from trac.core import *
+from trac.resource import Resource
 from trac.test import EnvironmentStub
 
 import unittest
@@ -78,6 +79,49 @@ class DefaultPermissionStoreTestCase(unittest.TestCase):
         for res in self.store.get_all_permissions():
             self.failIf(res not in expected)
 
+    def test_cyclic_groups(self):
+        self.env.db_transaction.executemany(
+            "INSERT INTO permission VALUES (%s,%s)",
+            [('dev', 'WIKI_MODIFY'),
+             ('dev', 'admin'),
+             ('admin', 'REPORT_ADMIN'),
+             ('admin', 'dev'),
+             ('john', 'admin')])
+        self.assertEquals(['REPORT_ADMIN', 'WIKI_MODIFY'],
+                          sorted(self.store.get_user_permissions('john')))
+
+    def test_index_invalidated(self):
+        self.store.grant_permission('dev', 'WIKI_MODIFY')
+        self.store.grant_permission('john', 'dev')
+        self.assertEquals(['WIKI_MODIFY'],
+                          self.store.get_user_permissions('john'))
+        self.store.grant_permission('dev', 'REPORT_ADMIN')
+        self.assertEquals(['REPORT_ADMIN', 'WIKI_MODIFY'],
+                          sorted(self.store.get_user_permissions('john')))
+        self.store.revoke_permission('john', 'dev')
+        self.assertEquals([], self.store.get_user_permissions('john'))
+
+    def test_get_users_with_permissions(self):
+        self.env.get_known_users = lambda cnx=None: [('john', None, None),
+                                                     ('kate', None, None),
+                                                     ('jane', None, None)]
+        self.env.db_transaction.executemany(
+            "INSERT INTO permission VALUES (%s,%s)",
+            [('dev', 'WIKI_MODIFY'),
+             ('admin', 'dev'),
+             ('john', 'admin'),
+             ('kate', 'TICKET_CREATE'),
+             ('authenticated', 'WIKI_VIEW')])
+        self.assertEquals(['john'], self.store.get_users_with_permissions(
+            ['WIKI_MODIFY']))
+        self.assertEquals(['john', 'kate'], sorted(
+            self.store.get_users_with_permissions(['WIKI_MODIFY',
+                                                   'TICKET_CREATE'])))
+        self.assertEquals(['jane', 'john', 'kate'], sorted(
+            self.store.get_users_with_permissions(['WIKI_VIEW'])))
+        self.assertEquals([], self.store.get_users_with_permissions(
+            ['TRAC_ADMIN']))
+
 
 class TestPermissionRequestor(Component):
     implements(perm.IPermissionRequestor)
@@ -259,12 +303,105 @@ class PermissionPolicyTestCase(unittest.TestCase):
         self.assertEqual(self.policy.results,
                          {('testuser', 'TEST_MODIFY'): True,
                           ('testuser', 'TEST_ADMIN'): None})
+class CacheableTestPermissionPolicy(TestPermissionPolicy):
+    cacheable_decisions = True
+
+
+class PermissionDecisionCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.env = EnvironmentStub(enable=[perm.DefaultPermissionStore,
+                                           perm.DefaultPermissionPolicy,
+                                           CacheableTestPermissionPolicy,
+                                           TestPermissionPolicy,
+                                           TestPermissionRequestor])
+        self.env.config.set('trac', 'permission_policies',
+                            'CacheableTestPermissionPolicy')
+        self.env.config.set('trac', 'permission_decision_cache_ttl', 60)
+        self.system = perm.PermissionSystem(self.env)
+        self.policy = CacheableTestPermissionPolicy(self.env)
+
+    def tearDown(self):
+        self.env.reset_db()
+
+    def _check(self, action, resource=None):
+        self.policy.results = {}
+        return perm.PermissionCache(self.env, 'testuser',
+                                    resource).has_permission(action)
+
+    def test_cached_across_requests(self):
+        self.policy.grant('testuser', ['TEST_MODIFY'])
+        self.assertEqual(True, self._check('TEST_MODIFY'))
+        self.policy.revoke('testuser', ['TEST_MODIFY'])
+        self.assertEqual(True, self._check('TEST_MODIFY'))
+        self.assertEqual({}, self.policy.results)
+        self.assertEqual(False, self._check('TEST_ADMIN'))
+        self.assertEqual({('testuser', 'TEST_ADMIN'): None},
+                         self.policy.results)
+
+    def test_cached_by_resource(self):
+        self.policy.grant('testuser', ['TEST_MODIFY'])
+        resource = Resource('wiki', 'WikiStart')
+        self.assertEqual(True, self._check('TEST_MODIFY', resource))
+        self.policy.revoke('testuser', ['TEST_MODIFY'])
+        self.assertEqual(True, self._check('TEST_MODIFY', resource))
+        self.assertEqual(False, self._check('TEST_MODIFY',
+                                            Resource('wiki', 'Other')))
+        self.assertEqual(False, self._check('TEST_MODIFY'))
+
+    def test_reset_on_grant(self):
+        self.policy.grant('testuser', ['TEST_MODIFY'])
+        self.assertEqual(True, self._check('TEST_MODIFY'))
+        self.policy.revoke('testuser', ['TEST_MODIFY'])
+        self.system.grant_permission('someone', 'TEST_ADMIN')
+        self.assertEqual(False, self._check('TEST_MODIFY'))
+
+    def test_uncacheable_policy(self):
+        self.env.config.set('trac', 'permission_policies',
+                            'CacheableTestPermissionPolicy,'
+                            'TestPermissionPolicy')
+        policy = TestPermissionPolicy(self.env)
+        policy.grant('testuser', ['TEST_MODIFY'])
+        self.assertEqual(True, self._check('TEST_MODIFY'))
+        policy.revoke('testuser', ['TEST_MODIFY'])
+        self.assertEqual(False, self._check('TEST_MODIFY'))
+
+    def test_disabled(self):
+        self.env.config.set('trac', 'permission_decision_cache_ttl', 0)
+        self.policy.grant('testuser', ['TEST_MODIFY'])
+        self.assertEqual(True, self._check('TEST_MODIFY'))
+        self.policy.revoke('testuser', ['TEST_MODIFY'])
+        self.assertEqual(False, self._check('TEST_MODIFY'))
+
+    def test_policy_stats(self):
+        before = perm.get_policy_stats()
+        self._check('TEST_MODIFY')
+        self._check('TEST_MODIFY')
+        stats = perm.get_policy_stats()
+        self.assertEqual(before['cache_hits'] + 1, stats['cache_hits'])
+        count = before['policies'].get('CacheableTestPermissionPolicy',
+                                       {'count': 0})['count']
+        self.assertEqual(count + 1, stats['policies']
+                         ['CacheableTestPermissionPolicy']['count'])
+
+    def test_policy_metrics(self):
+        self._check('TEST_MODIFY')
+        metrics = self.system.get_metrics()
+        self.assertTrue(metrics.startswith(
+            '# HELP trac_permission_policy_seconds'))
+        self.assertTrue('{policy="CacheableTestPermissionPolicy",le="+Inf"}'
+                        in metrics)
+        self.assertTrue('\ntrac_permission_cache_hits_total'
+                        '{cache="decision"} ' in metrics)
+
+
 def suite():
     suite = unittest.TestSuite()
     suite.addTest(unittest.makeSuite(DefaultPermissionStoreTestCase, 'test'))
     suite.addTest(unittest.makeSuite(PermissionSystemTestCase, 'test'))
     suite.addTest(unittest.makeSuite(PermissionCacheTestCase, 'test'))
     suite.addTest(unittest.makeSuite(PermissionPolicyTestCase, 'test'))
+    suite.addTest(unittest.makeSuite(PermissionDecisionCacheTestCase, 'test'))
     return suite
 
 if __name__ == '__main__':
@@ -369,7 +369,7 @@ class Ticket(object):
 
         return int(cnum.rsplit('.', 1)[-1])
 
-    def get_changelog(self, when=None, db=None):
+    def get_changelog(self, when=None, db=None, since=None):
         """Return the changelog as a list of tuples of the form
         (time, author, field, oldvalue, newvalue, permanent).
 
@@ -377,46 +377,75 @@ class Ticket(object):
         the `permanent` flag is used to distinguish collateral changes
         that are not yet immutable (like attachments, currently).
 
+        If `since` is given, only the changes made at or after that time
+        are returned (''since 1.0.2'').
+
         :since 1.0: the `db` parameter is no longer needed and will be removed
         in version 1.1.1
         """
         sid = str(self.id)
         when_ts = to_utimestamp(when)
         if when_ts:
-            sql = """
-                SELECT time, author, field, oldvalue, newvalue, 1 AS permanent
-                FROM ticket_change WHERE ticket=%s AND time=%s
-                  UNION
-                SELECT time, author, 'attachment', null, filename,
-                  0 AS permanent
-                FROM attachment WHERE type='ticket' AND id=%s AND time=%s
-                  UNION
-                SELECT time, author, 'comment', null, description,
-                  0 AS permanent
-                FROM attachment WHERE type='ticket' AND id=%s AND time=%s
-                ORDER BY time,permanent,author
-                """
-            args = (self.id, when_ts, sid, when_ts, sid, when_ts)
+            cond, time_args = ' AND time=%s', (when_ts,)
+        elif since:
+            cond, time_args = ' AND time>=%s', (to_utimestamp(since),)
         else:
-            sql = """
-                SELECT time, author, field, oldvalue, newvalue, 1 AS permanent
-                FROM ticket_change WHERE ticket=%s
-                  UNION
-                SELECT time, author, 'attachment', null, filename,
-                  0 AS permanent
-                FROM attachment WHERE type='ticket' AND id=%s
-                  UNION
-                SELECT time, author, 'comment', null, description,
-                  0 AS permanent
-                FROM attachment WHERE type='ticket' AND id=%s
-                ORDER BY time,permanent,author
-                """
-            args = (self.id, sid, sid)
+            cond, time_args = '', ()
+        sql = """
+            SELECT time, author, field, oldvalue, newvalue, 1 AS permanent
+            FROM ticket_change WHERE ticket=%%s%(cond)s
+              UNION
+            SELECT time, author, 'attachment', null, filename,
+              0 AS permanent
+            FROM attachment WHERE type='ticket' AND id=%%s%(cond)s
+              UNION
+            SELECT time, author, 'comment', null, description,
+              0 AS permanent
+            FROM attachment WHERE type='ticket' AND id=%%s%(cond)s
+            ORDER BY time,permanent,author
+            """ % {'cond': cond}
+        args = (self.id,) + time_args + (sid,) + time_args + (sid,) + \
+               time_args
         return [(from_utimestamp(t), author, field, oldvalue or '',
                  newvalue or '', permanent)
                 for t, author, field, oldvalue, newvalue, permanent in
                 self.env.db_query(sql, args)]
 
+    def get_change_times(self, limit=None):
+        """Return the times of the changes of the ticket and of its
+        attachments, most recent first.
+
+        Each change is listed once, even when it modified several fields,
+        so the `limit` most recent change groups of the changelog can be
+        retrieved with `get_changelog(since=...)`.
+
+        :since 1.0.2:
+        """
+        sql = """
+            SELECT time FROM ticket_change
+            WHERE ticket=%s AND field='comment'
+              UNION
+            SELECT time FROM attachment WHERE type='ticket' AND id=%s
+            ORDER BY time DESC
+            """
+        args = (self.id, str(self.id))
+        if limit:
+            sql += " LIMIT %s"
+            args += (limit,)
+        return [from_utimestamp(t) for t, in self.env.db_query(sql, args)]
+
+    def get_last_change_time(self, field):
+        """Return the time of the last change of `field`, or `None` if
+        it has never been changed.
+
+        :since 1.0.2:
+        """
+        for t, in self.env.db_query("""
+                SELECT time FROM ticket_change WHERE ticket=%s AND field=%s
+                ORDER BY time DESC LIMIT 1
+                """, (self.id, field)):
+            return from_utimestamp(t)
+
     def delete(self, db=None):
         """Delete the ticket.
 
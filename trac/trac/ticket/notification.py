@@ -74,45 +74,69 @@ class TicketNotificationSystem(Component):
         0.12.2)''""")
 
 def get_ticket_notification_recipients(env, config, tktid, prev_cc):
+    recipients = get_tickets_notification_recipients(env, config, [tktid])
+    torecipients, ccrecipients, reporter, owner = \
+        recipients.get(int(tktid), ([], [], None, None))
+    prev_cc += ccrecipients
+    return (torecipients, prev_cc, reporter, owner)
+
+
+#: Maximum number of tickets looked up by a single query
+RECIPIENTS_BATCH_SIZE = 500
+
+
+def get_tickets_notification_recipients(env, config, tktids):
+    """Return the notification recipients of several tickets.
+
+    The result is a dictionary of ticket ids to `(torecipients,
+    ccrecipients, reporter, owner)` tuples. The tickets are retrieved
+    with two queries per `RECIPIENTS_BATCH_SIZE` tickets.
+
+    :since 1.0.2:
+    """
     notify_reporter = config.getbool('notification', 'always_notify_reporter')
     notify_owner = config.getbool('notification', 'always_notify_owner')
     notify_updater = config.getbool('notification', 'always_notify_updater')
 
-    ccrecipients = prev_cc
-    torecipients = []
+    tktids = list(set(int(tktid) for tktid in tktids))
+    tickets = {}
+    changes = {}
     with env.db_query as db:
+        for i in xrange(0, len(tktids), RECIPIENTS_BATCH_SIZE):
+            ids = tktids[i:i + RECIPIENTS_BATCH_SIZE]
+            holders = ','.join(['%s'] * len(ids))
+            for row in db("""
+                    SELECT id, cc, reporter, owner FROM ticket
+                    WHERE id IN (%s)
+                    """ % holders, ids):
+                tickets[row[0]] = row[1:]
+            for ticket, time, author in db("""
+                    SELECT DISTINCT ticket, time, author FROM ticket_change
+                    WHERE ticket IN (%s)
+                    """ % holders, ids):
+                changes.setdefault(ticket, []).append((time, author))
+
+    recipients = {}
+    for tktid, (cc, reporter, owner) in tickets.iteritems():
         # Harvest email addresses from the cc, reporter, and owner fields
-        for row in db("SELECT cc, reporter, owner FROM ticket WHERE id=%s",
-                      (tktid,)):
-            if row[0]:
-                ccrecipients += row[0].replace(',', ' ').split()
-            reporter = row[1]
-            owner = row[2]
-            if notify_reporter:
-                torecipients.append(row[1])
-            if notify_owner:
-                torecipients.append(row[2])
-            break
+        ccrecipients = cc.replace(',', ' ').split() if cc else []
+        torecipients = []
+        if notify_reporter:
+            torecipients.append(reporter)
+        if notify_owner:
+            torecipients.append(owner)
 
         # Harvest email addresses from the author field of ticket_change(s)
+        ticket_changes = changes.get(tktid, [])
         if notify_updater:
-            for author, ticket in db("""
-                    SELECT DISTINCT author, ticket FROM ticket_change
-                    WHERE ticket=%s
-                    """, (tktid,)):
-                torecipients.append(author)
+            torecipients.extend(set(author for time, author
+                                    in ticket_changes))
 
         # Suppress the updater from the recipients
-        updater = None
-        for updater, in db("""
-                SELECT author FROM ticket_change WHERE ticket=%s
-                ORDER BY time DESC LIMIT 1
-                """, (tktid,)):
-            break
+        if ticket_changes:
+            updater = max(ticket_changes)[1]
         else:
-            for updater, in db("SELECT reporter FROM ticket WHERE id=%s",
-                               (tktid,)):
-                break
+            updater = reporter
 
         if not notify_updater:
             filter_out = True
@@ -126,7 +150,8 @@ def get_ticket_notification_recipients(env, config, tktid, prev_cc):
         elif updater:
             torecipients.append(updater)
 
-    return (torecipients, ccrecipients, reporter, owner)
+        recipients[tktid] = (torecipients, ccrecipients, reporter, owner)
+    return recipients
 
 
 class TicketNotifyEmail(NotifyEmail):
@@ -481,10 +506,9 @@ class BatchTicketNotifyEmail(NotifyEmail):
     def get_recipients(self, tktids):
         alltorecipients = []
         allccrecipients = []
-        for t in tktids:
-            (torecipients, ccrecipients, reporter, owner) = \
-                get_ticket_notification_recipients(self.env, self.config,
-                    t, [])
+        for torecipients, ccrecipients, reporter, owner in \
+                get_tickets_notification_recipients(self.env, self.config,
+                                                    tktids).itervalues():
             alltorecipients.extend(torecipients)
             allccrecipients.extend(ccrecipients)
         return (list(set(alltorecipients)), list(set(allccrecipients)))
@@ -21,15 +21,17 @@ from __future__ import with_statement
 import csv
 import re
 from StringIO import StringIO
+from time import time
 
 from genshi.builder import tag
 
+from trac.cache import cached
 from trac.config import IntOption
 from trac.core import *
 from trac.db import get_column_names
 from trac.perm import IPermissionRequestor
 from trac.resource import Resource, ResourceNotFound
-from trac.ticket.api import TicketSystem
+from trac.ticket.api import ITicketChangeListener, TicketSystem
 from trac.util import as_int, content_disposition
 from trac.util.datefmt import format_datetime, format_time, from_utimestamp
 from trac.util.presentation import Paginator
@@ -111,7 +113,7 @@ def split_sql(sql, clause_re, skel=None):
 class ReportModule(Component):
 
     implements(INavigationContributor, IPermissionRequestor, IRequestHandler,
-               IWikiSyntaxProvider)
+               IWikiSyntaxProvider, ITicketChangeListener)
 
     items_per_page = IntOption('report', 'items_per_page', 100,
         """Number of tickets displayed per page in ticket reports,
@@ -121,6 +123,18 @@ class ReportModule(Component):
         """Number of tickets displayed in the rss feeds for reports
         (''since 0.11'')""")
 
+    result_cache_ttl = IntOption('report', 'result_cache_ttl', 0,
+        """Number of seconds during which the results of a report are
+        cached across requests, for the same SQL query and arguments.
+        The cached results are discarded whenever a ticket is changed.
+        Use 0 to disable the cache. (''since 1.0.2'')""")
+
+    # Maximum number of cached report results and column lists
+    RESULT_CACHE_SIZE = 100
+
+    def __init__(self):
+        self._report_columns = {}
+
     # INavigationContributor methods
 
     def get_active_navigation_item(self, req):
@@ -203,6 +217,17 @@ class ReportModule(Component):
         add_stylesheet(req, 'common/css/report.css')
         return template, data, None
 
+    # ITicketChangeListener methods
+
+    def ticket_created(self, ticket):
+        self.reset_result_cache()
+
+    def ticket_changed(self, ticket, comment, author, old_values):
+        self.reset_result_cache()
+
+    def ticket_deleted(self, ticket):
+        self.reset_result_cache()
+
     # Internal methods
 
     def _do_create(self, req):
@@ -677,8 +702,6 @@ class ReportModule(Component):
         self.log.debug('Report {%d} with SQL "%s"', id, sql)
         self.log.debug('Request args: %r', req.args)
 
-        cursor = db.cursor()
-
         num_items = 0
         order_by = []
         limit_offset = None
@@ -686,27 +709,30 @@ class ReportModule(Component):
         if id == -1 or limit == 0:
             sql = base_sql
         else:
-            # The number of tickets is obtained
-            count_sql = 'SELECT COUNT(*) FROM (\n%s\n) AS tab' % base_sql
-            self.log.debug("Report {%d} SQL (count): %s", id, count_sql)
-            try:
-                cursor.execute(count_sql, args)
-            except Exception, e:
-                return e, count_sql
-            num_items = cursor.fetchone()[0]
-
-            # The column names are obtained
-            colnames_sql = 'SELECT * FROM (\n%s\n) AS tab LIMIT 1' % base_sql
-            self.log.debug("Report {%d} SQL (col names): %s", id, colnames_sql)
-            try:
-                cursor.execute(colnames_sql, args)
-            except Exception, e:
-                return e, colnames_sql
-            cols = get_column_names(cursor)
-
-            # The ORDER BY columns are inserted
+            # Without the result cache, only the requested page is
+            # retrieved and the items are counted separately
+            cache_results = self.result_cache_ttl > 0
+            if not cache_results:
+                count_sql = 'SELECT COUNT(*) FROM (\n%s\n) AS tab' % base_sql
+                self.log.debug("Report {%d} SQL (count): %s", id, count_sql)
+                try:
+                    cursor = db.cursor()
+                    cursor.execute(count_sql, args)
+                except Exception, e:
+                    return e, count_sql
+                num_items = cursor.fetchone()[0]
+
+            # The column names are only needed for sorting
             sort_col = req.args.get('sort', '')
             asc = req.args.get('asc', '1')
+            cols = []
+            if sort_col:
+                try:
+                    cols = self._get_report_columns(db, id, base_sql, args)
+                except Exception, e:
+                    return e, base_sql
+
+            # The ORDER BY columns are inserted
             self.log.debug("%r %s (%s)", cols, sort_col, asc and '^' or 'v')
             order_cols = []
             if sort_col and sort_col not in cols:
@@ -735,6 +761,19 @@ class ReportModule(Component):
                     order_by.append(after)
                 sql = ' '.join([before, 'ORDER BY', ', '.join(order_by)])
 
+            if cache_results:
+                # The whole result set is cached, for counting the items
+                # and selecting the pages
+                full_sql = sql.replace(LIMIT_OFFSET, '')
+                self.log.debug("Report {%d} SQL (order): %s", id, full_sql)
+                try:
+                    cols, rows = self._execute_report_sql(db, id, full_sql,
+                                                          args)
+                except Exception, e:
+                    return self._report_failed(req, e, full_sql, order_by)
+                self._set_report_columns(id, base_sql, cols)
+                num_items = len(rows)
+
             # Add LIMIT/OFFSET if pagination needed
             limit_offset = ''
             if num_items > limit:
@@ -746,25 +785,93 @@ class ReportModule(Component):
             else:
                 # Method 2: limit/offset is added unless already present
                 skel = skel or sql_skeleton(sql)
-                if 'LIMIT' not in skel.upper():
+                has_limit = 'LIMIT' in skel.upper()
+                if cache_results:
+                    # The page is selected from the cached rows
+                    if limit_offset and not has_limit:
+                        rows = rows[offset:offset + limit]
+                    return cols, rows, num_items, missing_args, limit_offset
+                if not has_limit:
                     sql = ' '.join([sql, limit_offset])
             self.log.debug("Report {%d} SQL (order + limit): %s", id, sql)
         try:
-            cursor.execute(sql, args)
+            cols, rows = self._execute_report_sql(db, id, sql, args)
         except Exception, e:
-            if order_by or limit_offset:
-                add_notice(req, _("Hint: if the report failed due to automatic"
-                                  " modification of the ORDER BY clause or the"
-                                  " addition of LIMIT/OFFSET, please look up"
-                                  " %(sort_column)s and %(limit_offset)s in"
-                                  " TracReports to see how to gain complete"
-                                  " control over report rewriting.",
-                                  sort_column=SORT_COLUMN,
-                                  limit_offset=LIMIT_OFFSET))
-            return e, sql
+            return self._report_failed(req, e, sql, order_by or limit_offset)
+        self._set_report_columns(id, base_sql, cols)
+        return cols, rows, num_items, missing_args, limit_offset
+
+    def _get_report_columns(self, db, id, sql, args):
+        """Return the column names of the report `sql`, executing it if
+        they weren't seen yet.
+        """
+        cols = self._report_columns.get((id, sql))
+        if cols is None:
+            if self.result_cache_ttl > 0:
+                cols = self._execute_report_sql(db, id, sql, args)[0]
+            else:
+                colnames_sql = 'SELECT * FROM (\n%s\n) AS tab LIMIT 1' % sql
+                self.log.debug("Report {%d} SQL (col names): %s", id,
+                               colnames_sql)
+                cursor = db.cursor()
+                cursor.execute(colnames_sql, args)
+                cols = get_column_names(cursor)
+            self._set_report_columns(id, sql, cols)
+        return cols
+
+    def _set_report_columns(self, id, sql, cols):
+        if (id, sql) not in self._report_columns:
+            if len(self._report_columns) >= self.RESULT_CACHE_SIZE:
+                self._report_columns.clear()
+            self._report_columns[(id, sql)] = cols
+
+    def reset_result_cache(self):
+        """Discard the report results cached across requests, in all
+        processes.
+
+        This is called when tickets are changed, and should be called
+        when other data the reports rely on is changed. :since 1.0.2:
+        """
+        if self.result_cache_ttl > 0:
+            del self._result_cache
+
+    @cached
+    def _result_cache(self):
+        return {}
+
+    def _execute_report_sql(self, db, id, sql, args):
+        """Execute the report `sql` and return the column names and the
+        rows, from the result cache when possible.
+        """
+        ttl = self.result_cache_ttl
+        if ttl > 0:
+            key = (id, sql, tuple(args))
+            cache = self._result_cache
+            now = time()
+            entry = cache.get(key)
+            if entry and now - entry[0] < ttl:
+                return entry[1:]
+        cursor = db.cursor()
+        cursor.execute(sql, args)
         rows = cursor.fetchall() or []
         cols = get_column_names(cursor)
-        return cols, rows, num_items, missing_args, limit_offset
+        if ttl > 0:
+            if len(cache) >= self.RESULT_CACHE_SIZE:
+                cache.clear()
+            cache[key] = (now, cols, rows)
+        return cols, rows
+
+    def _report_failed(self, req, e, sql, rewritten):
+        if rewritten:
+            add_notice(req, _("Hint: if the report failed due to automatic"
+                              " modification of the ORDER BY clause or the"
+                              " addition of LIMIT/OFFSET, please look up"
+                              " %(sort_column)s and %(limit_offset)s in"
+                              " TracReports to see how to gain complete"
+                              " control over report rewriting.",
+                              sort_column=SORT_COLUMN,
+                              limit_offset=LIMIT_OFFSET))
+        return e, sql
 
     def get_var_args(self, req):
         # reuse somehow for #9574 (wiki vars)
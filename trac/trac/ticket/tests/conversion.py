@@ -1,10 +1,12 @@
+from datetime import datetime
 import os
 import unittest
 
 from trac import __version__ as TRAC_VERSION
-from trac.test import EnvironmentStub, Mock
+from trac.test import EnvironmentStub, Mock, MockPerm
 from trac.ticket.model import Ticket
 from trac.ticket.web_ui import TicketModule
+from trac.util.datefmt import utc
 from trac.mimeview.api import Mimeview
 from trac.web.href import Href
 
@@ -92,6 +94,24 @@ Bar
                           'application/rss+xml', 'xml'),
                          (content.replace('\r', ''), mimetype, ext))
 
+    def test_rss_conversion_shows_recent_changes(self):
+        self.env.config.set('ticket', 'max_changes_shown', 2)
+        self.req.perm = MockPerm()
+        ticket = self._create_a_ticket()
+        for i in range(1, 4):
+            ticket.save_changes('joe', 'Comment number %d' % i,
+                                datetime(2001, 1, i, tzinfo=utc))
+        content, mimetype, ext = self.mimeview.convert_content(
+            self.req, 'trac.ticket.Ticket', ticket, 'rss')
+        self.assertFalse('Comment number 1' in content)
+        self.assertTrue('Comment number 2' in content)
+        self.assertTrue('Comment number 3' in content)
+
+        self.env.config.set('ticket', 'max_changes_shown', 0)
+        content, mimetype, ext = self.mimeview.convert_content(
+            self.req, 'trac.ticket.Ticket', ticket, 'rss')
+        self.assertTrue('Comment number 1' in content)
+
 
 def suite():
     return unittest.makeSuite(TicketConversionTestCase, 'test')
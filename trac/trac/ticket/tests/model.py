@@ -130,6 +130,42 @@ class TicketTestCase(unittest.TestCase):
         self.assertEqual(len(log), 0)
         self.assertRaises(TracError, Ticket, self.env, 1)
 
+    def _changes_and_attachment(self):
+        ticket = Ticket(self.env)
+        ticket['summary'] = 'Foo'
+        ticket.insert(datetime(2001, 1, 1, tzinfo=utc))
+        for day in (2, 3, 5):
+            ticket['summary'] = 'Foo %d' % day
+            ticket.save_changes('joe', 'Comment %d' % day,
+                                datetime(2001, 1, day, tzinfo=utc))
+        attachment = Attachment(self.env, 'ticket', ticket.id)
+        attachment.insert('foo.txt', StringIO(''), 0,
+                          datetime(2001, 1, 4, tzinfo=utc))
+        return ticket
+
+    def test_get_change_times(self):
+        ticket = self._changes_and_attachment()
+        self.assertEqual([datetime(2001, 1, day, tzinfo=utc)
+                          for day in (5, 4, 3, 2)],
+                         ticket.get_change_times())
+        self.assertEqual([datetime(2001, 1, day, tzinfo=utc)
+                          for day in (5, 4)],
+                         ticket.get_change_times(2))
+
+    def test_get_changelog_since(self):
+        ticket = self._changes_and_attachment()
+        log = ticket.get_changelog(since=datetime(2001, 1, 4, tzinfo=utc))
+        self.assertEqual(['attachment', 'comment', 'comment', 'summary'],
+                         [field for t, author, field, old, new, p in log])
+        self.assertEqual('Comment 5', log[2][4])
+        self.assertEqual(log[2:], ticket.get_changelog()[-2:])
+
+    def test_get_last_change_time(self):
+        ticket = self._changes_and_attachment()
+        self.assertEqual(datetime(2001, 1, 5, tzinfo=utc),
+                         ticket.get_last_change_time('summary'))
+        self.assertEqual(None, ticket.get_last_change_time('owner'))
+
     def test_ticket_id_is_always_int(self):
         ticket_id = self._insert_ticket('Foo')
         self.assertEqual(ticket_id, int(ticket_id))
@@ -18,7 +18,9 @@
 
 from trac.util.datefmt import utc
 from trac.ticket.model import Ticket
-from trac.ticket.notification import TicketNotifyEmail
+from trac.ticket.notification import TicketNotifyEmail, \
+                                     get_ticket_notification_recipients, \
+                                     get_tickets_notification_recipients
 from trac.test import EnvironmentStub, Mock, MockPerm
 from trac.tests.notification import SMTPThreadedServer, parse_smtp_message, \
                                     smtp_address
@@ -602,6 +604,35 @@ class NotificationTestCase(unittest.TestCase):
         self.failIf(len(recipients) != 1)
         self.failIf(recipients[0] != 'joe@example.org')
 
+    def test_bulk_recipients(self):
+        """Recipients of several tickets retrieved at once"""
+        self.env.config.set('notification', 'always_notify_updater', 'false')
+        tktids = []
+        for i in range(3):
+            ticket = Ticket(self.env)
+            ticket['summary'] = 'Foo'
+            ticket['reporter'] = 'joe%d@example.org' % i
+            ticket['owner'] = 'jim@example.org'
+            ticket['cc'] = 'jack%d@example.org, jane@example.org' % i
+            ticket.insert()
+            tktids.append(ticket.id)
+        ticket['summary'] = 'Bar'
+        ticket.save_changes('jim@example.org', 'this is my comment')
+        recipients = get_tickets_notification_recipients(
+            self.env, self.env.config, tktids + [tktids[0], 42])
+        self.assertEqual(set(tktids), set(recipients))
+        for tktid in tktids:
+            self.assertEqual(recipients[tktid],
+                             get_ticket_notification_recipients(
+                                 self.env, self.env.config, tktid, []))
+        self.assertEqual((['joe0@example.org', 'jim@example.org'],
+                          ['jack0@example.org', 'jane@example.org'],
+                          'joe0@example.org', 'jim@example.org'),
+                         recipients[tktids[0]])
+        # The updater is owner, and thus not filtered out
+        self.assertEqual(['joe2@example.org', 'jim@example.org'],
+                         recipients[tktids[2]][0])
+
     def _validate_mimebody(self, mime, ticket, newtk):
         """Body of a ticket notification message"""
         (mime_decoder, mime_name, mime_charset) = mime
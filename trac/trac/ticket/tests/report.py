@@ -1,8 +1,12 @@
 # -*- coding: utf-8 -*-
 
+from __future__ import with_statement
+
 import doctest
 
 from trac.db.mysql_backend import MySQLConnection
+from trac.db.profiler import start_query_profile, stop_query_profile
+from trac.ticket.model import Ticket
 from trac.ticket.report import ReportModule
 from trac.test import EnvironmentStub, Mock
 from trac.web.api import Request, RequestDone
@@ -99,6 +103,80 @@ class ReportTestCase(unittest.TestCase):
                          'type=r%C3%A9sum%C3%A9&report=' + str(id),
                          headers_sent['Location'])
 
+    def _insert_tickets(self, n):
+        for i in range(n):
+            ticket = Ticket(self.env)
+            ticket['summary'] = 'Ticket %d' % (i + 1)
+            ticket.insert()
+
+    def _execute(self, sql, args={}, limit=2, offset=0):
+        req = Mock(args=args)
+        profile = start_query_profile()
+        try:
+            with self.env.db_query as db:
+                res = self.report_module.execute_paginated_report(
+                    req, db, 1, sql, {}, limit, offset)
+        finally:
+            stop_query_profile()
+        # Executions of the report query
+        queries = [q for q, stats in profile.statements.iteritems()
+                   for i in range(stats.count) if 'FROM ticket' in q]
+        return res, queries
+
+    def test_paginated_report_pages_in_sql(self):
+        self._insert_tickets(5)
+        sql = "SELECT id AS ticket, summary FROM ticket ORDER BY id"
+        res, queries = self._execute(sql, offset=2)
+        cols, rows, num_items, missing_args, limit_offset = res
+        self.assertEqual(['ticket', 'summary'], cols)
+        self.assertEqual([(3, 'Ticket 3'), (4, 'Ticket 4')], rows)
+        self.assertEqual(5, num_items)
+        self.assertEqual('LIMIT 2 OFFSET 2', limit_offset)
+        # The items are counted, then only the page is retrieved
+        self.assertEqual(2, len(queries))
+        self.assertEqual(1, len([q for q in queries
+                                 if q.startswith('SELECT COUNT(*)')]))
+        self.assertEqual(1, len([q for q in queries
+                                 if q.endswith('LIMIT 2 OFFSET 2')]))
+
+        # The column names are known when sorting
+        res, queries = self._execute(sql, {'sort': 'summary', 'asc': '0'})
+        self.assertEqual([(5, 'Ticket 5'), (4, 'Ticket 4')], res[1])
+        self.assertEqual(5, res[2])
+        self.assertEqual(2, len(queries))
+
+    def test_paginated_report_sorted_first(self):
+        self._insert_tickets(3)
+        sql = "SELECT id AS ticket FROM ticket"
+        res, queries = self._execute(sql, {'sort': 'ticket', 'asc': '0'})
+        self.assertEqual(([(3,), (2,)], 3), (res[1], res[2]))
+        # The column names are retrieved for checking the sort column
+        self.assertEqual(3, len(queries))
+
+    def test_paginated_report_limit_offset(self):
+        self._insert_tickets(3)
+        sql = "SELECT id AS ticket FROM ticket ORDER BY id @LIMIT_OFFSET@"
+        res, queries = self._execute(sql, offset=2)
+        self.assertEqual([(3,)], res[1])
+        self.assertEqual(3, res[2])
+        self.assertEqual('LIMIT 2 OFFSET 2', res[4])
+
+    def test_result_cache(self):
+        self.env.config.set('report', 'result_cache_ttl', 60)
+        self._insert_tickets(3)
+        sql = "SELECT id AS ticket FROM ticket ORDER BY id"
+        res, queries = self._execute(sql)
+        self.assertEqual(1, len(queries))
+        self.assertFalse('LIMIT' in queries[0])
+        res, queries = self._execute(sql, offset=2)
+        self.assertEqual(([(3,)], 3, 0), (res[1], res[2], len(queries)))
+
+        # The results are discarded when a ticket is changed
+        self._insert_tickets(1)
+        res, queries = self._execute(sql, offset=2)
+        self.assertEqual(([(3,), (4,)], 4, 1),
+                         (res[1], res[2], len(queries)))
+
 
 def suite():
     suite = unittest.TestSuite()
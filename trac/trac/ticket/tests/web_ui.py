@@ -0,0 +1,119 @@
+from datetime import datetime
+import unittest
+
+from trac.test import EnvironmentStub, Mock, MockPerm
+from trac.ticket.model import Ticket
+from trac.ticket.web_ui import TicketModule
+from trac.util.datefmt import utc
+from trac.web.href import Href
+
+
+class TicketChangelogTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.env = EnvironmentStub(default_data=True)
+        self.env.config.set('ticket', 'max_changes_shown', 2)
+        self.ticket_module = TicketModule(self.env)
+
+    def tearDown(self):
+        self.env.reset_db()
+
+    def _create_request(self, **args):
+        return Mock(base_path='/trac.cgi', path_info='',
+                    href=Href('/trac.cgi'), chrome={'logo': {}},
+                    abs_href=Href('http://example.org/trac.cgi'),
+                    environ={}, perm=MockPerm(), authname='joe', args=args,
+                    tz=utc, locale=None, lc_time=None, session={},
+                    method='GET', form_token=None)
+
+    def _create_ticket(self):
+        ticket = Ticket(self.env)
+        ticket['reporter'] = 'santa'
+        ticket['summary'] = 'Foo'
+        ticket['description'] = 'Bar'
+        ticket['status'] = 'new'
+        ticket.insert(datetime(2001, 1, 1, tzinfo=utc))
+        return ticket
+
+    def _save_changes(self, ticket, day, comment, **fields):
+        for name, value in fields.iteritems():
+            ticket[name] = value
+        ticket.save_changes('joe', comment, datetime(2001, 1, day,
+                                                     tzinfo=utc))
+
+    def _insert_ticket_data(self, ticket, data=None, **args):
+        ticket = Ticket(self.env, ticket.id)
+        req = self._create_request(**args)
+        data = data or {}
+        self.ticket_module._insert_ticket_data(req, ticket, data, 'joe', {})
+        return data
+
+    def _comments(self, data):
+        return [change['comment'] for change in data['changes']]
+
+    def test_shows_recent_changes(self):
+        ticket = self._create_ticket()
+        for day in range(2, 5):
+            self._save_changes(ticket, day, 'Comment %d' % day)
+
+        data = self._insert_ticket_data(ticket)
+        self.assertEqual(['Comment 3', 'Comment 4'], self._comments(data))
+        self.assertTrue(data['older_changes_hidden'])
+
+        data = self._insert_ticket_data(ticket, changes='all')
+        self.assertEqual(['Comment 2', 'Comment 3', 'Comment 4'],
+                         self._comments(data))
+        self.assertFalse(data['older_changes_hidden'])
+
+    def test_reply_to_hidden_comment(self):
+        ticket = self._create_ticket()
+        for day in range(2, 5):
+            self._save_changes(ticket, day, 'Comment %d' % day)
+
+        data = self._insert_ticket_data(ticket, replyto='1')
+        self.assertEqual("Replying to [comment:1 joe]:\n> Comment 2\n",
+                         data['comment'])
+
+    def test_hidden_description_change(self):
+        ticket = self._create_ticket()
+        self._save_changes(ticket, 2, 'Described', description='Baz')
+        for day in range(3, 5):
+            self._save_changes(ticket, day, 'Comment %d' % day)
+
+        data = self._insert_ticket_data(ticket)
+        self.assertEqual(['Comment 3', 'Comment 4'], self._comments(data))
+        self.assertEqual(1, data['description_change']['cnum'])
+        self.assertEqual('Baz',
+            data['description_change']['fields']['description']['new'])
+
+    def test_closetime_from_hidden_change(self):
+        ticket = self._create_ticket()
+        self._save_changes(ticket, 2, 'Closed', status='closed',
+                           resolution='fixed')
+        for day in range(3, 5):
+            self._save_changes(ticket, day, 'Comment %d' % day)
+
+        data = self._insert_ticket_data(ticket)
+        self.assertEqual(['Comment 3', 'Comment 4'], self._comments(data))
+        self.assertEqual(datetime(2001, 1, 2, tzinfo=utc), data['closetime'])
+
+    def test_keeps_conflicting_changes(self):
+        ticket = self._create_ticket()
+        self._save_changes(ticket, 2, 'Comment 2')
+        self._save_changes(ticket, 3, 'Comment 3', summary='Changed')
+        for day in range(4, 6):
+            self._save_changes(ticket, day, 'Comment %d' % day)
+
+        # The ticket was loaded before the changes shown were made
+        data = self._insert_ticket_data(ticket, data={
+            'start_time': datetime(2001, 1, 2, tzinfo=utc)})
+        self.assertEqual(['Comment 2', 'Comment 3', 'Comment 4',
+                          'Comment 5'], self._comments(data))
+        self.assertTrue('summary' in data['conflicts'])
+
+
+def suite():
+    return unittest.makeSuite(TicketChangelogTestCase, 'test')
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='suite')
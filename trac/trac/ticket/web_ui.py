@@ -33,7 +33,8 @@ from trac.resource import (
     Resource, ResourceNotFound, get_resource_url, render_resource_link,
     get_resource_shortname
 )
-from trac.search import ISearchSource, search_to_sql, shorten_result
+from trac.search import FullTextSearch, ISearchSource, search_to_sql, \
+                        shorten_result
 from trac.ticket.api import TicketSystem, ITicketManipulator
 from trac.ticket.model import Milestone, Ticket, group_milestones
 from trac.ticket.notification import TicketNotifyEmail
@@ -59,6 +60,9 @@ from trac.web.chrome import (
 )
 from trac.wiki.formatter import format_to, format_to_html, format_to_oneliner
 
+# Maximum number of tickets retrieved in a single query for the search
+SEARCH_BATCH_SIZE = 500
+
 
 class InvalidTicket(TracError):
     """Exception raised when a ticket fails validation."""
@@ -84,6 +88,12 @@ class TicketModule(Component):
         """Don't accept tickets with a too big comment.
         (''since 0.11.2'')""")
 
+    max_changes_shown = IntOption('ticket', 'max_changes_shown', 100,
+        """Maximum number of changes shown in the change history of a
+        ticket, and in its RSS feed. Older changes are only loaded when
+        the user asks for all of them. Set this to 0 to always show all
+        the changes. (''since 1.0.2'')""")
+
     timeline_newticket_formatter = Option('timeline', 'newticket_formatter',
                                           'oneliner',
         """Which formatter flavor (e.g. 'html' or 'oneliner') should be
@@ -197,38 +207,51 @@ class TicketModule(Component):
         if not 'ticket' in filters:
             return
         ticket_realm = Resource('ticket')
+        ids = FullTextSearch(self.env).find_resources(req, 'ticket', terms)
         with self.env.db_query as db:
-            sql, args = search_to_sql(db, ['summary', 'keywords',
-                                           'description', 'reporter', 'cc',
-                                           db.cast('id', 'text')], terms)
-            sql2, args2 = search_to_sql(db, ['newvalue'], terms)
-            sql3, args3 = search_to_sql(db, ['value'], terms)
-            ticketsystem = TicketSystem(self.env)
-            for summary, desc, author, type, tid, ts, status, resolution in \
-                    db("""SELECT summary, description, reporter, type, id,
-                                 time, status, resolution
-                          FROM ticket
-                          WHERE id IN (
-                              SELECT id FROM ticket WHERE %s
-                            UNION
-                              SELECT ticket FROM ticket_change
-                              WHERE field='comment' AND %s
-                            UNION
-                              SELECT ticket FROM ticket_custom WHERE %s
-                          )
-                          """ % (sql, sql2, sql3),
-                          args + args2 + args3):
-                t = ticket_realm(id=tid)
-                if 'TICKET_VIEW' in req.perm(t):
-                    yield (req.href.ticket(tid),
-                           tag_("%(title)s: %(message)s",
-                                title=tag.span(
-                                    get_resource_shortname(self.env, t),
-                                    class_=status),
-                                message=ticketsystem.format_summary(
-                                    summary, status, resolution, type)),
-                           from_utimestamp(ts), author,
-                           shorten_result(desc, terms))
+            if ids is None:
+                sql, args = search_to_sql(db, ['summary', 'keywords',
+                                               'description', 'reporter',
+                                               'cc', db.cast('id', 'text')],
+                                          terms)
+                sql2, args2 = search_to_sql(db, ['newvalue'], terms)
+                sql3, args3 = search_to_sql(db, ['value'], terms)
+                rows = db("""SELECT summary, description, reporter, type, id,
+                                    time, status, resolution
+                             FROM ticket
+                             WHERE id IN (
+                                 SELECT id FROM ticket WHERE %s
+                               UNION
+                                 SELECT ticket FROM ticket_change
+                                 WHERE field='comment' AND %s
+                               UNION
+                                 SELECT ticket FROM ticket_custom WHERE %s
+                             )
+                             """ % (sql, sql2, sql3),
+                             args + args2 + args3)
+            else:
+                rows = []
+                ids = list(ids)
+                for i in xrange(0, len(ids), SEARCH_BATCH_SIZE):
+                    batch = ids[i:i + SEARCH_BATCH_SIZE]
+                    rows.extend(db("""
+                        SELECT summary, description, reporter, type, id,
+                               time, status, resolution
+                        FROM ticket WHERE id IN (%s)
+                        """ % ','.join(['%s'] * len(batch)), batch))
+        ticketsystem = TicketSystem(self.env)
+        for summary, desc, author, type, tid, ts, status, resolution in rows:
+            t = ticket_realm(id=tid)
+            if 'TICKET_VIEW' in req.perm(t):
+                yield (req.href.ticket(tid),
+                       tag_("%(title)s: %(message)s",
+                            title=tag.span(
+                                get_resource_shortname(self.env, t),
+                                class_=status),
+                            message=ticketsystem.format_summary(
+                                summary, status, resolution, type)),
+                       from_utimestamp(ts), author,
+                       shorten_result(desc, terms))
 
         # Attachments
         for result in AttachmentModule(self.env).get_search_results(
@@ -287,10 +310,10 @@ class TicketModule(Component):
                     (ticket, verb, info, summary, status, resolution, type,
                      description, comment, cid))
 
-        def produce_ticket_change_events(db):
+        def produce_ticket_change_events():
             data = None
             for id, t, author, type, summary, field, oldvalue, newvalue \
-                    in db("""
+                    in self.env.db_query.iterate("""
                     SELECT t.id, tc.time, tc.author, t.type, t.summary,
                            tc.field, tc.oldvalue, tc.newvalue
                     FROM ticket_change tc
@@ -332,7 +355,7 @@ class TicketModule(Component):
                 prev_t = None
                 prev_ev = None
                 batch_ev = None
-                for (ev, t) in produce_ticket_change_events(db):
+                for (ev, t) in produce_ticket_change_events():
                     if batch_ev:
                         if prev_t == t:
                             ticket = ev[3][0]
@@ -1143,7 +1166,9 @@ class TicketModule(Component):
         changes = []
         change_summary = {}
 
-        for change in self.rendered_changelog_entries(req, ticket):
+        since = self._get_changelog_start(ticket)
+        for change in self.rendered_changelog_entries(req, ticket,
+                                                      since=since):
             changes.append(change)
             # compute a change summary
             change_summary = {}
@@ -1550,6 +1575,7 @@ class TicketModule(Component):
         data['replyto'] = replyto
         data['version'] = ticket.resource.version
         data['description_change'] = None
+        data['older_changes_hidden'] = False
 
         data['author_id'] = author_id
 
@@ -1577,7 +1603,15 @@ class TicketModule(Component):
         skip = False
         start_time = data.get('start_time', ticket['changetime'])
         conflicts = set()
-        for change in self.rendered_changelog_entries(req, ticket):
+        since = None
+        if ticket.resource.version is None and \
+                req.args.get('changes') != 'all':
+            since = self._get_changelog_start(ticket)
+            if since and start_time:
+                # Keep the changes made since the ticket was loaded
+                since = min(since, start_time)
+        for change in self.rendered_changelog_entries(req, ticket,
+                                                      since=since):
             # change['permanent'] is false for attachment changes; true for
             # other changes.
             if change['permanent']:
@@ -1608,6 +1642,10 @@ class TicketModule(Component):
             if not skip:
                 changes.append(change)
 
+        if since:
+            self._insert_older_changes_data(req, ticket, data, changes,
+                                            quote_original)
+
         if ticket.resource.version is not None:
             ticket.values.update(values)
 
@@ -1616,7 +1654,7 @@ class TicketModule(Component):
         selected_action = req.args.get('action')
 
         # retrieve close time from changes
-        closetime = None
+        closetime = data.get('closetime')
         for c in changes:
             s = c['fields'].get('status')
             if s:
@@ -1680,12 +1718,48 @@ class TicketModule(Component):
             'change_preview': change_preview, 'closetime': closetime,
         })
 
-    def rendered_changelog_entries(self, req, ticket, when=None):
+    def _get_changelog_start(self, ticket):
+        """Return the time of the oldest change shown in the change
+        history of `ticket`, or `None` if all the changes are shown."""
+        limit = self.max_changes_shown
+        if limit > 0:
+            times = ticket.get_change_times(limit + 1)
+            if len(times) > limit:
+                return times[limit - 1]
+
+    def _insert_older_changes_data(self, req, ticket, data, changes,
+                                   quote_original):
+        """Fill in the data derived from the changes which are not shown
+        in the change history."""
+        data['older_changes_hidden'] = True
+        shown = set(str(c['cnum']) for c in changes if 'cnum' in c)
+        replyto = data['replyto']
+        if replyto and replyto.isdigit() and replyto not in shown:
+            change = ticket.get_change(int(replyto))
+            if change and 'comment' in change['fields']:
+                quote_original(change['author'],
+                               change['fields']['comment']['new'],
+                               'comment:%s' % replyto)
+        if not data['description_change']:
+            when = ticket.get_last_change_time('description')
+            if when:
+                for change in self.rendered_changelog_entries(req, ticket,
+                                                              when=when):
+                    if 'description' in change['fields']:
+                        data['description_change'] = change
+        if ticket['status'] == 'closed':
+            data['closetime'] = ticket.get_last_change_time('status')
+
+    def rendered_changelog_entries(self, req, ticket, when=None, since=None):
         """Iterate on changelog entries, consolidating related changes
         in a `dict` object.
+
+        If `since` is given, only the changes made at or after that time
+        are considered (''since 1.0.2'').
         """
         attachment_realm = ticket.resource.child('attachment')
-        for group in self.grouped_changelog_entries(ticket, when=when):
+        for group in self.grouped_changelog_entries(ticket, when=when,
+                                                    since=since):
             t = ticket.resource(version=group.get('cnum', None))
             if 'TICKET_VIEW' in req.perm(t):
                 self._render_property_changes(req, ticket, group['fields'], t)
@@ -1770,15 +1844,18 @@ class TicketModule(Component):
                                 new=tag.em(new, class_="new-value"))
         return rendered
 
-    def grouped_changelog_entries(self, ticket, db=None, when=None):
+    def grouped_changelog_entries(self, ticket, db=None, when=None,
+                                  since=None):
         """Iterate on changelog entries, consolidating related changes
         in a `dict` object.
 
+        See `Ticket.get_changelog` for the `when` and `since` parameters.
+
         :since 1.0: the `db` parameter is no longer needed and will be removed
         in version 1.1.1
         """
         field_labels = TicketSystem(self.env).get_ticket_field_labels()
-        changelog = ticket.get_changelog(when=when)
+        changelog = ticket.get_changelog(when=when, since=since)
         autonum = 0 # used for "root" numbers
         last_uid = current = None
         for date, author, field, old, new, permanent in changelog:
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at http://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at http://trac.edgewall.org/log/.
+
+"""Cache of strings stored on disk, with a bounded total size."""
+
+from __future__ import with_statement
+
+import os
+import threading
+
+from trac.util import AtomicFile, makedirs, sha1
+
+__all__ = ['DiskCache']
+
+
+class DiskCache(object):
+    """Cache of `str` values stored in a directory, with one file per
+    entry named after the hash of its key.
+
+    Once the files take more than `max_size` bytes, the least recently
+    used entries are removed. Reading an entry updates the modification
+    time of its file.
+
+    :since 1.0.2:
+    """
+
+    def __init__(self, path, max_size):
+        self.path = path
+        self.max_size = max_size
+        self._size = None
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the value stored for `key`, or `None`."""
+        filename = self._filename(key)
+        try:
+            with open(filename, 'rb') as f:
+                data = f.read()
+            os.utime(filename, None)
+        except (IOError, OSError):
+            return None
+        return data
+
+    def put(self, key, data):
+        """Store the value for `key`, evicting the least recently used
+        entries if needed."""
+        filename = self._filename(key)
+        dirname = os.path.dirname(filename)
+        try:
+            makedirs(dirname, overwrite=True)
+            with AtomicFile(filename, 'wb') as f:
+                f.write(data)
+        except (IOError, OSError):
+            return
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan()[1]
+            else:
+                self._size += len(data)
+            if self._size > self.max_size:
+                self._purge()
+
+    # Internal methods
+
+    def _filename(self, key):
+        digest = sha1(repr(key)).hexdigest()
+        return os.path.join(self.path, digest[:2], digest)
+
+    def _scan(self):
+        entries = []
+        total = 0
+        for dirpath, dirnames, filenames in os.walk(self.path):
+            for name in filenames:
+                filename = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(filename)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, filename))
+                total += st.st_size
+        return entries, total
+
+    def _purge(self):
+        # Remove entries down to 90% of the budget, so that the directory
+        # isn't scanned again for each new entry
+        entries, total = self._scan()
+        limit = self.max_size * 9 // 10
+        for mtime, size, filename in sorted(entries):
+            if total <= limit:
+                break
+            try:
+                os.unlink(filename)
+            except OSError:
+                continue
+            total -= size
+        self._size = total
@@ -21,7 +21,8 @@ import tempfile
 import unittest
 
 from trac import util
-from trac.util.tests import concurrency, datefmt, presentation, text, html
+from trac.util.tests import concurrency, datefmt, presentation, text, html, \
+                            zipstream
 
 
 class AtomicFileTestCase(unittest.TestCase):
@@ -182,6 +183,7 @@ def suite():
     suite.addTest(doctest.DocTestSuite(util))
     suite.addTest(text.suite())
     suite.addTest(html.suite())
+    suite.addTest(zipstream.suite())
     return suite
 
 if __name__ == '__main__':
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at http://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at http://trac.edgewall.org/log/.
+
+from StringIO import StringIO
+import unittest
+from zipfile import ZipFile
+
+from trac.util.zipstream import ZipStream
+
+
+class ZipStreamTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.writes = []
+        self.zip = ZipStream(self.writes.append)
+
+    def _open(self):
+        return ZipFile(StringIO(''.join(self.writes)))
+
+    def test_empty(self):
+        self.zip.close()
+        self.assertEqual([], self._open().namelist())
+
+    def test_members(self):
+        date_time = (2013, 5, 17, 12, 30, 42)
+        self.zip.add_directory(u'trunk', date_time)
+        self.zip.add_file(u'trunk/R\xe9sum\xe9.txt', date_time,
+                          iter(['Line %d\n' % i for i in range(1000)]))
+        self.zip.add_file('trunk/empty', date_time, [], mode=0600)
+        self.zip.close()
+        zipfile = self._open()
+        self.assertEqual(None, zipfile.testzip())
+        infos = zipfile.infolist()
+        self.assertEqual([u'trunk/', u'trunk/R\xe9sum\xe9.txt',
+                          u'trunk/empty'], [i.filename for i in infos])
+        self.assertEqual([040755, 0100644, 0100600],
+                         [i.external_attr >> 16 for i in infos])
+        self.assertEqual(date_time, infos[1].date_time)
+        self.assertEqual(''.join('Line %d\n' % i for i in range(1000)),
+                         zipfile.read(u'trunk/R\xe9sum\xe9.txt'))
+        self.assertTrue(infos[1].compress_size < infos[1].file_size)
+        self.assertEqual('', zipfile.read('trunk/empty'))
+
+    def test_streamed(self):
+        def chunks():
+            yield 'x' * 100000
+            # The beginning of the archive has already been written
+            self.assertTrue(self.writes)
+            yield 'y' * 100000
+        self.zip.add_file('big', (2013, 1, 1, 0, 0, 0), chunks())
+        self.zip.close()
+        self.assertEqual(200000, len(self._open().read('big')))
+
+
+def suite():
+    return unittest.makeSuite(ZipStreamTestCase, 'test')
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='suite')
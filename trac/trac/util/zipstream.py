@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at http://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at http://trac.edgewall.org/log/.
+
+"""Generation of ZIP archives on a non-seekable output stream.
+
+The `zipfile` module needs to know the content of each member before
+writing it, or to seek back in the output. `ZipStream` instead writes
+the CRC and the sizes of each member in a data descriptor following its
+content, so that the archive can be sent while it is being built, and
+the members can be read in fixed-size blocks.
+
+Members are limited to 4 GB, as the ZIP64 extensions are not supported.
+"""
+
+import struct
+import zlib
+
+__all__ = ['ZipStream']
+
+_LOCAL_HEADER = '<4s5H3L2H'
+_DATA_DESCRIPTOR = '<4s3L'
+_CENTRAL_HEADER = '<4s6H3L5H2L'
+_END_RECORD = '<4s4H2LH'
+
+_FLAGS = 0x08 | 0x800 # data descriptor, filename encoded with UTF-8
+_STORED = 0
+_DEFLATED = 8
+_VERSION = 20
+_CREATE_VERSION = 3 << 8 | _VERSION # Unix
+
+
+class ZipStream(object):
+    """Write a ZIP archive through the `write` callable.
+
+    Filenames must be `unicode` or UTF-8 encoded `str` objects.
+    """
+
+    def __init__(self, write):
+        self._write = write
+        self.offset = 0
+        self._members = []
+
+    def add_file(self, filename, date_time, chunks, mode=0644):
+        """Add a file to the archive, compressing its content on the fly.
+
+        :param date_time: a `(year, month, day, hour, minute, second)`
+                          tuple
+        :param chunks: an iterable of `str` blocks of the content
+        """
+        header = self._write_header(filename, date_time, _DEFLATED)
+        compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION,
+                                      zlib.DEFLATED, -15)
+        crc = size = csize = 0
+        for chunk in chunks:
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            data = compressor.compress(chunk)
+            if data:
+                csize += len(data)
+                self._output(data)
+        data = compressor.flush()
+        csize += len(data)
+        self._output(data)
+        self._end_member(header, crc, csize, size, 0100000 | mode)
+
+    def add_directory(self, dirname, date_time, mode=0755):
+        """Add a directory entry to the archive."""
+        if isinstance(dirname, unicode):
+            dirname = dirname.encode('utf-8')
+        if not dirname.endswith('/'):
+            dirname += '/'
+        header = self._write_header(dirname, date_time, _STORED)
+        self._end_member(header, 0, 0, 0, 040000 | mode)
+
+    def close(self):
+        """Write the central directory, which ends the archive."""
+        start = self.offset
+        for (filename, offset, method, dostime, dosdate, crc, csize, size,
+             attr) in self._members:
+            self._output(struct.pack(_CENTRAL_HEADER, 'PK\x01\x02',
+                                     _CREATE_VERSION, _VERSION, _FLAGS,
+                                     method, dostime, dosdate, crc, csize,
+                                     size, len(filename), 0, 0, 0, 0,
+                                     attr << 16, offset) + filename)
+        count = len(self._members)
+        self._output(struct.pack(_END_RECORD, 'PK\x05\x06', 0, 0, count,
+                                 count, self.offset - start, start, 0))
+
+    # Internal methods
+
+    def _output(self, data):
+        self.offset += len(data)
+        self._write(data)
+
+    def _write_header(self, filename, date_time, method):
+        if isinstance(filename, unicode):
+            filename = filename.encode('utf-8')
+        year, month, day, hour, minute, second = date_time[:6]
+        dostime = hour << 11 | minute << 5 | second // 2
+        dosdate = (max(year, 1980) - 1980) << 9 | month << 5 | day
+        header = (filename, self.offset, method, dostime, dosdate)
+        self._output(struct.pack(_LOCAL_HEADER, 'PK\x03\x04', _VERSION,
+                                 _FLAGS, method, dostime, dosdate, 0, 0, 0,
+                                 len(filename), 0) + filename)
+        return header
+
+    def _end_member(self, header, crc, csize, size, attr):
+        crc &= 0xffffffff
+        self._output(struct.pack(_DATA_DESCRIPTOR, 'PK\x07\x08', crc, csize,
+                                 size))
+        self._members.append(header + (crc, csize, size, attr))
@@ -13,6 +13,7 @@
 
 import os.path
 import sys
+import time
 
 from genshi.builder import tag
 
@@ -23,7 +24,7 @@ from trac.perm import IPermissionRequestor
 from trac.util import as_bool, is_path_below
 from trac.util.compat import any
 from trac.util.text import breakable_path, normalize_whitespace, print_table, \
-                           printout
+                           printerr, printout
 from trac.util.translation import _, ngettext, tag_
 from trac.versioncontrol import DbRepositoryProvider, RepositoryManager, \
                                 is_default
@@ -136,7 +137,17 @@ class VersionControlAdmin(Component):
         for repos in sorted(repositories, key=lambda r: r.reponame):
             printout(_('Resyncing repository history for %(reponame)s... ',
                        reponame=repos.reponame or '(default)'))
-            repos.sync(self._sync_feedback, clean=clean)
+            self._sync_start = time.time()
+            self._sync_count = 0
+            try:
+                repos.sync(self._sync_feedback, clean=clean)
+            except (Exception, KeyboardInterrupt):
+                if self._sync_count:
+                    printerr(_("\nThe synchronization can be resumed with: "
+                               "trac-admin $ENV repository sync "
+                               "'%(reponame)s'",
+                               reponame=repos.reponame or '(default)'))
+                raise
             for cnt, in self.env.db_query(
                     "SELECT count(rev) FROM revision WHERE repos=%s",
                     (repos.id,)):
@@ -145,7 +156,10 @@ class VersionControlAdmin(Component):
         printout(_('Done.'))
 
     def _sync_feedback(self, rev):
-        sys.stdout.write(' [%s]\r' % rev)
+        self._sync_count += 1
+        elapsed = max(time.time() - self._sync_start, 0.001)
+        sys.stdout.write(' [%s] %.1f revisions/s   \r'
+                         % (rev, self._sync_count / elapsed))
         sys.stdout.flush()
 
     def _do_resync(self, reponame, rev=None):
@@ -20,7 +20,7 @@ import os.path
 import time
 
 from trac.admin import AdminCommandError, IAdminCommandProvider, get_dir_list
-from trac.config import ConfigSection, ListOption, Option
+from trac.config import ConfigSection, IntOption, ListOption, Option
 from trac.core import *
 from trac.resource import IResourceManager, Resource, ResourceNotFound
 from trac.util.concurrency import threading
@@ -324,6 +324,18 @@ class RepositoryManager(Component):
         repositories specified here. The default is to synchronize the default
         repository, for backward compatibility. (''since 0.12'')""")
 
+    repository_sync_workers = IntOption('trac', 'repository_sync_workers', 1,
+        """Number of threads retrieving the changesets from the repository
+        while a cached repository is synchronized, each with its own
+        instance of the repository. With `1`, the changesets are retrieved
+        by the synchronizing thread. (''since 1.0.2'')""")
+
+    repository_sync_batch_size = IntOption('trac',
+        'repository_sync_batch_size', 100,
+        """Number of changesets stored in a single transaction while a
+        cached repository is synchronized. An interrupted synchronization
+        resumes after the last stored batch. (''since 1.0.2'')""")
+
     def __init__(self):
         self._cache = {}
         self._lock = threading.Lock()
@@ -823,6 +835,26 @@ class Repository(object):
         """Retrieve a Changeset corresponding to the given revision `rev`."""
         raise NotImplementedError
 
+    def get_changeset_map(self, revs):
+        """Retrieve the Changesets corresponding to the revisions `revs`.
+
+        Return a `dict` mapping each revision to its Changeset. The
+        revisions which don't exist are left out.
+
+        The default implementation retrieves the changesets one by one,
+        repositories able to do better should override it.
+
+        :since 1.0.2:
+        """
+        changesets = {}
+        for rev in revs:
+            if rev not in changesets:
+                try:
+                    changesets[rev] = self.get_changeset(rev)
+                except NoSuchChangeset:
+                    pass
+        return changesets
+
     def get_changeset_uid(self, rev):
         """Return a globally unique identifier for the ''rev'' changeset.
 
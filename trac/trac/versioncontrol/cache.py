@@ -17,12 +17,17 @@
 from __future__ import with_statement
 
 import os
+import Queue
+import sys
+import time
 
 from trac.cache import cached
 from trac.core import TracError
+from trac.util.concurrency import threading
 from trac.util.datefmt import from_utimestamp, to_utimestamp
 from trac.util.translation import _
-from trac.versioncontrol import Changeset, Node, Repository, NoSuchChangeset
+from trac.versioncontrol import Changeset, Node, Repository, \
+                                RepositoryManager, NoSuchChangeset
 
 
 _kindmap = {'D': Node.DIRECTORY, 'F': Node.FILE}
@@ -41,6 +46,9 @@ CACHE_YOUNGEST_REV = 'youngest_rev'
 
 CACHE_METADATA_KEYS = (CACHE_REPOSITORY_DIR, CACHE_YOUNGEST_REV)
 
+# Maximum number of revisions looked up in a single query
+CHANGESET_BATCH_SIZE = 500
+
 
 class CachedRepository(Repository):
 
@@ -69,6 +77,32 @@ class CachedRepository(Repository):
     def get_changeset(self, rev):
         return CachedChangeset(self, self.normalize_rev(rev), self.env)
 
+    def get_changeset_map(self, revs):
+        srevs = {}
+        for rev in revs:
+            try:
+                normrev = self.normalize_rev(rev)
+            except NoSuchChangeset:
+                continue
+            aliases = srevs.setdefault(self.db_rev(normrev), (normrev, []))[1]
+            aliases.append(rev)
+        changesets = {}
+        keys = list(srevs)
+        with self.env.db_query as db:
+            for i in xrange(0, len(keys), CHANGESET_BATCH_SIZE):
+                batch = keys[i:i + CHANGESET_BATCH_SIZE]
+                for srev, time, author, message in db("""
+                        SELECT rev, time, author, message FROM revision
+                        WHERE repos=%%s AND rev IN (%s)
+                        """ % ','.join(['%s'] * len(batch)),
+                        [self.id] + batch):
+                    normrev, aliases = srevs[srev]
+                    cset = self._get_cached_changeset(normrev,
+                                                      (time, author, message))
+                    for rev in aliases:
+                        changesets[rev] = cset
+        return changesets
+
     def get_changeset_uid(self, rev):
         return self.repos.get_changeset_uid(rev)
 
@@ -226,66 +260,101 @@ class CachedRepository(Repository):
 
             # prepare for resyncing (there might still be a race
             # condition at this point)
-            while next_youngest is not None:
-                srev = self.db_rev(next_youngest)
-
-                with self.env.db_transaction as db:
-                    self.log.info("Trying to sync revision [%s]",
-                                  next_youngest)
-                    cset = self.repos.get_changeset(next_youngest)
-                    try:
-                        # steps 1. and 2.
-                        self._insert_changeset(db, next_youngest, cset)
-                    except Exception, e: # *another* 1.1. resync attempt won
-                        self.log.warning('Revision %s already cached: %r',
-                                         next_youngest, e)
-                        # the other resync attempts is also
-                        # potentially still in progress, so for our
-                        # process/thread, keep ''previous'' notion of
-                        # 'youngest'
-                        self.repos.clear(youngest_rev=youngest)
-                        # FIXME: This aborts a containing transaction
-                        db.rollback()
-                        return
-
-                    # 3. update 'youngest_rev' metadata (minimize
-                    # possibility of failures at point 0.)
-                    db("""
-                        UPDATE repository SET value=%s WHERE id=%s AND name=%s
-                        """, (str(next_youngest), self.id, CACHE_YOUNGEST_REV))
-                    del self.metadata
-
-                # 4. iterate (1. should always succeed now)
-                youngest = next_youngest
-                next_youngest = self.repos.next_rev(next_youngest)
-
-                # 5. provide some feedback
-                if feedback:
-                    feedback(youngest)
+            rm = RepositoryManager(self.env)
+            batch_size = max(rm.repository_sync_batch_size, 1)
+            fetcher = ChangesetFetcher(self, rm.repository_sync_workers)
+            start = time.time()
+            count = 0
+            try:
+                while next_youngest is not None:
+                    revs = []
+                    while next_youngest is not None and \
+                            len(revs) < batch_size:
+                        revs.append(next_youngest)
+                        next_youngest = self.repos.next_rev(next_youngest)
+                    self.log.info("Trying to sync revisions [%s:%s]",
+                                  revs[0], revs[-1])
+                    changesets = fetcher.fetch(revs)
+
+                    with self.env.db_transaction as db:
+                        try:
+                            # steps 1. and 2.
+                            self._insert_changesets(db, changesets)
+                        except Exception, e: # *another* 1.1. resync won
+                            self.log.warning('Revisions [%s:%s] already '
+                                             'cached: %r', revs[0], revs[-1],
+                                             e)
+                            # the other resync attempts is also
+                            # potentially still in progress, so for our
+                            # process/thread, keep ''previous'' notion of
+                            # 'youngest'
+                            self.repos.clear(youngest_rev=youngest)
+                            # FIXME: This aborts a containing transaction
+                            db.rollback()
+                            return
+
+                        # 3. update 'youngest_rev' metadata (minimize
+                        # possibility of failures at point 0.), which is
+                        # also where an interrupted sync resumes
+                        db("""
+                            UPDATE repository SET value=%s
+                            WHERE id=%s AND name=%s
+                            """, (str(revs[-1]), self.id, CACHE_YOUNGEST_REV))
+                        del self.metadata
+
+                    # 4. iterate (1. should always succeed now)
+                    youngest = revs[-1]
+                    count += len(revs)
+                    elapsed = time.time() - start
+                    self.log.info("Synced %d revisions in %.1f s "
+                                  "(%.1f revisions/s)", count, elapsed,
+                                  count / max(elapsed, 0.001))
+
+                    # 5. provide some feedback
+                    if feedback:
+                        for rev in revs:
+                            feedback(rev)
+            finally:
+                fetcher.close()
 
     def _insert_changeset(self, db, rev, cset):
-        srev = self.db_rev(rev)
+        self._insert_changesets(db, [(rev, cset, cset.get_changes())])
+
+    def _insert_changesets(self, db, changesets):
+        """Insert the given `(rev, changeset, changes)` triples in the
+        cache."""
         # 1. Attempt to resync the 'revision' table.  In case of
         # concurrent syncs, only such insert into the `revision` table
         # will succeed, the others will fail and raise an exception.
-        db("""
+        db.executemany("""
             INSERT INTO revision (repos,rev,time,author,message)
             VALUES (%s,%s,%s,%s,%s)
-            """, (self.id, srev, to_utimestamp(cset.date),
-                  cset.author, cset.message))
+            """, [(self.id, self.db_rev(rev), to_utimestamp(cset.date),
+                   cset.author, cset.message)
+                  for rev, cset, changes in changesets])
         # 2. now *only* one process was able to get there (i.e. there
         # *shouldn't* be any race condition here)
-        for path, kind, action, bpath, brev in cset.get_changes():
-            self.log.debug("Caching node change in [%s]: %r", rev,
-                           (path, kind, action, bpath, brev))
-            kind = _inverted_kindmap[kind]
-            action = _inverted_actionmap[action]
-            db("""
+        rows = []
+        for rev, cset, changes in changesets:
+            srev = self.db_rev(rev)
+            for path, kind, action, bpath, brev in changes:
+                self.log.debug("Caching node change in [%s]: %r", rev,
+                               (path, kind, action, bpath, brev))
+                kind = _inverted_kindmap[kind]
+                action = _inverted_actionmap[action]
+                rows.append((self.id, srev, path, kind, action, bpath, brev))
+        if rows:
+            db.executemany("""
                 INSERT INTO node_change
                     (repos,rev,path,node_type,change_type,base_path,
                      base_rev)
                 VALUES (%s,%s,%s,%s,%s,%s,%s)
-                """, (self.id, srev, path, kind, action, bpath, brev))
+                """, rows)
+
+    def _get_cached_changeset(self, rev, metadata):
+        """Create a changeset from its `(time, author, message)` row in
+        the cache."""
+        return CachedChangeset(self, rev, self.env, metadata)
 
     def get_node(self, path, rev=None):
         return self.repos.get_node(path, self.normalize_rev(rev))
@@ -400,20 +469,95 @@ class CachedRepository(Repository):
                                       ignore_ancestry)
 
 
+class ChangesetFetcher(object):
+    """Retrieve changesets and their changes from the repository backend
+    for a sync of the cache.
+
+    With more than one worker, the changesets of each batch are retrieved
+    concurrently by a pool of threads, each using its own instance of the
+    repository.
+
+    :since 1.0.2:
+    """
+
+    def __init__(self, repos, workers):
+        self.repos = repos
+        self._threads = []
+        self._tasks = Queue.Queue()
+        if workers > 1:
+            rm = RepositoryManager(repos.env)
+            if isinstance(rm.get_repository(repos.reponame),
+                          CachedRepository):
+                for i in xrange(workers):
+                    thread = threading.Thread(target=self._run,
+                                              name='ChangesetFetcher')
+                    thread.setDaemon(True)
+                    thread.start()
+                    self._threads.append(thread)
+
+    def fetch(self, revs):
+        """Return the `(rev, changeset, changes)` triples of the given
+        revisions, in order."""
+        if not self._threads:
+            return [self._fetch(self.repos.repos, rev) for rev in revs]
+        results = Queue.Queue()
+        for index, rev in enumerate(revs):
+            self._tasks.put((index, rev, results))
+        changesets = [None] * len(revs)
+        for i in xrange(len(revs)):
+            index, result, exc_info = results.get()
+            if exc_info:
+                raise exc_info[0], exc_info[1], exc_info[2]
+            changesets[index] = result
+        return changesets
+
+    def close(self):
+        """Stop the worker threads."""
+        for thread in self._threads:
+            self._tasks.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _fetch(self, backend, rev):
+        cset = backend.get_changeset(rev)
+        return rev, cset, list(cset.get_changes())
+
+    def _run(self):
+        rm = RepositoryManager(self.repos.env)
+        backend = None
+        try:
+            while True:
+                task = self._tasks.get()
+                if task is None:
+                    break
+                index, rev, results = task
+                try:
+                    if backend is None:
+                        repos = rm.get_repository(self.repos.reponame)
+                        backend = repos.repos
+                    results.put((index, self._fetch(backend, rev), None))
+                except Exception:
+                    results.put((index, None, sys.exc_info()))
+        finally:
+            rm.shutdown(threading._get_ident())
+
+
 class CachedChangeset(Changeset):
 
-    def __init__(self, repos, rev, env):
+    def __init__(self, repos, rev, env, metadata=None):
         self.env = env
-        for _date, author, message in self.env.db_query("""
-                SELECT time, author, message FROM revision
-                WHERE repos=%s AND rev=%s
-                """, (repos.id, repos.db_rev(rev))):
-            date = from_utimestamp(_date)
-            Changeset.__init__(self, repos, repos.rev_db(rev), message, author,
-                               date)
-            break
-        else:
-            raise NoSuchChangeset(rev)
+        if metadata is None:
+            for metadata in self.env.db_query("""
+                    SELECT time, author, message FROM revision
+                    WHERE repos=%s AND rev=%s
+                    """, (repos.id, repos.db_rev(rev))):
+                break
+            else:
+                raise NoSuchChangeset(rev)
+        _date, author, message = metadata
+        Changeset.__init__(self, repos, repos.rev_db(rev), message, author,
+                           from_utimestamp(_date))
 
     def get_changes(self):
         for path, kind, change, base_path, base_rev in sorted(
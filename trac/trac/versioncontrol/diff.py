@@ -14,15 +14,17 @@
 #
 # Author: Christopher Lenz <cmlenz@gmx.de>
 
+from bisect import bisect_left
 import difflib
 import re
 
 from genshi import Markup, escape
 
+from trac.util.diskcache import DiskCache
 from trac.util.text import expandtabs
 
-__all__ = ['diff_blocks', 'get_change_extent', 'get_diff_options',
-           'unified_diff']
+__all__ = ['DiffCache', 'PatienceSequenceMatcher', 'diff_blocks',
+           'get_change_extent', 'get_diff_options', 'unified_diff']
 
 
 def get_change_extent(str1, str2):
@@ -47,7 +49,7 @@ def get_change_extent(str1, str2):
 
 def get_filtered_hunks(fromlines, tolines, context=None,
                        ignore_blank_lines=False, ignore_case=False,
-                       ignore_space_changes=False):
+                       ignore_space_changes=False, patience=False):
     """Retrieve differences in the form of `difflib.SequenceMatcher`
     opcodes, grouped according to the ``context`` and ``ignore_*``
     parameters.
@@ -59,13 +61,15 @@ def get_filtered_hunks(fromlines, tolines, context=None,
     :param ignore_space_changes: differences in amount of spaces are ignored
     :param context: the number of "equal" lines kept for representing
                     the context of the change
+    :param patience: use the `PatienceSequenceMatcher` instead of the
+                     default `difflib.SequenceMatcher` (''since 1.0.2'')
     :return: generator of grouped `difflib.SequenceMatcher` opcodes
 
     If none of the ``ignore_*`` parameters is `True`, there's nothing
     to filter out the results will come straight from the
     SequenceMatcher.
     """
-    hunks = get_hunks(fromlines, tolines, context)
+    hunks = get_hunks(fromlines, tolines, context, patience)
     if ignore_space_changes or ignore_case or ignore_blank_lines:
         hunks = filter_ignorable_lines(hunks, fromlines, tolines, context,
                                        ignore_blank_lines, ignore_case,
@@ -73,18 +77,168 @@ def get_filtered_hunks(fromlines, tolines, context=None,
     return hunks
 
 
-def get_hunks(fromlines, tolines, context=None):
+def get_hunks(fromlines, tolines, context=None, patience=False):
     """Generator yielding grouped opcodes describing differences .
 
     See `get_filtered_hunks` for the parameter descriptions.
     """
-    matcher = difflib.SequenceMatcher(None, fromlines, tolines)
+    if patience:
+        matcher = PatienceSequenceMatcher(None, fromlines, tolines)
+    else:
+        matcher = difflib.SequenceMatcher(None, fromlines, tolines)
     if context is None:
         return (hunk for hunk in [matcher.get_opcodes()])
     else:
         return matcher.get_grouped_opcodes(context)
 
 
+class PatienceSequenceMatcher(difflib.SequenceMatcher):
+    """Sequence matcher implementing the "patience diff" algorithm.
+
+    The lines occurring exactly once in both sequences are matched first,
+    keeping the longest series of them appearing in the same order. The
+    regions between these anchors are then matched recursively, and the
+    regions without any unique line are left to `difflib.SequenceMatcher`.
+
+    This is much faster than `difflib.SequenceMatcher` on large files
+    with many changes, and usually aligns the changes better on source
+    code, at the cost of a less minimal diff in some cases.
+
+    :since 1.0.2:
+    """
+
+    def get_matching_blocks(self):
+        if self.matching_blocks is not None:
+            return self.matching_blocks
+        matches = []
+        self._match(0, len(self.a), 0, len(self.b), matches)
+        # Merge the adjacent blocks, as `difflib.SequenceMatcher` does
+        blocks = []
+        i1 = j1 = k1 = 0
+        for i2, j2, k2 in matches:
+            if i1 + k1 == i2 and j1 + k1 == j2:
+                k1 += k2
+            else:
+                if k1:
+                    blocks.append((i1, j1, k1))
+                i1, j1, k1 = i2, j2, k2
+        if k1:
+            blocks.append((i1, j1, k1))
+        blocks.append((len(self.a), len(self.b), 0))
+        self.matching_blocks = blocks
+        return blocks
+
+    def _match(self, alo, ahi, blo, bhi, matches):
+        a, b = self.a, self.b
+        # Common prefix and suffix
+        start = alo
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            alo += 1
+            blo += 1
+        if alo > start:
+            matches.append((start, blo - (alo - start), alo - start))
+        end = ahi
+        while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+        if alo < ahi and blo < bhi:
+            anchors = self._unique_anchors(alo, ahi, blo, bhi)
+            if anchors:
+                for i, j in anchors:
+                    self._match(alo, i, blo, j, matches)
+                    matches.append((i, j, 1))
+                    alo, blo = i + 1, j + 1
+                self._match(alo, ahi, blo, bhi, matches)
+            else:
+                matcher = difflib.SequenceMatcher(None, a[alo:ahi],
+                                                  b[blo:bhi])
+                for i, j, k in matcher.get_matching_blocks():
+                    if k:
+                        matches.append((alo + i, blo + j, k))
+        if end > ahi:
+            matches.append((ahi, bhi, end - ahi))
+
+    def _unique_anchors(self, alo, ahi, blo, bhi):
+        """Return the longest increasing series of `(i, j)` pairs of
+        lines unique in both `a[alo:ahi]` and `b[blo:bhi]`."""
+        a, b = self.a, self.b
+        lines = {}
+        for i in xrange(alo, ahi):
+            entry = lines.get(a[i])
+            if entry is None:
+                lines[a[i]] = [i, None]
+            else:
+                entry[0] = -1
+        for j in xrange(blo, bhi):
+            entry = lines.get(b[j])
+            if entry is not None and entry[0] >= 0:
+                entry[1] = j if entry[1] is None else -1
+        pairs = sorted((i, j) for i, j in lines.itervalues()
+                       if i >= 0 and j is not None and j >= 0)
+        # Patience sorting of the `j` indices, keeping back-references
+        tops = []
+        stacks = []
+        for pair in pairs:
+            pos = bisect_left(tops, pair[1])
+            prev = stacks[pos - 1][-1] if pos else None
+            if pos == len(tops):
+                tops.append(pair[1])
+                stacks.append([])
+            else:
+                tops[pos] = pair[1]
+            stacks[pos].append((pair, prev))
+        anchors = []
+        node = stacks[-1][-1] if stacks else None
+        while node is not None:
+            anchors.append(node[0])
+            node = node[1]
+        anchors.reverse()
+        return anchors
+
+
+class DiffCache(DiskCache):
+    """Cache of the hunks returned by `get_filtered_hunks`, stored in
+    a directory with one compact text file per entry.
+
+    Once the files take more than `max_size` bytes, the least recently
+    used entries are removed.
+
+    :since 1.0.2:
+    """
+
+    _tags = {'equal': 'e', 'replace': 'r', 'delete': 'd', 'insert': 'i'}
+    _names = dict((v, k) for k, v in _tags.iteritems())
+
+    def get(self, key):
+        """Return the hunks stored for `key`, or `None`."""
+        data = super(DiffCache, self).get(key)
+        if data is not None:
+            return self._decode(data)
+
+    def put(self, key, hunks):
+        """Store the hunks for `key`, evicting the least recently used
+        entries if needed."""
+        super(DiffCache, self).put(key, self._encode(hunks))
+
+    # Internal methods
+
+    def _encode(self, hunks):
+        return '\n'.join(';'.join('%s%d,%d,%d,%d'
+                                  % (self._tags[tag], i1, i2, j1, j2)
+                                  for tag, i1, i2, j1, j2 in group)
+                         for group in hunks)
+
+    def _decode(self, data):
+        hunks = []
+        for line in data.splitlines():
+            group = []
+            for opcode in line.split(';'):
+                i1, i2, j1, j2 = map(int, opcode[1:].split(','))
+                group.append((self._names[opcode[0]], i1, i2, j1, j2))
+            hunks.append(group)
+        return hunks
+
+
 def filter_ignorable_lines(hunks, fromlines, tolines, context,
                            ignore_blank_lines, ignore_case,
                            ignore_space_changes):
@@ -181,10 +335,12 @@ def hdf_diff(*args, **kwargs):
     return diff_blocks(*args, **kwargs)
 
 def diff_blocks(fromlines, tolines, context=None, tabwidth=8,
-                ignore_blank_lines=0, ignore_case=0, ignore_space_changes=0):
+                ignore_blank_lines=0, ignore_case=0, ignore_space_changes=0,
+                hunks=None):
     """Return an array that is adequate for adding to the data dictionary
 
-    See `get_filtered_hunks` for the parameter descriptions.
+    See `get_filtered_hunks` for the parameter descriptions. The hunks
+    can also be given precomputed, through `hunks` (''since 1.0.2'').
 
     See also the diff_div.html template.
     """
@@ -214,10 +370,12 @@ def diff_blocks(fromlines, tolines, context=None, tabwidth=8,
                             '\1' + toline[last:])
             yield tag, i1, i2, j1, j2
 
+    if hunks is None:
+        hunks = get_filtered_hunks(fromlines, tolines, context,
+                                   ignore_blank_lines, ignore_case,
+                                   ignore_space_changes)
     changes = []
-    for group in get_filtered_hunks(fromlines, tolines, context,
-                                    ignore_blank_lines, ignore_case,
-                                    ignore_space_changes):
+    for group in hunks:
         blocks = []
         last_tag = None
         for tag, i1, i2, j1, j2 in markup_intraline_changes(group):
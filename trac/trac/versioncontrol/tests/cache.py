@@ -18,14 +18,32 @@ from __future__ import with_statement
 
 from datetime import datetime
 
+from trac.core import Component, implements
 from trac.test import EnvironmentStub, Mock
+from trac.util.concurrency import threading
 from trac.util.datefmt import to_utimestamp, utc
-from trac.versioncontrol import Repository, Changeset, Node, NoSuchChangeset
+from trac.versioncontrol import Repository, Changeset, Node, \
+                                NoSuchChangeset, IRepositoryConnector
 from trac.versioncontrol.cache import CachedRepository
 
 import unittest
 
 
+class CachedRepositoryConnector(Component):
+    """Connector returning a `CachedRepository` around the repository
+    created by `backend_factory`."""
+
+    implements(IRepositoryConnector)
+
+    backend_factory = None
+
+    def get_supported_types(self):
+        yield ('test-cached', 8)
+
+    def get_repository(self, repos_type, repos_dir, params):
+        return CachedRepository(self.env, self.backend_factory(), self.log)
+
+
 class CacheTestCase(unittest.TestCase):
 
     def setUp(self):
@@ -49,6 +67,7 @@ class CacheTestCase(unittest.TestCase):
         return Mock(Repository, 'test-repos', {'name': 'test-repos', 'id': 1},
                     self.log,
                     get_changeset=get_changeset,
+                    close=lambda: None,
                     get_oldest_rev=lambda: 0,
                     get_youngest_rev=lambda: youngest_rev,
                     normalize_rev=lambda x: get_changeset(x).rev,
@@ -305,6 +324,83 @@ class CacheTestCase(unittest.TestCase):
                          changes.next())
         self.assertRaises(StopIteration, changes.next)
 
+    def get_changesets(self, count, changes=None):
+        t = datetime(2001, 1, 1, 1, 1, 1, 0, utc)
+        return [Mock(Changeset, None, rev, 'Commit %d' % rev, 'joe', t,
+                     get_changes=lambda: iter(changes or []))
+                for rev in range(count)]
+
+    def test_sync_in_batches_resumes(self):
+        self.env.config.set('trac', 'repository_sync_batch_size', 2)
+        changesets = self.get_changesets(5)
+        failing = set([3])
+        def get_changeset(rev):
+            if int(rev) in failing:
+                raise IOError("Backend failure")
+            return changesets[int(rev)]
+        repos = self.get_repos(get_changeset=get_changeset, youngest_rev=4)
+        cache = CachedRepository(self.env, repos, self.log)
+        self.assertRaises(IOError, cache.sync)
+
+        with self.env.db_query as db:
+            self.assertEqual([('0',), ('1',)],
+                             db("SELECT rev FROM revision ORDER BY rev"))
+        self.assertEqual('1', cache.metadata['youngest_rev'])
+
+        failing.clear()
+        synced = []
+        cache = CachedRepository(self.env, repos, self.log)
+        cache.sync(synced.append)
+        self.assertEqual([2, 3, 4], synced)
+        with self.env.db_query as db:
+            self.assertEqual(5, db("SELECT COUNT(*) FROM revision")[0][0])
+        self.assertEqual('4', cache.metadata['youngest_rev'])
+
+    def test_sync_with_workers(self):
+        self.env.config.set('trac', 'repository_sync_workers', 3)
+        self.env.config.set('trac', 'repository_sync_batch_size', 4)
+        self.env.config.set('repositories', 'test-repos.dir', '/')
+        self.env.config.set('repositories', 'test-repos.type', 'test-cached')
+        changes = [('trunk/README', Node.FILE, Changeset.EDIT,
+                    'trunk/README', 1)]
+        changesets = self.get_changesets(10, changes)
+        threads = set()
+        def get_changeset(rev):
+            threads.add(threading.currentThread().getName())
+            return changesets[int(rev)]
+        connector = CachedRepositoryConnector(self.env)
+        connector.backend_factory = lambda: \
+            self.get_repos(get_changeset=get_changeset, youngest_rev=9)
+        cache = CachedRepository(self.env, connector.backend_factory(),
+                                 self.log)
+        cache.sync()
+
+        self.assertTrue('ChangesetFetcher' in threads)
+        with self.env.db_query as db:
+            self.assertEqual([(str(rev), 'Commit %d' % rev)
+                              for rev in range(10)],
+                             db("""SELECT rev, message FROM revision
+                                   ORDER BY time, rev"""))
+            self.assertEqual(10, db("SELECT COUNT(*) FROM node_change "
+                                    "WHERE path='trunk/README'")[0][0])
+        self.assertEqual('9', cache.metadata['youngest_rev'])
+
+    def test_get_changeset_map(self):
+        t1 = datetime(2001, 1, 1, 1, 1, 1, 0, utc)
+        t2 = datetime(2002, 1, 1, 1, 1, 1, 0, utc)
+        self.preset_cache(
+            (('0', to_utimestamp(t1), '', ''), []),
+            (('1', to_utimestamp(t2), 'joe', 'Import'), []),
+            )
+        repos = self.get_repos()
+        cache = CachedRepository(self.env, repos, self.log)
+        changesets = cache.get_changeset_map([1, 0, 1, 'foo'])
+        self.assertEqual([0, 1], sorted(changesets))
+        self.assertEqual('joe', changesets[1].author)
+        self.assertEqual('Import', changesets[1].message)
+        self.assertEqual(t2, changesets[1].date)
+        self.assertEqual(t1, changesets[0].date)
+
 
 def suite():
     return unittest.makeSuite(CacheTestCase, 'test')
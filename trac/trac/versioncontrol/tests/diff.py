@@ -1,5 +1,8 @@
 from trac.versioncontrol import diff
 
+import os
+import shutil
+import tempfile
 import unittest
 
 def get_opcodes(*args, **kwargs):
@@ -206,8 +209,76 @@ class DiffTestCase(unittest.TestCase):
         self.assertEquals(str(block['changed']['lines'][0]),
                           'aa<ins>x</ins>b')
 
+    def test_patience_matcher(self):
+        a = ['def f():', '    return 1', '', 'def g():', '    return 2']
+        b = ['def h():', '    return 3', '', 'def f():', '    return 1',
+             '', 'def g():', '    return 2']
+        matcher = diff.PatienceSequenceMatcher(None, a, b)
+        self.assertEqual([('insert', 0, 0, 0, 3), ('equal', 0, 5, 3, 8)],
+                         matcher.get_opcodes())
+        self.assertEqual([(0, 3, 5), (5, 8, 0)],
+                         matcher.get_matching_blocks())
+
+    def test_patience_hunks_rebuild_target(self):
+        a = ['x%d' % (i % 7) for i in range(60)]
+        b = a[:10] + ['new'] + a[15:40] + ['x1', 'x2'] + a[40:]
+        for group in diff.get_filtered_hunks(a, b, None, patience=True):
+            rebuilt = []
+            for tag, i1, i2, j1, j2 in group:
+                if tag == 'equal':
+                    self.assertEqual(a[i1:i2], b[j1:j2])
+                    rebuilt.extend(a[i1:i2])
+                else:
+                    rebuilt.extend(b[j1:j2])
+            self.assertEqual(b, rebuilt)
+
+    def test_diff_blocks_precomputed_hunks(self):
+        hunks = list(diff.get_filtered_hunks(['A', 'B'], ['A', 'C'], 3))
+        self.assertEqual(diff.diff_blocks(['A', 'B'], ['A', 'C'], 3),
+                         diff.diff_blocks(['A', 'B'], ['A', 'C'], 3,
+                                          hunks=hunks))
+
+
+class DiffCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp(prefix='trac-diffcache-')
+        self.cache = diff.DiffCache(self.path, 600)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_round_trip(self):
+        hunks = list(diff.get_filtered_hunks(['A', 'B', 'C', 'D'],
+                                             ['A', 'C', 'E'], 0))
+        self.assertEqual(None, self.cache.get(('repos', 1)))
+        self.cache.put(('repos', 1), hunks)
+        self.assertEqual(hunks, self.cache.get(('repos', 1)))
+        self.assertEqual(None, self.cache.get(('repos', 2)))
+
+    def test_evict_least_recently_used(self):
+        hunks = [[('replace', 0, 100, 0, 100)] * 10] # 129 bytes
+        for i in range(4):
+            self.cache.put(i, hunks)
+        # Make the first entry the most recently used
+        self.cache.get(0)
+        for i in range(4):
+            filename = self.cache._filename(i)
+            atime = os.stat(filename).st_atime
+            os.utime(filename, (atime, 1000 + (i or 10)))
+        self.cache.put(4, hunks)
+        self.cache.put(5, hunks)
+        self.assertEqual(hunks, self.cache.get(0))
+        self.assertEqual(None, self.cache.get(1))
+        self.assertEqual(None, self.cache.get(2))
+        self.assertEqual(hunks, self.cache.get(5))
+
+
 def suite():
-    return unittest.makeSuite(DiffTestCase, 'test')
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(DiffTestCase, 'test'))
+    suite.addTest(unittest.makeSuite(DiffCacheTestCase, 'test'))
+    return suite
 
 if __name__ == '__main__':
     unittest.main()
@@ -686,12 +686,14 @@ class BrowserModule(Component):
             annotate = req.args.get('annotate')
             if annotate:
                 annotations.insert(0, annotate)
+            cache_key = (repos.reponame, node.created_path, node.created_rev)
             preview_data = mimeview.preview_data(context, node.get_content(),
                                                  node.get_content_length(),
                                                  mime_type, node.created_path,
                                                  raw_href,
                                                  annotations=annotations,
-                                                 force_source=bool(annotate))
+                                                 force_source=bool(annotate),
+                                                 cache_key=cache_key)
             return {
                 'changeset': changeset,
                 'size': node.content_length,
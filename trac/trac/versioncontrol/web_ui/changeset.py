@@ -28,12 +28,13 @@ from StringIO import StringIO
 
 from genshi.builder import tag
 
-from trac.config import Option, BoolOption, IntOption
+from trac.config import Option, BoolOption, ChoiceOption, IntOption
 from trac.core import *
 from trac.mimeview.api import Mimeview
 from trac.perm import IPermissionRequestor
 from trac.resource import Resource, ResourceNotFound
-from trac.search import ISearchSource, search_to_sql, shorten_result
+from trac.search import FullTextSearch, ISearchSource, search_to_sql, \
+                        shorten_result
 from trac.timeline.api import ITimelineEventProvider
 from trac.util import as_bool, content_disposition, embedded_numbers, pathjoin
 from trac.util.datefmt import from_utimestamp, pretty_timedelta
@@ -42,9 +43,11 @@ from trac.util.text import exception_to_unicode, to_unicode, \
 from trac.util.translation import _, ngettext
 from trac.versioncontrol.api import RepositoryManager, Changeset, Node, \
                                     NoSuchChangeset
-from trac.versioncontrol.diff import get_diff_options, diff_blocks, \
+from trac.versioncontrol.diff import DiffCache, get_diff_options, \
+                                     get_filtered_hunks, diff_blocks, \
                                      unified_diff
-from trac.versioncontrol.web_ui.browser import BrowserModule
+from trac.util.zipstream import ZipStream
+from trac.versioncontrol.web_ui.browser import CHUNK_SIZE, BrowserModule
 from trac.web import IRequestHandler, RequestDone
 from trac.web.chrome import (Chrome, INavigationContributor, add_ctxtnav,
                              add_link, add_script, add_stylesheet,
@@ -105,6 +108,15 @@ class DefaultPropertyDiffRenderer(Component):
                                                 unidiff))
 
 
+def _read_blocks(content):
+    """Iterate over the content of a file, by blocks of `CHUNK_SIZE`."""
+    while True:
+        chunk = content.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+
 class ChangesetModule(Component):
     """Renderer providing flexible functionality for showing sets of
     differences.
@@ -158,6 +170,34 @@ class ChangesetModule(Component):
         plus their new size) for which the changeset view will attempt to show
         the diffs inlined (''since 0.10'').""")
 
+    max_download_bytes = IntOption('changeset', 'max_download_bytes', 0,
+        """Maximum total size in bytes of the files of a changeset which can
+        be downloaded as a unified diff (old and new files) or as a ZIP
+        archive (new files). Larger downloads are refused before any
+        content is read. Set this to 0 to disable the limit.
+        (''since 1.0.2'')""")
+
+    diff_cache_dir = Option('changeset', 'diff_cache_dir', 'diffcache',
+        """Directory where the differences computed for the changeset
+        and diff views are cached. Relative paths are resolved from the
+        environment directory. (''since 1.0.2'')""")
+
+    diff_cache_size = IntOption('changeset', 'diff_cache_size', 0,
+        """Maximum size in bytes of the cached differences. Once it is
+        exceeded, the least recently used differences are removed. Set
+        this to 0 to disable the cache. (''since 1.0.2'')""")
+
+    large_diff_algorithm = ChoiceOption('changeset', 'large_diff_algorithm',
+                                        ['difflib', 'patience'],
+        """Algorithm used for computing the differences of the files
+        having more than `large_diff_lines` lines: `difflib` for the
+        default Python algorithm, or `patience` for the faster
+        "patience diff" algorithm. (''since 1.0.2'')""")
+
+    large_diff_lines = IntOption('changeset', 'large_diff_lines', 5000,
+        """Number of lines above which a file is diffed using the
+        `large_diff_algorithm`. (''since 1.0.2'')""")
+
     wiki_format_messages = BoolOption('changeset', 'wiki_format_messages',
                                       'true',
         """Whether wiki formatting should be applied to changeset messages.
@@ -380,6 +420,46 @@ class ChangesetModule(Component):
 
     # Internal methods
 
+    @property
+    def diff_cache(self):
+        """The `DiffCache` of the environment, or `None` if disabled."""
+        env = getattr(self.env, 'parent', None) or self.env
+        if env is not self.env:
+            return ChangesetModule(env).diff_cache
+        size = self.diff_cache_size
+        if size <= 0:
+            return None
+        path = self.diff_cache_dir
+        if not os.path.isabs(path):
+            path = os.path.join(env.path, path)
+        cache = getattr(self, '_diff_cache', None)
+        if cache is None or cache.path != path:
+            cache = self._diff_cache = DiffCache(path, size)
+        cache.max_size = size
+        return cache
+
+    def _get_hunks(self, repos, old_node, new_node, old_lines, new_lines,
+                   context, ignore_blank_lines, ignore_case, ignore_space):
+        """Return the grouped opcodes describing the differences between
+        two files, from the diff cache when possible."""
+        patience = self.large_diff_algorithm == 'patience' and \
+                   max(len(old_lines), len(new_lines)) > self.large_diff_lines
+        cache = self.diff_cache
+        if cache is not None:
+            key = (repos.id, old_node.path, old_node.created_rev,
+                   new_node.path, new_node.created_rev, context,
+                   bool(ignore_blank_lines), bool(ignore_case),
+                   bool(ignore_space), patience)
+            hunks = cache.get(key)
+            if hunks is not None:
+                return hunks
+        hunks = list(get_filtered_hunks(old_lines, new_lines, context,
+                                        ignore_blank_lines, ignore_case,
+                                        ignore_space, patience))
+        if cache is not None:
+            cache.put(key, hunks)
+        return hunks
+
     def _render_html(self, req, repos, chgset, restricted, xhr, data):
         """HTML version"""
         data['restricted'] = restricted
@@ -568,12 +648,14 @@ class ChangesetModule(Component):
                 ignore_blank_lines = options.get('ignoreblanklines')
                 ignore_case = options.get('ignorecase')
                 ignore_space = options.get('ignorewhitespace')
-                return diff_blocks(old_content.splitlines(),
-                                   new_content.splitlines(),
-                                   context, tabwidth,
-                                   ignore_blank_lines=ignore_blank_lines,
-                                   ignore_case=ignore_case,
-                                   ignore_space_changes=ignore_space)
+                old_lines = old_content.splitlines()
+                new_lines = new_content.splitlines()
+                hunks = self._get_hunks(repos, old_node, new_node,
+                                        old_lines, new_lines, context,
+                                        ignore_blank_lines, ignore_case,
+                                        ignore_space)
+                return diff_blocks(old_lines, new_lines, context, tabwidth,
+                                   hunks=hunks)
             else:
                 return []
 
@@ -676,18 +758,40 @@ class ChangesetModule(Component):
 
         return data
 
+    def _get_download_changes(self, repos, data, old_files):
+        """Return the changes to be downloaded, after checking that their
+        total size doesn't exceed `max_download_bytes`."""
+        changes = repos.get_changes(
+            new_path=data['new_path'], new_rev=data['new_rev'],
+            old_path=data['old_path'], old_rev=data['old_rev'])
+        if not self.max_download_bytes:
+            return changes
+        changes = list(changes)
+        total_size = 0
+        for old_node, new_node, kind, change in changes:
+            if kind != Node.FILE:
+                continue
+            if new_node and change != Changeset.DELETE:
+                total_size += new_node.get_content_length() or 0
+            if old_node and old_files:
+                total_size += old_node.get_content_length() or 0
+        if total_size > self.max_download_bytes:
+            raise TracError(_("Maximum total size of the changed files: "
+                              "%(num)s bytes", num=self.max_download_bytes),
+                            _("Download failed"))
+        return changes
+
     def _render_diff(self, req, filename, repos, data):
         """Raw Unified Diff version"""
+        changes = self._get_download_changes(repos, data, True)
         req.send_response(200)
         req.send_header('Content-Type', 'text/x-patch;charset=utf-8')
         req.send_header('Content-Disposition',
                         content_disposition('attachment', filename + '.diff'))
-        buf = StringIO()
+        req.end_headers(streaming=True)
         mimeview = Mimeview(self.env)
 
-        for old_node, new_node, kind, change in repos.get_changes(
-                new_path=data['new_path'], new_rev=data['new_rev'],
-                old_path=data['old_path'], old_rev=data['old_rev']):
+        for old_node, new_node, kind, change in changes:
             # TODO: Property changes
 
             # Content changes
@@ -736,6 +840,8 @@ class ChangesetModule(Component):
                 ignore_space = options.get('ignorewhitespace')
                 if not old_node_info[0]:
                     old_node_info = new_node_info # support for 'A'dd changes
+                # Send the diff of each file as soon as it is computed
+                buf = StringIO()
                 buf.write('Index: ' + new_path + CRLF)
                 buf.write('=' * 67 + CRLF)
                 buf.write('--- %s\t(revision %s)' % old_node_info + CRLF)
@@ -746,53 +852,35 @@ class ChangesetModule(Component):
                                          ignore_case=ignore_case,
                                          ignore_space_changes=ignore_space):
                     buf.write(line + CRLF)
-
-        diff_str = buf.getvalue().encode('utf-8')
-        req.send_header('Content-Length', len(diff_str))
-        req.end_headers()
-        req.write(diff_str)
+                req.write(buf.getvalue().encode('utf-8'))
         raise RequestDone
 
     def _render_zip(self, req, filename, repos, data):
         """ZIP archive containing all the added and/or modified files."""
+        changes = self._get_download_changes(repos, data, False)
         req.send_response(200)
         req.send_header('Content-Type', 'application/zip')
         req.send_header('Content-Disposition',
                         content_disposition('attachment', filename + '.zip'))
+        req.end_headers(streaming=True)
 
-        from zipfile import ZipFile, ZipInfo, ZIP_DEFLATED as compression
-
-        buf = StringIO()
-        zipfile = ZipFile(buf, 'w', compression)
-        for old_node, new_node, kind, change in repos.get_changes(
-            new_path=data['new_path'], new_rev=data['new_rev'],
-            old_path=data['old_path'], old_rev=data['old_rev']):
+        # The archive is sent while it is built, reading the files
+        # by blocks
+        zipfile = ZipStream(req.write)
+        for old_node, new_node, kind, change in changes:
             if (kind == Node.FILE or kind == Node.DIRECTORY) and \
                     change != Changeset.DELETE \
                     and new_node.is_viewable(req.perm):
-                zipinfo = ZipInfo()
-                # Note: unicode filenames are not supported by zipfile.
-                # UTF-8 is not supported by all Zip tools either,
-                # but as some do, UTF-8 is the best option here.
-                zipinfo.filename = new_node.path.strip('/').encode('utf-8')
-                zipinfo.flag_bits |= 0x800 # filename is encoded with utf-8
-                zipinfo.date_time = new_node.last_modified.utctimetuple()[:6]
-                zipinfo.compress_type = compression
-                # setting zipinfo.external_attr is needed since Python 2.5
+                # Note: UTF-8 is not supported by all Zip tools, but as
+                # some do, UTF-8 is the best option here.
+                path = new_node.path.strip('/')
+                date_time = new_node.last_modified.utctimetuple()[:6]
                 if new_node.isfile:
-                    zipinfo.external_attr = 0644 << 16L
-                    content = new_node.get_content().read()
+                    zipfile.add_file(path, date_time,
+                                     _read_blocks(new_node.get_content()))
                 elif new_node.isdir:
-                    zipinfo.filename += '/'
-                    zipinfo.external_attr = 040755 << 16L
-                    content = ''
-                zipfile.writestr(zipinfo, content)
+                    zipfile.add_directory(path, date_time)
         zipfile.close()
-
-        zip_str = buf.getvalue()
-        req.send_header("Content-Length", len(zip_str))
-        req.end_headers()
-        req.write(zip_str)
         raise RequestDone
 
     def title_for_diff(self, data):
@@ -1152,12 +1240,17 @@ class ChangesetModule(Component):
         rm = RepositoryManager(self.env)
         repositories = dict((repos.params['id'], repos)
                             for repos in rm.get_real_repositories())
-        with self.env.db_query as db:
-            sql, args = search_to_sql(db, ['rev', 'message', 'author'], terms)
-            for id, rev, ts, author, log in db("""
+        ids = FullTextSearch(self.env).find_resources(req, 'changeset',
+                                                      terms)
+        if ids is None:
+            with self.env.db_query as db:
+                sql, args = search_to_sql(db, ['rev', 'message', 'author'],
+                                          terms)
+                rows = db("""
                     SELECT repos, rev, time, author, message
-                    FROM revision WHERE """ + sql,
-                    args):
+                    FROM revision WHERE """ + sql, args)
+            changesets = []
+            for id, rev, ts, author, log in rows:
                 try:
                     rev = int(rev)
                 except ValueError:
@@ -1165,12 +1258,33 @@ class ChangesetModule(Component):
                 repos = repositories.get(id)
                 if not repos:
                     continue # revisions for a no longer active repository
-                cset = repos.resource.child('changeset', rev)
-                if 'CHANGESET_VIEW' in req.perm(cset):
-                    yield (req.href.changeset(rev, repos.reponame or None),
-                           '[%s]: %s' % (rev, shorten_line(log)),
-                           from_utimestamp(ts), author,
-                           shorten_result(log, terms))
+                changesets.append((repos, rev, from_utimestamp(ts), author,
+                                   log))
+        else:
+            changesets = self._get_indexed_changesets(repositories, ids)
+        for repos, rev, date, author, log in changesets:
+            cset = repos.resource.child('changeset', rev)
+            if 'CHANGESET_VIEW' in req.perm(cset):
+                yield (req.href.changeset(rev, repos.reponame or None),
+                       '[%s]: %s' % (rev, shorten_line(log)),
+                       date, author, shorten_result(log, terms))
+
+    def _get_indexed_changesets(self, repositories, ids):
+        """Return the `(repos, rev, date, author, message)` tuples of the
+        changesets identified by the `(reponame, rev)` pairs `ids`."""
+        repositories = dict((repos.reponame, repos)
+                            for repos in repositories.itervalues())
+        revs = {}
+        for reponame, rev in ids:
+            if reponame in repositories:
+                revs.setdefault(reponame, []).append(rev)
+        changesets = []
+        for reponame, repos_revs in revs.iteritems():
+            repos = repositories[reponame]
+            for cset in repos.get_changeset_map(repos_revs).itervalues():
+                changesets.append((repos, cset.rev, cset.date, cset.author,
+                                   cset.message))
+        return changesets
 
 
 class AnyDiffModule(Component):
@@ -30,18 +30,13 @@ __all__ = ['get_changes', 'get_path_links', 'get_existing_node',
 
 
 def get_changes(repos, revs, log=None):
-    changes = {}
+    changes = repos.get_changeset_map(revs)
     for rev in revs:
-        if rev in changes:
-            continue
-        try:
-            changeset = repos.get_changeset(rev)
-        except NoSuchChangeset:
-            changeset = Changeset(repos, rev, '', '',
-                                  datetime(1970, 1, 1, tzinfo=utc))
+        if rev not in changes:
+            changes[rev] = Changeset(repos, rev, '', '',
+                                     datetime(1970, 1, 1, tzinfo=utc))
             if log is not None:
                 log.warning("Unable to get changeset [%s]", rev)
-        changes[rev] = changeset
     return changes
 
 
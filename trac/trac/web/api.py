@@ -239,6 +239,52 @@ def arg_list_to_args(arg_list):
     return args
 
 
+def _parse_byte_range(header, size):
+    """Return the `(start, end)` offsets of the bytes requested by a
+    "Range" header for a content of `size` bytes, or `()` if the range
+    cannot be satisfied.
+
+    Return `None` if the whole content should be sent instead, e.g. when
+    the header is missing, malformed or requests several ranges.
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    start, sep, end = header[6:].strip().partition('-')
+    try:
+        if not start:
+            # Suffix range, the last `end` bytes
+            length = int(end)
+            if length <= 0:
+                return ()
+            return max(size - length, 0), size - 1
+        start = int(start)
+        end = int(end) if end else size - 1
+    except ValueError:
+        return None
+    if start > end:
+        return None
+    if start >= size:
+        return ()
+    return start, min(end, size - 1)
+
+
+class _FileRange(object):
+    """Read `length` bytes of a file, starting at offset `start`."""
+
+    def __init__(self, fileobj, start, length):
+        fileobj.seek(start)
+        self.fileobj = fileobj
+        self.remaining = length
+        self.close = fileobj.close
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.fileobj.read(size) if size else ''
+        self.remaining -= len(data)
+        return data
+
+
 class RequestDone(Exception):
     """Marker exception that indicates whether request processing has completed
     and a response was sent.
@@ -287,6 +333,7 @@ class Request(object):
         self.environ = environ
         self._start_response = start_response
         self._write = None
+        self._streaming = False
         self._status = '200 OK'
         self._response = None
 
@@ -413,10 +460,17 @@ class Request(object):
             self._content_length = int(value)
         self._outheaders.append((name, unicode(value).encode('utf-8')))
 
-    def end_headers(self):
+    def end_headers(self, streaming=False):
         """Must be called after all headers have been sent and before the
         actual content is written.
+
+        :param streaming: if `True`, the content can be written without
+                          a ''Content-Length'' header; the server then
+                          uses a chunked transfer encoding or closes the
+                          connection at the end of the response
+                          (''since 1.0.2'')
         """
+        self._streaming = streaming
         self._send_cookie_headers()
         self._write = self._start_response(self._status, self._outheaders)
 
@@ -554,6 +608,10 @@ class Request(object):
         attributes. It also checks the last modification time of the local file
         against the "If-Modified-Since" provided by the user agent, and sends a
         "304 Not Modified" response if it matches.
+
+        A single byte range requested in a "Range" header is sent with a
+        "206 Partial Content" response, unless the file is sent by the web
+        server through the "X-Sendfile" header (''since 1.0.2'').
         """
         if not os.path.isfile(path):
             raise HTTPNotFound(_("File %(path)s not found", path=path))
@@ -571,17 +629,40 @@ class Request(object):
             mimetype = mimetypes.guess_type(path)[0] or \
                        'application/octet-stream'
 
-        self.send_response(200)
+        use_xsendfile = getattr(self, 'use_xsendfile', False)
+        byte_range = None
+        if not use_xsendfile and \
+                self.get_header('If-Range') in (None, last_modified):
+            byte_range = _parse_byte_range(self.get_header('Range'),
+                                           stat.st_size)
+        if byte_range == ():
+            self.send_response(416)
+            self.send_header('Content-Range', 'bytes */%d' % stat.st_size)
+            self.send_header('Content-Length', 0)
+            self.end_headers()
+            raise RequestDone
+
+        if byte_range:
+            start, end = byte_range
+            self.send_response(206)
+            self.send_header('Content-Range',
+                             'bytes %d-%d/%d' % (start, end, stat.st_size))
+            length = end - start + 1
+        else:
+            self.send_response(200)
+            length = stat.st_size
         self.send_header('Content-Type', mimetype)
-        self.send_header('Content-Length', stat.st_size)
+        self.send_header('Content-Length', length)
         self.send_header('Last-Modified', last_modified)
-        use_xsendfile = getattr(self, 'use_xsendfile', False)
+        self.send_header('Accept-Ranges', 'bytes')
         if use_xsendfile:
             self.send_header('X-Sendfile', os.path.abspath(path))
         self.end_headers()
 
         if not use_xsendfile and self.method != 'HEAD':
             fileobj = file(path, 'rb')
+            if byte_range:
+                fileobj = _FileRange(fileobj, start, length)
             file_wrapper = self.environ.get('wsgi.file_wrapper', _FileWrapper)
             self._response = file_wrapper(fileobj, 4096)
         raise RequestDone
@@ -605,14 +686,15 @@ class Request(object):
         which has been specified in the ''Content-Type'' header
         or 'utf-8' otherwise.
 
-        Note that the ''Content-Length'' header must have been specified.
-        Its value either corresponds to the length of `data`, or, if there
-        are multiple calls to `write`, to the cumulated length of the `data`
+        Note that the ''Content-Length'' header must have been specified,
+        unless `end_headers` was called with `streaming=True`. Its value
+        either corresponds to the length of `data`, or, if there are
+        multiple calls to `write`, to the cumulated length of the `data`
         arguments.
         """
         if not self._write:
             self.end_headers()
-        if not hasattr(self, '_content_length'):
+        if not hasattr(self, '_content_length') and not self._streaming:
             raise RuntimeError("No Content-Length header set")
         if isinstance(data, unicode):
             raise ValueError("Can't send unicode content")
@@ -45,7 +45,8 @@ from genshi.template import TemplateLoader, MarkupTemplate, NewTextTemplate
 from trac import __version__ as VERSION
 from trac.config import *
 from trac.core import *
-from trac.env import IEnvironmentSetupParticipant, ISystemInfoProvider
+from trac.env import IEnvironmentSetupParticipant, ISystemInfoProvider, \
+                     UserDirectory
 from trac.mimeview.api import RenderingContext, get_mimetype
 from trac.resource import *
 from trac.util import compat, get_reporter_id, presentation, get_pkginfo, \
@@ -1068,12 +1069,9 @@ class Chrome(Component):
 
     def get_email_map(self):
         """Get the email addresses of all known users."""
-        email_map = {}
         if self.show_email_addresses:
-            for username, name, email in self.env.get_known_users():
-                if email:
-                    email_map[username] = email
-        return email_map
+            return UserDirectory(self.env).get_email_map()
+        return {}
 
     _long_author_re = re.compile(r'.*<([^@]+)@[^@]+>\s*|([^@]+)@[^@]+')
 
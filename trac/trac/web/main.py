@@ -36,6 +36,7 @@ from trac import __version__ as TRAC_VERSION
 from trac.config import BoolOption, ExtensionOption, Option, \
                         OrderedExtensionsOption
 from trac.core import *
+from trac.db.api import DatabaseManager
 from trac.env import open_environment
 from trac.loader import get_plugin_info, match_plugins_to_frames
 from trac.perm import PermissionCache, PermissionError
@@ -50,6 +51,7 @@ from trac.util.translation import _, get_negotiated_locale, has_babel, \
 from trac.web.api import *
 from trac.web.chrome import Chrome
 from trac.web.href import Href
+from trac.web.metrics import RequestTrace, request_metrics
 from trac.web.session import Session
 
 #: This URL is used for semi-automatic bug reports (see
@@ -76,7 +78,11 @@ class RequestWithSession(Request):
 
     def send_response(self, code=200):
         if code < 400:
-            self.session.save()
+            trace = getattr(self, 'trace', None)
+            if trace:
+                trace.call('session_save', '', self.session.save)
+            else:
+                self.session.save()
         super(RequestWithSession, self).send_response(code)
 
 
@@ -128,6 +134,16 @@ class RequestDispatcher(Component):
         like Apache with `mod_xsendfile` or lighttpd. (''since 1.0'')
         """)
 
+    request_metrics = BoolOption('trac', 'request_metrics', 'false',
+        """Record the duration of each phase of the requests
+        (authentication, each request filter, the request handler,
+        template rendering and session save), and aggregate them in
+        histograms by handler and product. The histograms can be
+        retrieved in the Prometheus text format from the `/metrics`
+        URL, see `metrics_allowed_addresses` and `metrics_token`.
+        (''since 1.0.2'')
+        """)
+
     # Public API
 
     def authenticate(self, req):
@@ -160,6 +176,12 @@ class RequestDispatcher(Component):
             'form_token': self._get_form_token,
             'use_xsendfile': self._get_use_xsendfile,
         })
+        trace = getattr(req, 'trace', None)
+        if trace:
+            for name, phase in (('authname', 'authenticate'),
+                                ('perm', 'permissions'),
+                                ('session', 'session_load')):
+                req.callbacks[name] = trace.wrap(phase, req.callbacks[name])
 
         try:
             try:
@@ -179,6 +201,8 @@ class RequestDispatcher(Component):
                                                             chosen_handler)
                 except TracError, e:
                     raise HTTPInternalError(e)
+                if trace and chosen_handler:
+                    trace.handler = chosen_handler.__class__.__name__
                 if not chosen_handler:
                     if req.path_info.endswith('/'):
                         # Strip trailing / and redirect
@@ -211,7 +235,11 @@ class RequestDispatcher(Component):
                                                ' %(msg)s', msg=msg))
 
                 # Process the request and render the template
-                resp = chosen_handler.process_request(req)
+                if trace:
+                    resp = trace.call('process_request', trace.handler,
+                                      chosen_handler.process_request, req)
+                else:
+                    resp = chosen_handler.process_request(req)
                 if resp:
                     if len(resp) == 2: # old Clearsilver template and HDF data
                         self.log.error("Clearsilver template are no longer "
@@ -229,8 +257,13 @@ class RequestDispatcher(Component):
                         pprint(data, out)
                         req.send(out.getvalue(), 'text/plain')
 
-                    output = chrome.render_template(req, template, data,
-                                                    content_type)
+                    if trace:
+                        output = trace.call('render', template,
+                                            chrome.render_template, req,
+                                            template, data, content_type)
+                    else:
+                        output = chrome.render_template(req, template, data,
+                                                        content_type)
                     req.send(output, content_type or 'text/html')
                 else:
                     self._post_process_request(req)
@@ -321,13 +354,22 @@ class RequestDispatcher(Component):
         return self.use_xsendfile
 
     def _pre_process_request(self, req, chosen_handler):
+        trace = getattr(req, 'trace', None)
         for filter_ in self.filters:
-            chosen_handler = filter_.pre_process_request(req, chosen_handler)
+            if trace:
+                chosen_handler = trace.call('pre_process',
+                                            filter_.__class__.__name__,
+                                            filter_.pre_process_request,
+                                            req, chosen_handler)
+            else:
+                chosen_handler = filter_.pre_process_request(req,
+                                                             chosen_handler)
         return chosen_handler
 
     def _post_process_request(self, req, *args):
         nbargs = len(args)
         resp = args
+        trace = getattr(req, 'trace', None)
         for f in reversed(self.filters):
             # As the arity of `post_process_request` has changed since
             # Trac 0.10, only filters with same arity gets passed real values.
@@ -335,11 +377,18 @@ class RequestDispatcher(Component):
             # and results will not be not saved.
             extra_arg_count = arity(f.post_process_request) - 1
             if extra_arg_count == nbargs:
-                resp = f.post_process_request(req, *resp)
+                resp = self._call_post_process(trace, f, req, *resp)
             elif nbargs == 0:
-                f.post_process_request(req, *(None,)*extra_arg_count)
+                self._call_post_process(trace, f, req,
+                                        *(None,)*extra_arg_count)
         return resp
 
+    def _call_post_process(self, trace, f, req, *args):
+        if trace:
+            return trace.call('post_process', f.__class__.__name__,
+                              f.post_process_request, req, *args)
+        return f.post_process_request(req, *args)
+
 _slashes_re = re.compile(r'/+')
 
 
@@ -469,6 +518,14 @@ def _dispatch_request(req, env, env_error):
     if env and not env.abs_href.base:
         env._abs_href = req.abs_href
 
+    dbm = trace = None
+    if env:
+        dbm = DatabaseManager(getattr(env, 'parent', None) or env)
+        dbm.start_query_profile(req.path_info or '/')
+        if RequestDispatcher(env).request_metrics:
+            product = getattr(env, 'product', None)
+            trace = req.trace = RequestTrace(product.prefix if product
+                                             else '')
     try:
         if not env and env_error:
             raise HTTPInternalError(env_error)
@@ -482,6 +539,12 @@ def _dispatch_request(req, env, env_error):
         _send_user_error(req, env, e)
     except Exception, e:
         send_internal_error(env, req, sys.exc_info())
+    finally:
+        if dbm:
+            dbm.end_query_profile()
+        if trace:
+            trace.finish()
+            request_metrics.record(trace)
     return resp
 
 
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at http://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at http://trac.edgewall.org/log/.
+
+"""Timing of the phases of request processing.
+
+When `[trac] request_metrics` is enabled, the `RequestDispatcher`
+attaches a `RequestTrace` to each request, recording how long the
+authentication, each request filter, the request handler, the template
+rendering and the session save took. At the end of the request, the
+trace is aggregated into the process-wide `RequestMetrics` histograms,
+which can be retrieved in the Prometheus text format from `/metrics`.
+"""
+
+from __future__ import with_statement
+
+import time
+
+from trac.config import ListOption, Option
+from trac.core import Component, ExtensionPoint, Interface, implements
+from trac.db.pool import DurationHistogram
+from trac.util.concurrency import threading
+from trac.util.translation import _
+from trac.web.api import HTTPForbidden, HTTPNotFound, IRequestHandler
+
+__all__ = ['IMetricsProvider', 'RequestMetrics', 'RequestTrace',
+           'format_counters', 'format_histograms', 'request_metrics']
+
+
+class IMetricsProvider(Interface):
+    """Extension point interface for components exporting their own
+    metrics from `/metrics`.
+
+    :since 1.0.2:
+    """
+
+    def get_metrics():
+        """Return the metrics in the Prometheus text exposition format."""
+
+
+class RequestTrace(object):
+    """Durations of the phases of a single request.
+
+    Each phase is recorded as a `(phase, component, duration)` tuple,
+    `component` being the name of the component involved (e.g. the
+    request filter), or `''`. Phases may overlap: for example, the
+    permission check may trigger the authentication.
+    """
+
+    def __init__(self, product=''):
+        self.product = product
+        self.handler = ''
+        self.start = time.time()
+        self.phases = []
+
+    def add(self, phase, component, duration):
+        self.phases.append((phase, component, duration))
+
+    def call(self, phase, component, func, *args):
+        """Call `func` with `args` and record the duration of the call
+        as `phase`."""
+        start = time.time()
+        try:
+            return func(*args)
+        finally:
+            self.add(phase, component, time.time() - start)
+
+    def wrap(self, phase, func):
+        """Return a wrapper around `func` recording the duration of its
+        calls as `phase`."""
+        def wrapper(*args):
+            return self.call(phase, '', func, *args)
+        return wrapper
+
+    def finish(self):
+        """Record the total duration of the request."""
+        self.add('total', '', time.time() - self.start)
+
+
+class RequestMetrics(object):
+    """Histograms of the duration of the request phases, by handler and
+    by product, for the whole process."""
+
+    bounds = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def record(self, trace):
+        """Aggregate the phases of a finished `RequestTrace`."""
+        with self._lock:
+            for phase, component, duration in trace.phases:
+                key = (trace.handler, trace.product, phase, component)
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = \
+                                DurationHistogram(self.bounds)
+                histogram.add(duration)
+
+    def get_histograms(self):
+        """Return a dictionary of `(handler, product, phase, component)`
+        keys to the histograms' `as_dict()` values."""
+        with self._lock:
+            return dict((key, histogram.as_dict())
+                        for key, histogram in self._histograms.iteritems())
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+
+    def export(self):
+        """Return the histograms in the Prometheus text exposition
+        format."""
+        return format_histograms('trac_request_phase_seconds',
+                                 "Duration of the request processing phases.",
+                                 ('handler', 'product', 'phase', 'component'),
+                                 self.get_histograms())
+
+
+def format_histograms(name, doc, labels, histograms):
+    """Format `histograms` in the Prometheus text exposition format.
+
+    :param histograms: a dictionary of label values tuples, matching
+                       the `labels` names, to `DurationHistogram.as_dict`
+                       values.
+    """
+    lines = ['# HELP %s %s' % (name, doc), '# TYPE %s histogram' % name]
+    for key, values in sorted(histograms.iteritems()):
+        label_values = ','.join('%s="%s"' % (label, _escape_label(value))
+                                for label, value in zip(labels, key))
+        cumulated = 0
+        for bound, count in values['buckets']:
+            cumulated += count
+            le = '+Inf' if bound is None else repr(float(bound))
+            lines.append('%s_bucket{%s,le="%s"} %d'
+                         % (name, label_values, le, cumulated))
+        lines.append('%s_sum{%s} %r' % (name, label_values, values['total']))
+        lines.append('%s_count{%s} %d' % (name, label_values, values['count']))
+    return '\n'.join(lines) + '\n'
+
+
+def format_counters(name, doc, label, counters, metric_type='counter'):
+    """Format `counters`, a dictionary of `label` values to counts, in the
+    Prometheus text exposition format.
+
+    :param metric_type: the Prometheus type of the metric, e.g. `'gauge'`
+                        for values which can decrease.
+    """
+    lines = ['# HELP %s %s' % (name, doc),
+             '# TYPE %s %s' % (name, metric_type)]
+    for value, count in sorted(counters.iteritems()):
+        lines.append('%s{%s="%s"} %d' % (name, label, _escape_label(value),
+                                         count))
+    return '\n'.join(lines) + '\n'
+
+
+def _escape_label(value):
+    value = value.encode('utf-8') if isinstance(value, unicode) else value
+    return value.replace('\\', r'\\').replace('"', r'\"') \
+                .replace('\n', r'\n')
+
+
+#: Process-wide request metrics
+request_metrics = RequestMetrics()
+
+
+class MetricsModule(Component):
+    """Export the request metrics in the Prometheus text format, at the
+    `/metrics` URL.
+
+    The metrics are only gathered when `[trac] request_metrics` is
+    enabled. They can be retrieved by users having `TRAC_ADMIN`, and
+    from the addresses listed in `[trac] metrics_allowed_addresses`
+    with the bearer token set in `[trac] metrics_token`, if any. The
+    metrics of the `IMetricsProvider` components, such as the evaluation
+    time of the permission policies, are exported as well.
+    """
+
+    implements(IRequestHandler)
+
+    metrics_providers = ExtensionPoint(IMetricsProvider)
+
+    allowed_addresses = ListOption('trac', 'metrics_allowed_addresses',
+                                   '127.0.0.1, ::1',
+        doc="""Remote addresses allowed to retrieve the request metrics
+        from `/metrics` without the `TRAC_ADMIN` permission.
+
+        Behind a reverse proxy running on the same host, all the
+        requests come from a local address: `metrics_token` should then
+        be set as well. ''(Since 1.0.2)''""")
+
+    token = Option('trac', 'metrics_token', '',
+        doc="""Bearer token which must be sent in the `Authorization`
+        header of the requests for `/metrics` from the
+        `metrics_allowed_addresses`. No token is required when empty.
+        ''(Since 1.0.2)''""")
+
+    # IRequestHandler methods
+
+    def match_request(self, req):
+        return req.path_info == '/metrics'
+
+    def process_request(self, req):
+        from trac.web.main import RequestDispatcher
+        if not RequestDispatcher(self.env).request_metrics:
+            raise HTTPNotFound(_("Request metrics are disabled"))
+        if 'TRAC_ADMIN' not in req.perm:
+            if req.remote_addr not in self.allowed_addresses:
+                raise HTTPForbidden(_("Request metrics can only be "
+                                      "retrieved from a local address"))
+            if self.token and req.get_header('Authorization') != \
+                    'Bearer ' + self.token:
+                raise HTTPForbidden(_("Request metrics can only be "
+                                      "retrieved with the metrics token"))
+        content = request_metrics.export()
+        for provider in self.metrics_providers:
+            content += provider.get_metrics()
+        req.send(content, 'text/plain; version=0.0.4')
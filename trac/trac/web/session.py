@@ -25,6 +25,7 @@ import time
 
 from trac.admin.api import console_date_format
 from trac.core import TracError, Component, implements
+from trac.env import UserDirectory
 from trac.util import hex_entropy
 from trac.util.text import print_table
 from trac.util.translation import _
@@ -112,6 +113,10 @@ class DetachedSession(dict):
         # eventually purge the tables.
 
         session_saved = False
+        # Whether the known users need to be refreshed
+        user_changed = authenticated and (self._new or
+                        any(self._old.get(k) != self.get(k)
+                            for k in ('name', 'email')))
 
         with self.env.db_transaction as db:
             # Try to save the session if it's a new one. A failure to
@@ -160,6 +165,9 @@ class DetachedSession(dict):
                     return
                 session_saved = True
 
+        if user_changed:
+            UserDirectory(self.env).invalidate()
+
         # Purge expired sessions. We do this only when the session was
         # changed as to minimize the purging.
 
@@ -289,6 +297,7 @@ class Session(DetachedSession):
                     db("""UPDATE session_attribute SET sid=%s, authenticated=1
                           WHERE sid=%s
                           """, (self.req.authname, sid))
+                    UserDirectory(self.env).invalidate()
             else:
                 # We didn't have an anonymous session for this sid. The
                 # authenticated session might have been inserted between the
@@ -297,6 +306,7 @@ class Session(DetachedSession):
                     db("""INSERT INTO session (sid, last_visit, authenticated)
                           VALUES (%s, %s, 1)
                           """, (self.req.authname, int(time.time())))
+                    UserDirectory(self.env).invalidate()
                 except self.env.db_exc.IntegrityError:
                     self.env.log.warning('Authenticated session for %s '
                                          'already exists', self.req.authname)
@@ -432,6 +442,8 @@ class SessionAdmin(Component):
             if email is not None:
                 db("INSERT INTO session_attribute VALUES (%s,%s,'email',%s)",
                     (sid, authenticated, email))
+        if authenticated:
+            UserDirectory(self.env).invalidate()
 
     def _do_set(self, attr, sid, val):
         if attr not in ('name', 'email'):
@@ -450,6 +462,8 @@ class SessionAdmin(Component):
                 """, (sid, authenticated, attr))
             db("INSERT INTO session_attribute VALUES (%s, %s, %s, %s)",
                (sid, authenticated, attr, val))
+        if authenticated:
+            UserDirectory(self.env).invalidate()
 
     def _do_delete(self, *sids):
         with self.env.db_transaction as db:
@@ -467,6 +481,8 @@ class SessionAdmin(Component):
                         DELETE FROM session_attribute
                         WHERE sid=%s AND authenticated=%s
                         """, (sid, authenticated))
+                    if authenticated:
+                        UserDirectory(self.env).invalidate()
 
     def _do_purge(self, age):
         when = parse_date(age)
@@ -14,7 +14,7 @@
 import unittest
 
 from trac.web.tests import api, auth, cgi_frontend, chrome, href, session, \
-                           wikisyntax, main
+                           wikisyntax, main, metrics
 
 def suite():
     suite = unittest.TestSuite()
@@ -26,6 +26,7 @@ def suite():
     suite.addTest(session.suite())
     suite.addTest(wikisyntax.suite())
     suite.addTest(main.suite())
+    suite.addTest(metrics.suite())
     return suite
 
 if __name__ == '__main__':
@@ -3,7 +3,9 @@
 from trac.test import Mock
 from trac.web.api import Request, RequestDone, parse_arg_list
 
+import os
 from StringIO import StringIO
+import tempfile
 import unittest
 
 
@@ -108,6 +110,79 @@ class RequestTestCase(unittest.TestCase):
         # anyway we're not supposed to send unicode, so we get a ValueError
         self.assertRaises(ValueError, req.write, u'Föö')
 
+    def test_write_streaming(self):
+        buf = StringIO()
+        def start_response(status, headers):
+            return buf.write
+        req = Request(self._make_environ(), start_response)
+        req.send_header('Content-Type', 'text/plain;charset=utf-8')
+        req.end_headers(streaming=True)
+        req.write('Foo')
+        req.write('Bar')
+        self.assertEqual('FooBar', buf.getvalue())
+
+    def _send_file(self, content, **kwargs):
+        fd, path = tempfile.mkstemp()
+        os.write(fd, content)
+        os.close(fd)
+        status_sent = []
+        headers_sent = {}
+        def start_response(status, headers):
+            status_sent.append(status)
+            headers_sent.update(dict(headers))
+        req = Request(self._make_environ(**kwargs), start_response)
+        try:
+            self.assertRaises(RequestDone, req.send_file, path, 'text/plain')
+            body = ''.join(req._response or [])
+            if req._response:
+                req._response.close()
+        finally:
+            os.unlink(path)
+        return status_sent[0], headers_sent, body
+
+    def test_send_file(self):
+        status, headers, body = self._send_file('0123456789')
+        self.assertEqual('200 Ok', status)
+        self.assertEqual('10', headers['Content-Length'])
+        self.assertEqual('bytes', headers['Accept-Ranges'])
+        self.assertEqual('0123456789', body)
+
+    def test_send_file_range(self):
+        status, headers, body = self._send_file('0123456789',
+                                                HTTP_RANGE='bytes=2-4')
+        self.assertEqual('206 Partial Content', status)
+        self.assertEqual('bytes 2-4/10', headers['Content-Range'])
+        self.assertEqual('3', headers['Content-Length'])
+        self.assertEqual('234', body)
+
+    def test_send_file_open_and_suffix_ranges(self):
+        status, headers, body = self._send_file('0123456789',
+                                                HTTP_RANGE='bytes=7-')
+        self.assertEqual('bytes 7-9/10', headers['Content-Range'])
+        self.assertEqual('789', body)
+        status, headers, body = self._send_file('0123456789',
+                                                HTTP_RANGE='bytes=-2')
+        self.assertEqual('bytes 8-9/10', headers['Content-Range'])
+        self.assertEqual('89', body)
+
+    def test_send_file_unsatisfiable_range(self):
+        status, headers, body = self._send_file('0123456789',
+                                                HTTP_RANGE='bytes=10-20')
+        self.assertEqual('416 Requested Range Not Satisfiable', status)
+        self.assertEqual('bytes */10', headers['Content-Range'])
+        self.assertEqual('', body)
+
+    def test_send_file_ignores_multiple_and_stale_ranges(self):
+        status, headers, body = self._send_file('0123456789',
+                                                HTTP_RANGE='bytes=0-1,4-5')
+        self.assertEqual('200 Ok', status)
+        self.assertEqual('0123456789', body)
+        status, headers, body = self._send_file(
+            '0123456789', HTTP_RANGE='bytes=0-1',
+            HTTP_IF_RANGE='Thu, 01 Jan 1970 00:00:00 GMT')
+        self.assertEqual('200 Ok', status)
+        self.assertEqual('0123456789', body)
+
     def test_invalid_cookies(self):
         environ = self._make_environ(HTTP_COOKIE='bad:key=value;')
         req = Request(environ, None)
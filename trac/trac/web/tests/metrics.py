@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at http://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at http://trac.edgewall.org/log/.
+
+import unittest
+
+from trac.core import Component, implements
+from trac.test import EnvironmentStub, Mock
+from trac.web.api import HTTPForbidden, HTTPNotFound, IRequestFilter, \
+                         RequestDone
+from trac.web.main import RequestDispatcher
+from trac.web.metrics import IMetricsProvider, MetricsModule, \
+                             RequestMetrics, RequestTrace, format_counters
+
+
+class TracedFilter(Component):
+    implements(IRequestFilter)
+
+    def pre_process_request(self, req, handler):
+        return handler
+
+    def post_process_request(self, req, template, data, content_type):
+        return template, data, content_type
+
+
+class CountingMetricsProvider(Component):
+
+    implements(IMetricsProvider)
+
+    def get_metrics(self):
+        return format_counters('test_events_total', "Test events.",
+                               'event', {'hit': 2, 'miss': 1})
+
+
+class RequestTraceTestCase(unittest.TestCase):
+
+    def test_call(self):
+        trace = RequestTrace('p1')
+        self.assertEqual(3, trace.call('phase', 'comp', lambda a, b: a + b,
+                                       1, 2))
+        self.assertEqual(1, len(trace.phases))
+        self.assertEqual(('phase', 'comp'), trace.phases[0][:2])
+
+    def test_call_raising(self):
+        trace = RequestTrace()
+        def fail():
+            raise ValueError
+        self.assertRaises(ValueError, trace.call, 'phase', '', fail)
+        self.assertEqual(1, len(trace.phases))
+
+    def test_wrap_and_finish(self):
+        trace = RequestTrace()
+        self.assertEqual('x', trace.wrap('authenticate', lambda r: r)('x'))
+        trace.finish()
+        self.assertEqual([('authenticate', ''), ('total', '')],
+                         [phase[:2] for phase in trace.phases])
+
+
+class RequestMetricsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = RequestMetrics()
+        self.metrics.bounds = (0.1, 1)
+
+    def _record(self, handler, product, *phases):
+        trace = RequestTrace(product)
+        trace.handler = handler
+        for phase in phases:
+            trace.add(*phase)
+        self.metrics.record(trace)
+
+    def test_record(self):
+        self._record('WikiModule', '', ('render', 'wiki_view.html', 0.05),
+                     ('total', '', 0.5))
+        self._record('WikiModule', '', ('total', '', 2))
+        histograms = self.metrics.get_histograms()
+        self.assertEqual(2, len(histograms))
+        total = histograms[('WikiModule', '', 'total', '')]
+        self.assertEqual(2, total['count'])
+        self.assertEqual([(0.1, 0), (1, 1), (None, 1)], total['buckets'])
+        self.metrics.reset()
+        self.assertEqual({}, self.metrics.get_histograms())
+
+    def test_export(self):
+        self._record('TicketModule', u'pr"d', ('pre_process', 'F', 0.05),
+                     ('pre_process', 'F', 0.5), ('pre_process', 'F', 5))
+        self.assertEqual("""\
+# HELP trac_request_phase_seconds Duration of the request processing phases.
+# TYPE trac_request_phase_seconds histogram
+trac_request_phase_seconds_bucket{handler="TicketModule",product="pr\\"d",\
+phase="pre_process",component="F",le="0.1"} 1
+trac_request_phase_seconds_bucket{handler="TicketModule",product="pr\\"d",\
+phase="pre_process",component="F",le="1.0"} 2
+trac_request_phase_seconds_bucket{handler="TicketModule",product="pr\\"d",\
+phase="pre_process",component="F",le="+Inf"} 3
+trac_request_phase_seconds_sum{handler="TicketModule",product="pr\\"d",\
+phase="pre_process",component="F"} 5.55
+trac_request_phase_seconds_count{handler="TicketModule",product="pr\\"d",\
+phase="pre_process",component="F"} 3
+""", self.metrics.export())
+
+
+class RequestDispatcherTracingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.env = EnvironmentStub(enable=[RequestDispatcher, TracedFilter])
+        self.env.config.set('trac', 'request_filters', 'TracedFilter')
+        self.dispatcher = RequestDispatcher(self.env)
+
+    def test_filters_are_traced(self):
+        req = Mock(trace=RequestTrace())
+        self.dispatcher._pre_process_request(req, None)
+        self.dispatcher._post_process_request(req, 'a.html', {}, None)
+        self.dispatcher._post_process_request(req)
+        self.assertEqual([('pre_process', 'TracedFilter'),
+                          ('post_process', 'TracedFilter'),
+                          ('post_process', 'TracedFilter')],
+                         [phase[:2] for phase in req.trace.phases])
+
+    def test_no_trace(self):
+        req = Mock()
+        self.assertEqual(('a.html', {}, None),
+                         self.dispatcher._post_process_request(req, 'a.html',
+                                                               {}, None))
+
+
+class MetricsModuleTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.env = EnvironmentStub()
+        self.module = MetricsModule(self.env)
+
+    def _request(self, remote_addr, perm=(), authorization=None):
+        sent = []
+        def send(content, content_type):
+            sent.append((content, content_type))
+            raise RequestDone
+        headers = {'Authorization': authorization}
+        return Mock(path_info='/metrics', remote_addr=remote_addr,
+                    perm=perm, get_header=headers.get, send=send), sent
+
+    def test_disabled(self):
+        req, sent = self._request('127.0.0.1')
+        self.assertTrue(self.module.match_request(req))
+        self.assertRaises(HTTPNotFound, self.module.process_request, req)
+
+    def test_remote_address(self):
+        self.env.config.set('trac', 'request_metrics', True)
+        req, sent = self._request('192.168.0.1')
+        self.assertRaises(HTTPForbidden, self.module.process_request, req)
+        req, sent = self._request('127.0.0.1')
+        self.assertRaises(RequestDone, self.module.process_request, req)
+        self.assertEqual('text/plain; version=0.0.4', sent[0][1])
+        self.assertTrue(sent[0][0].startswith(
+            '# HELP trac_request_phase_seconds'))
+
+    def test_admin(self):
+        self.env.config.set('trac', 'request_metrics', True)
+        req, sent = self._request('192.168.0.1', perm=['TRAC_ADMIN'])
+        self.assertRaises(RequestDone, self.module.process_request, req)
+
+    def test_token(self):
+        self.env.config.set('trac', 'request_metrics', True)
+        self.env.config.set('trac', 'metrics_token', 's3cr3t')
+        req, sent = self._request('127.0.0.1')
+        self.assertRaises(HTTPForbidden, self.module.process_request, req)
+        req, sent = self._request('127.0.0.1', authorization='Bearer other')
+        self.assertRaises(HTTPForbidden, self.module.process_request, req)
+        req, sent = self._request('127.0.0.1', authorization='Bearer s3cr3t')
+        self.assertRaises(RequestDone, self.module.process_request, req)
+        req, sent = self._request('192.168.0.1',
+                                  authorization='Bearer s3cr3t')
+        self.assertRaises(HTTPForbidden, self.module.process_request, req)
+
+    def test_metrics_providers(self):
+        self.env = EnvironmentStub(enable=['trac.*',
+                                           CountingMetricsProvider])
+        self.module = MetricsModule(self.env)
+        self.env.config.set('trac', 'request_metrics', True)
+        req, sent = self._request('127.0.0.1')
+        self.assertRaises(RequestDone, self.module.process_request, req)
+        self.assertTrue(sent[0][0].endswith(
+            '# HELP test_events_total Test events.\n'
+            '# TYPE test_events_total counter\n'
+            'test_events_total{event="hit"} 2\n'
+            'test_events_total{event="miss"} 1\n'))
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(RequestTraceTestCase, 'test'))
+    suite.addTest(unittest.makeSuite(RequestMetricsTestCase, 'test'))
+    suite.addTest(unittest.makeSuite(RequestDispatcherTracingTestCase, 'test'))
+    suite.addTest(unittest.makeSuite(MetricsModuleTestCase, 'test'))
+    return suite
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='suite')
@@ -204,6 +204,12 @@ class WSGIServerGateway(WSGIGateway):
         WSGIGateway.__init__(self, environ, handler.rfile,
                              _ErrorsWrapper(lambda x: handler.log_error('%s', x)))
         self.handler = handler
+        self.chunked = False
+
+    def run(self, application):
+        WSGIGateway.run(self, application)
+        if self.chunked and not self.handler.wfile.closed:
+            self._write_last_chunk()
 
     def _write(self, data):
         assert self.headers_set, 'Response not started'
@@ -216,8 +222,22 @@ class WSGIServerGateway(WSGIGateway):
                 self.handler.send_response(int(status[:3]))
                 for name, value in headers:
                     self.handler.send_header(name, value)
+                if not any(name.lower() == 'content-length'
+                           for name, value in headers) \
+                        and self._has_body(int(status[:3])):
+                    # The length of a streamed response is unknown
+                    if self.handler.request_version == 'HTTP/1.1' and \
+                            self.handler.protocol_version == 'HTTP/1.1':
+                        self.handler.send_header('Transfer-Encoding',
+                                                 'chunked')
+                        self.chunked = True
+                    else:
+                        self.handler.close_connection = 1
                 self.handler.end_headers()
-            self.handler.wfile.write(data)
+            if not self.chunked:
+                self.handler.wfile.write(data)
+            elif data:
+                self.handler.wfile.write('%x\r\n%s\r\n' % (len(data), data))
         except (IOError, socket.error), e:
             if e.args[0] in (errno.EPIPE, errno.ECONNRESET, 10053, 10054):
                 # client disconnect
@@ -225,6 +245,17 @@ class WSGIServerGateway(WSGIGateway):
             else:
                 raise
 
+    def _write_last_chunk(self):
+        try:
+            self.handler.wfile.write('0\r\n\r\n')
+        except (IOError, socket.error):
+            # client disconnect
+            self.handler.close_connection = 1
+
+    def _has_body(self, status):
+        return self.environ['REQUEST_METHOD'] != 'HEAD' and \
+               status >= 200 and status not in (204, 304)
+
 
 class WSGIServer(HTTPServer):
 
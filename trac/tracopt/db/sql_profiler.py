@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at http://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at http://trac.edgewall.org/log/.
+
+from genshi.builder import tag
+from genshi.filters import Transformer
+
+from trac.core import Component, implements
+from trac.db.api import DatabaseManager
+from trac.db.profiler import get_query_profile
+from trac.util.translation import _, tag_
+from trac.web.api import ITemplateStreamFilter
+
+
+class SQLProfilerPanel(Component):
+    """Show the SQL query statistics of the current request at the
+    bottom of each page.
+
+    The panel is only shown to users having `TRAC_ADMIN` permission,
+    and requires the `[trac] sql_profile` option to be enabled. It
+    lists the statements having taken the most time, how many times
+    they were executed and the component which first issued them.
+    Statements executed at least `[trac] duplicate_query_threshold`
+    times are highlighted.
+
+    Note that the queries executed while rendering the remainder of
+    the page (after the panel) are not accounted for.
+    """
+
+    implements(ITemplateStreamFilter)
+
+    max_statements = 20
+
+    # ITemplateStreamFilter methods
+
+    def filter_stream(self, req, method, filename, stream, data):
+        if method != 'xhtml' or 'TRAC_ADMIN' not in req.perm:
+            return stream
+        if get_query_profile() is None:
+            return stream
+        return stream | Transformer('//body').append(self._render_panel)
+
+    # Internal methods
+
+    def _render_panel(self):
+        profile = get_query_profile()
+        if profile is None:
+            return ''
+        dbm = DatabaseManager(getattr(self.env, 'parent', None) or self.env)
+        threshold = dbm.duplicate_query_threshold
+
+        def ms(duration):
+            return '%.1f' % (duration * 1000)
+
+        rows = []
+        for stats in profile.get_slowest(self.max_statements):
+            rows.append(tag.tr(
+                tag.td(stats.count, class_='count'),
+                tag.td(ms(stats.duration), class_='duration'),
+                tag.td(ms(stats.max), class_='duration'),
+                tag.td(stats.caller or '?'),
+                tag.td(tag.code(' '.join(stats.sql.split()))),
+                style='background: #fdc' if stats.count >= threshold
+                                         else None))
+        return tag.div(
+            tag.h2(_("SQL queries")),
+            tag.p(tag_("%(count)s queries (%(statements)s distinct "
+                       "statements) in %(duration)s ms, %(translation)s ms "
+                       "spent translating SQL.",
+                       count=profile.count,
+                       statements=len(profile.statements),
+                       duration=ms(profile.duration),
+                       translation=ms(profile.translation_time))),
+            tag.table(
+                tag.thead(tag.tr(tag.th(_("Count")), tag.th(_("Total (ms)")),
+                                 tag.th(_("Max (ms)")), tag.th(_("Caller")),
+                                 tag.th(_("Statement")))),
+                tag.tbody(rows),
+                class_='listing') if rows else None,
+            id='sqlprofile', style='clear: both; margin: 1em')
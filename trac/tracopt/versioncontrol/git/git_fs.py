@@ -22,6 +22,7 @@ from genshi.builder import tag
 
 from trac.config import BoolOption, IntOption, PathOption, Option
 from trac.core import *
+from trac.env import UserDirectory
 from trac.util import TracError, shorten_line
 from trac.util.datefmt import FixedOffset, to_timestamp, format_datetime
 from trac.util.text import to_unicode
@@ -59,6 +60,9 @@ class GitCachedRepository(CachedRepository):
     def get_changeset(self, rev):
         return GitCachedChangeset(self, self.normalize_rev(rev), self.env)
 
+    def _get_cached_changeset(self, rev, metadata):
+        return GitCachedChangeset(self, rev, self.env, metadata)
+
 
 class GitCachedChangeset(CachedChangeset):
     """Git-specific cached changeset.
@@ -239,12 +243,7 @@ class GitConnector(Component):
                 except Exception:
                     return None
 
-                for _uid, _name, _email in self.env.get_known_users():
-                    try:
-                        if email == _email.lower():
-                            return _uid
-                    except Exception:
-                        continue
+                return UserDirectory(self.env).find_user(email)
 
         else:
             def rlookup_uid(_):